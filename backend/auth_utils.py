@@ -1,8 +1,13 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
 import os
-from typing import Optional
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
 
 # Password hashing context
 # Configure bcrypt with proper truncation settings
@@ -18,6 +23,17 @@ pwd_context = CryptContext(
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_EXPIRE_DAYS", "14"))
+
+# Token types carried in the "type" claim. Tokens minted before claims were
+# added have no type and are treated as access tokens.
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+# Password hashing pool. bcrypt releases the GIL, so a small thread pool gives
+# real parallelism while keeping the event loop free.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -59,6 +75,90 @@ def get_password_hash(password: str) -> str:
     # Hash the password - guaranteed to be <= 72 bytes
     return pwd_context.hash(password)
 
+class PasswordPoolSaturated(RuntimeError):
+    """Raised when too many password operations are already waiting"""
+    pass
+
+
+class PasswordHasherPool:
+    """Dedicated, bounded thread pool for bcrypt work.
+
+    bcrypt at 12 rounds takes ~250 ms; run inline it stalls every other
+    request on the worker. Jobs beyond `max_queue` waiting ones are rejected
+    with `PasswordPoolSaturated` instead of growing the backlog.
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.peak_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _run(self, submitted_at: float, fn, *args):
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_wait_seconds += time.perf_counter() - submitted_at
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    async def submit(self, fn, *args):
+        executor = self._get_executor()
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise PasswordPoolSaturated("Too many password operations in progress")
+            self.queued += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.queued)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self._run, time.perf_counter(), fn, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "active": self.active,
+                "peak_queue_depth": self.peak_queue_depth,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": (self.total_wait_seconds / self.completed * 1000) if self.completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+password_pool = PasswordHasherPool()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password pool without blocking the event loop"""
+    return await password_pool.submit(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password pool without blocking the event loop"""
+    return await password_pool.submit(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -78,3 +178,91 @@ def verify_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         return None
+
+def create_user_access_token(
+    user_id: str,
+    email: str,
+    name: str,
+    onboarding_complete: bool,
+    token_version: int = 0,
+    created_at: Optional[str] = None,
+    expires_delta: Optional[timedelta] = None,
+) -> str:
+    """Create an access token carrying enough claims to authenticate without a database lookup"""
+    claims = {
+        "sub": str(user_id),
+        "email": email,
+        "name": name,
+        "onboarding_complete": bool(onboarding_complete),
+        "ver": int(token_version or 0),
+        "type": ACCESS_TOKEN_TYPE,
+        "jti": uuid.uuid4().hex,
+    }
+    if created_at:
+        claims["created_at"] = str(created_at)
+    return create_access_token(claims, expires_delta)
+
+def create_refresh_token(user_id: str, token_version: int = 0, expires_delta: Optional[timedelta] = None) -> str:
+    """Create a long-lived refresh token bound to the user's current token version"""
+    claims = {
+        "sub": str(user_id),
+        "ver": int(token_version or 0),
+        "type": REFRESH_TOKEN_TYPE,
+        "jti": uuid.uuid4().hex,
+    }
+    return create_access_token(claims, expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+def token_type(payload: Dict[str, Any]) -> str:
+    """Return the token type of a decoded payload"""
+    return payload.get("type") or ACCESS_TOKEN_TYPE
+
+
+class TokenRevocationSet:
+    """Compact in-process record of revoked tokens.
+
+    Holds the revoked `jti` of individual tokens until they would have
+    expired anyway, plus a per-user minimum token version used to revoke
+    every token issued before a version bump. Checking a token never
+    touches the database. This is only a fast path: when a refresh token
+    is exchanged, the persisted `users.token_version` and the used/revoked
+    refresh tokens (services/refresh_tokens.py) are checked as well, so
+    other workers and restarts honour rotation and logout.
+    """
+
+    def __init__(self):
+        self._revoked_jtis: Dict[str, float] = {}
+        self._min_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def revoke_token(self, payload: Dict[str, Any]) -> None:
+        jti = payload.get("jti")
+        if not jti:
+            return
+        expires_at = float(payload.get("exp") or time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+        with self._lock:
+            self._revoked_jtis[jti] = expires_at
+            self._prune(time.time())
+
+    def revoke_user(self, user_id: str, min_version: int) -> None:
+        """Reject every token for `user_id` whose version is below `min_version`"""
+        with self._lock:
+            current = self._min_versions.get(str(user_id), 0)
+            self._min_versions[str(user_id)] = max(current, int(min_version))
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        user_id = str(payload.get("sub"))
+        if int(payload.get("ver") or 0) < self._min_versions.get(user_id, 0):
+            return True
+        jti = payload.get("jti")
+        return bool(jti) and jti in self._revoked_jtis
+
+    def _prune(self, now: float) -> None:
+        expired = [jti for jti, expires_at in self._revoked_jtis.items() if expires_at <= now]
+        for jti in expired:
+            del self._revoked_jtis[jti]
+
+    def __len__(self) -> int:
+        return len(self._revoked_jtis)
+
+
+revoked_tokens = TokenRevocationSet()
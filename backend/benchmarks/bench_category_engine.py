@@ -0,0 +1,78 @@
+"""
+Category engine benchmark: the old per-value keyword loop vs `CategoryEngine`.
+
+Categorises a column of synthetic narrations three ways:
+
+- keyword_loop: the previous `map_category`, rebuilding its keyword dict
+  and testing every keyword with `in` for each value
+- engine_map:   `CategoryEngine.map` per value (compiled regex + memo)
+- map_series:   `CategoryEngine.map_series` over the whole column
+
+`distinct` sets how many different narrations appear (bank exports repeat
+merchants heavily). Each engine run starts with an empty memo.
+
+Usage: python backend/benchmarks/bench_category_engine.py [values] [distinct]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import pandas as pd
+
+from utils.category_engine import DEFAULT_RULES, CategoryEngine
+
+WORDS = ["upi", "pos", "neft", "swiggy", "zomato", "starbucks", "coffee", "salary", "acme", "uber", "metro",
+         "amazon", "bescom", "electric", "netflix", "apollo", "pharmacy", "rent", "landlord", "atm", "transfer"]
+
+
+def _keyword_loop(raw_category: str) -> str:
+    category_mapping = {category.lower(): list(keywords) for category, keywords in DEFAULT_RULES}
+    raw_lower = raw_category.lower().strip()
+    for category, keywords in category_mapping.items():
+        if any(keyword in raw_lower for keyword in keywords):
+            return category.capitalize()
+    return raw_category.capitalize()
+
+
+def _narrations(count: int, distinct: int) -> pd.Series:
+    rng = random.Random(5)
+    pool = [" ".join(rng.sample(WORDS, 3)).upper() + f" {rng.randrange(10 ** 6)}" for _ in range(distinct)]
+    return pd.Series([rng.choice(pool) for _ in range(count)], dtype=object)
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    values = _narrations(count, distinct)
+    texts = values.tolist()
+
+    def engine_map():
+        engine = CategoryEngine(DEFAULT_RULES)
+        return [engine.map(text) for text in texts]
+
+    timings = {
+        "keyword_loop": _timed(lambda: [_keyword_loop(text) for text in texts]),
+        "engine_map": _timed(engine_map),
+        "map_series": _timed(lambda: CategoryEngine(DEFAULT_RULES).map_series(values)),
+    }
+    results = {"values": count, "distinct": distinct}
+    for name, seconds in timings.items():
+        results[name] = {"seconds": round(seconds, 3), "values_per_second": round(count / seconds)}
+    results["speedup"] = round(timings["keyword_loop"] / timings["map_series"], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Data cleaner benchmark: per-value `parse_date` / `normalize_amount` vs the
+column-wide `parse_dates` / `normalize_amounts`.
+
+Generates `values` synthetic cells for each case and times both paths:
+
+- dates_iso:       ISO dates over ~3 years of days
+- dates_day_first: DD/MM/YYYY (the per-value parser fails ISO first)
+- dates_mixed:     DD/MM/YYYY with 1% "YYYY-MM" and ISO-timestamp stragglers
+- amounts:         "₹1,23,456.78", "(1,234.00)", "$-99.10", "Rs. 5,000" style
+                   strings, nearly all distinct
+
+Per-value results are checked against the column results (NaT/NaN where
+the scalar function raises).
+
+Usage: python backend/benchmarks/bench_data_cleaner.py [values]
+"""
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+import pandas as pd
+
+from utils.data_cleaner import normalize_amount, normalize_amounts, parse_date, parse_dates
+
+DAYS = [date(2023, 1, 1) + timedelta(days=i) for i in range(1100)]
+
+
+def _dates(count: int, fmt: str, stragglers: float = 0.0) -> pd.Series:
+    rng = random.Random(3)
+    values = []
+    for _ in range(count):
+        day = rng.choice(DAYS)
+        roll = rng.random()
+        if roll < stragglers / 2:
+            values.append(day.strftime("%Y-%m"))
+        elif roll < stragglers:
+            values.append(day.strftime("%Y-%m-%dT%H:%M:%S"))
+        else:
+            values.append(day.strftime(fmt))
+    return pd.Series(values, dtype=object)
+
+
+def _indian(whole: int) -> str:
+    text = str(whole)
+    head, tail = text[:-3], text[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    return ",".join(([head] if head else []) + groups + [tail]).lstrip(",")
+
+
+def _amounts(count: int) -> pd.Series:
+    rng = random.Random(4)
+    values = []
+    for _ in range(count):
+        whole, paise = rng.randrange(1, 10 ** 7), rng.randrange(100)
+        style = rng.randrange(4)
+        if style == 0:
+            values.append(f"₹{_indian(whole)}.{paise:02d}")
+        elif style == 1:
+            values.append(f"({whole:,}.{paise:02d})")
+        elif style == 2:
+            values.append(f"$-{whole}.{paise:02d}")
+        else:
+            values.append(f"Rs. {_indian(whole)}")
+    return pd.Series(values, dtype=object)
+
+
+def _scalar(fn, value):
+    try:
+        return fn(value)
+    except ValueError:
+        return None
+
+
+def _compare(values: pd.Series, scalar_fn, column_fn, as_scalar) -> dict:
+    texts = values.tolist()
+    start = time.perf_counter()
+    expected = [_scalar(scalar_fn, value) for value in texts]
+    per_value = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = column_fn(values)
+    column = time.perf_counter() - start
+
+    assert [as_scalar(value) for value in result.tolist()] == expected
+    return {
+        "distinct": int(values.nunique()),
+        "per_value": {"seconds": round(per_value, 3), "values_per_second": round(len(values) / per_value)},
+        "column": {"seconds": round(column, 3), "values_per_second": round(len(values) / column)},
+        "speedup": round(per_value / column, 1),
+    }
+
+
+def _as_date(value):
+    return None if pd.isna(value) else value.date()
+
+
+def _as_float(value):
+    return None if np.isnan(value) else value
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    results = {"values": count}
+    for name, series in (("dates_iso", _dates(count, "%Y-%m-%d")),
+                         ("dates_day_first", _dates(count, "%d/%m/%Y")),
+                         ("dates_mixed", _dates(count, "%d/%m/%Y", stragglers=0.01))):
+        results[name] = _compare(series, parse_date, parse_dates, _as_date)
+    results["amounts"] = _compare(_amounts(count), normalize_amount, normalize_amounts, _as_float)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Finance summary benchmark: raw transaction scan vs monthly rollups.
+
+Serves synthetic transactions (and the rollup rows they aggregate to) from
+an in-process PostgREST stub and counts requests and rows transferred, so
+it runs without a Supabase project.
+
+Exits non-zero if the two summaries disagree.
+
+Usage: python backend/benchmarks/bench_finance_summary.py [rows]
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+import supabase_async
+from services import insights
+from services.rollups import transaction_deltas
+
+CATEGORIES = ["groceries", "rent", "utilities", "dining", "transportation", "shopping", "salary"]
+
+
+def _synthetic_rows(count: int):
+    rng = random.Random(7)
+    rows = []
+    for _ in range(count):
+        category = rng.choice(CATEGORIES)
+        amount = rng.uniform(20000, 90000) if category == "salary" else -rng.uniform(10, 5000)
+        rows.append({"category": category, "amount": round(amount, 2), "date": "2025-10-01"})
+    return rows
+
+
+def _csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def _run(rows, use_rollups: bool):
+    counter = {"requests": 0, "rows": 0}
+    tables = {
+        "/rest/v1/transactions": rows,
+        "/rest/v1/monthly_category_rollups": transaction_deltas(rows),
+    }
+
+    def handler(request):
+        """Serve `limit`/`offset` pages as JSON, or as CSV when `Accept: text/csv` is asked for."""
+        table = tables[request.url.path]
+        params = request.url.params
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", len(table)))
+        page = table[offset:offset + limit]
+        counter["requests"] += 1
+        counter["rows"] += len(page)
+        headers = {"content-range": f"{offset}-{offset + len(page) - 1}/{len(table)}" if page else f"*/{len(table)}"}
+        if request.headers.get("accept") == "text/csv":
+            columns = [column.strip() for column in params["select"].split(",")]
+            headers["content-type"] = "text/csv"
+            return httpx.Response(200, content=_csv(page, columns), headers=headers)
+        headers["content-type"] = "application/json"
+        return httpx.Response(200, content=json.dumps(page).encode(), headers=headers)
+
+    supabase_async._client = supabase_async.AsyncSupabaseClient(
+        "https://bench.invalid", "bench-key", transport=httpx.MockTransport(handler)
+    )
+    try:
+        started = time.perf_counter()
+        if use_rollups:
+            summary = await insights.get_month_summary("bench-user", "2025-10")
+        else:
+            summary = await insights._scan_month_summary("bench-user", "2025-10")
+        elapsed = time.perf_counter() - started
+    finally:
+        await supabase_async.close_async_client()
+    return summary, {"queries": counter["requests"], "rows_read": counter["rows"], "ms": round(elapsed * 1000, 2)}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = _synthetic_rows(count)
+    scanned, scan_stats = asyncio.run(_run(rows, use_rollups=False))
+    rolled, rollup_stats = asyncio.run(_run(rows, use_rollups=True))
+    same = (
+        abs(scanned["total_expenses"] - rolled["total_expenses"]) < 0.01 * len(rows)
+        and abs(scanned["total_income"] - rolled["total_income"]) < 0.01 * len(rows)
+        and [c["category"] for c in scanned["categories"]] == [c["category"] for c in rolled["categories"]]
+    )
+    print(json.dumps({
+        "transactions": count,
+        "raw_scan": scan_stats,
+        "rollups": rollup_stats,
+        "results_match": same,
+    }, indent=2))
+    if not same:
+        sys.exit("raw scan and rollups disagree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+List response benchmark: bytes on the wire and serialization time per 1k rows.
+
+Builds `/upload/transactions` pages from synthetic PostgREST rows (imported
+statements carry description/reference/balance metadata) and renders them:
+
+- legacy:      the old handler, re-wrapping each row with str()/float(),
+               then FastAPI's `jsonable_encoder` + stdlib `JSONResponse`
+- list_json:   rows as returned, rendered by `ListJSONResponse` (orjson)
+- list_fields: `fields=date,amount,category`, i.e. the narrower select
+               (id and date are always included for the cursor)
+
+For each, reports milliseconds per 1k rows to serialize, body bytes, and
+gzip bytes/time at the configured level (GZIP_COMPRESS_LEVEL) and at
+Starlette's default of 9.
+
+Usage: python backend/benchmarks/bench_list_responses.py [rows] [repeats]
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services.pagination import TRANSACTION_FIELDS, select_fields
+from utils.responses import GZIP_COMPRESS_LEVEL, ORJSON_AVAILABLE, ListJSONResponse
+
+CATEGORIES = ["Groceries", "Dining", "Transportation", "Utilities", "Shopping", "Income", "Rent"]
+
+
+def _rows(count: int):
+    rng = random.Random(9)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "amount": round(-rng.uniform(10, 5000), 2),
+            "category": rng.choice(CATEGORIES),
+            "metadata": {
+                "description": f"UPI-MERCHANT-{rng.randrange(10 ** 6)}-PAYMENT REF {rng.randrange(10 ** 9)}",
+                "reference": f"{rng.randrange(10 ** 12):012d}",
+                "value_date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "balance": round(rng.uniform(0, 500000), 2),
+            },
+            "created_at": "2025-06-01T12:34:56.789012+00:00",
+        })
+    return rows
+
+
+def _legacy(rows) -> bytes:
+    payload = {
+        "user_id": "u1",
+        "transactions": [
+            {
+                "id": str(t.get('id')),
+                "date": str(t.get('date')),
+                "amount": float(t.get('amount', 0)),
+                "category": t.get('category'),
+                "metadata": t.get('metadata'),
+                "created_at": str(t.get('created_at'))
+            }
+            for t in rows
+        ],
+        "limit": len(rows),
+        "offset": 0,
+    }
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def _list(rows) -> bytes:
+    return ListJSONResponse({"user_id": "u1", "transactions": rows, "limit": len(rows), "offset": 0,
+                             "next_cursor": None}).body
+
+
+def _best(fn, repeats):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rows = _rows(count)
+    narrow_columns = select_fields("date,amount,category", TRANSACTION_FIELDS).split(",")
+    narrow = [{column: row[column] for column in narrow_columns} for row in rows]
+    per_1k = 1000 / count
+
+    results = {"rows": count, "orjson": ORJSON_AVAILABLE, "gzip_level": GZIP_COMPRESS_LEVEL}
+    for name, fn in (("legacy", lambda: _legacy(rows)), ("list_json", lambda: _list(rows)),
+                     ("list_fields", lambda: _list(narrow))):
+        seconds, body = _best(fn, repeats)
+        assert json.loads(body)["transactions"][0]["date"] == rows[0]["date"]
+        results[name] = {
+            "serialize_ms_per_1k": round(seconds * 1000 * per_1k, 3),
+            "bytes_per_1k": round(len(body) * per_1k),
+        }
+        for label, level in (("gzip", GZIP_COMPRESS_LEVEL), ("gzip9", 9)):
+            gzip_seconds, compressed = _best(lambda: gzip.compress(body, compresslevel=level), repeats)
+            results[name][f"{label}_bytes_per_1k"] = round(len(compressed) * per_1k)
+            results[name][f"{label}_ms_per_1k"] = round(gzip_seconds * 1000 * per_1k, 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Login throughput benchmark: inline bcrypt vs the password pool.
+
+Fires a burst of concurrent sign-in password checks and, in parallel, a
+heartbeat coroutine that should tick every 10 ms. With inline bcrypt the
+heartbeat stalls for the whole burst; with the pool it keeps ticking.
+
+Usage: python backend/benchmarks/bench_login_throughput.py [burst_size]
+"""
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from auth_utils import get_password_hash, verify_password, verify_password_async, password_pool
+
+TICK_SECONDS = 0.01
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+
+async def _inline_signin(password: str, hashed: str) -> bool:
+    return verify_password(password, hashed)
+
+
+async def _pooled_signin(password: str, hashed: str) -> bool:
+    return await verify_password_async(password, hashed)
+
+
+async def _run(signin, burst: int, password: str, hashed: str) -> dict:
+    stop = asyncio.Event()
+    lags: list = []
+    beat = asyncio.create_task(_heartbeat(stop, lags))
+    await asyncio.sleep(TICK_SECONDS * 2)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(signin(password, hashed) for _ in range(burst)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    lags.sort()
+    return {
+        "logins": burst,
+        "all_verified": all(results),
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(burst / elapsed, 2),
+        "heartbeats": len(lags),
+        "max_loop_lag_ms": round(lags[-1] * 1000, 1) if lags else None,
+        "p99_loop_lag_ms": round(lags[math.ceil(len(lags) * 0.99) - 1] * 1000, 1) if lags else None,
+    }
+
+
+def main():
+    burst = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    password = "benchmark-password-123"
+    hashed = get_password_hash(password)
+    report = {
+        "inline": asyncio.run(_run(_inline_signin, burst, password, hashed)),
+        "pooled": asyncio.run(_run(_pooled_signin, burst, password, hashed)),
+        "pool": password_pool.stats(),
+    }
+    password_pool.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
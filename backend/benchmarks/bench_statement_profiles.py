@@ -0,0 +1,149 @@
+"""
+Statement profile benchmark: compiled column transforms vs a per-row pass.
+
+Generates a synthetic export for each built-in bank profile and converts
+it to date/amount/category two ways:
+
+- row_wise: the client-side pre-massage this replaces, one Python pass per
+  row using `data_cleaner.normalize_amount` / `map_category` and
+  `strptime` over the profile's date formats
+- profile:  `profiles.normalize` on the parsed frame (detection + compiled
+  vectorized transforms)
+
+Both start from the same frame, parsed once by `csv_import.read_upload`
+(parse time is reported separately). Reports seconds and rows/s per profile.
+
+Usage: python backend/benchmarks/bench_statement_profiles.py [rows]
+"""
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from services.csv_import import read_upload
+from utils.data_cleaner import map_category, normalize_amount
+from utils.statement_profiles import profiles
+
+NARRATIONS = [
+    "UPI-SWIGGY-{n}", "POS STARBUCKS COFFEE {n}", "NEFT SALARY ACME LTD {n}", "ATM WDL {n}",
+    "AMAZON PAY INDIA {n}", "BESCOM ELECTRIC BILL {n}", "UBER TRIP {n}", "NETFLIX SUBSCRIPTION",
+    "RENT TRANSFER LANDLORD", "APOLLO PHARMACY {n}",
+]
+
+
+def _indian(amount: float) -> str:
+    """1234567.5 -> '12,34,567.50' (lakh grouping)."""
+    whole, fraction = f"{amount:.2f}".split(".")
+    head, tail = whole[:-3], whole[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return ",".join(groups + [tail]) + "." + fraction
+
+
+def _statement(profile: str, count: int) -> bytes:
+    rng = random.Random(17)
+    start = date(2024, 4, 1)
+    lines = {
+        "hdfc": ["Date,Narration,Chq./Ref.No.,Value Dt,Withdrawal Amt.,Deposit Amt.,Closing Balance"],
+        "sbi": ["Txn Date,Value Date,Description,Ref No./Cheque No.,Debit,Credit,Balance"],
+        "icici": ["S No.,Value Date,Transaction Date,Cheque Number,Transaction Remarks,"
+                  "Withdrawal Amount (INR ),Deposit Amount (INR ),Balance (INR )"],
+        "axis": ["Tran Date,CHQNO,PARTICULARS,DR,CR,BAL,SOL"],
+        "kotak": ["Transaction Date,Description,Chq / Ref No.,Amount,Dr / Cr,Balance"],
+    }[profile]
+    for i in range(count):
+        day = start + timedelta(days=i % 365)
+        narration = rng.choice(NARRATIONS).format(n=rng.randrange(10 ** 6))
+        credit = rng.random() < 0.1
+        amount = _indian(rng.uniform(10, 200000))
+        debit_cell, credit_cell = ("", f'"{amount}"') if credit else (f'"{amount}"', "")
+        balance = f'"{_indian(rng.uniform(0, 5_000_000))}"'
+        ref = f"{rng.randrange(10 ** 6):06d}"
+        if profile == "hdfc":
+            dd = day.strftime("%d/%m/%y")
+            lines.append(f"{dd},{narration},{ref},{dd},{debit_cell},{credit_cell},{balance}")
+        elif profile == "sbi":
+            dd = day.strftime("%d %b %Y")
+            lines.append(f"{dd},{dd},{narration},{ref},{debit_cell},{credit_cell},{balance}")
+        elif profile == "icici":
+            dd = day.strftime("%d/%m/%Y")
+            lines.append(f"{i + 1},{dd},{dd},{ref},{narration},{debit_cell},{credit_cell},{balance}")
+        elif profile == "axis":
+            dd = day.strftime("%d-%m-%Y")
+            lines.append(f"{dd},{ref},{narration},{debit_cell},{credit_cell},{balance},1234")
+        else:
+            dd = day.strftime("%d-%m-%Y")
+            lines.append(f"{dd},{narration},{ref},\"{amount}\",{'CR' if credit else 'DR'},{balance}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _row_wise(frame, compiled) -> int:
+    roles, formats = compiled.roles, compiled.profile.date_formats
+
+    def parse(text):
+        for fmt in formats:
+            try:
+                return datetime.strptime(text.strip(), fmt).date().isoformat()
+            except ValueError:
+                pass
+        return text
+
+    def amount(value):
+        return normalize_amount(value) if isinstance(value, str) and value.strip() else 0.0
+
+    out = []
+    dates = frame[roles["date"]].tolist()
+    narrations = frame[roles["description"]].tolist()
+    if "amount" in roles:
+        signs = [-1.0 if str(d).strip().lower().startswith("d") else 1.0 for d in frame[roles["direction"]]]
+        amounts = [s * abs(amount(a)) for s, a in zip(signs, frame[roles["amount"]].tolist())]
+    else:
+        amounts = [amount(c) - abs(amount(d)) for d, c in zip(frame[roles["debit"]].tolist(),
+                                                              frame[roles["credit"]].tolist())]
+    for d, a, n in zip(dates, amounts, narrations):
+        out.append((parse(d), a, map_category(n)))
+    return len(out)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    results = {"rows": count}
+    for name in ("hdfc", "sbi", "icici", "axis", "kotak"):
+        content = _statement(name, count)
+        start = time.perf_counter()
+        frame = read_upload(content)
+        parse_seconds = time.perf_counter() - start
+        compiled = profiles.detect(frame.columns)
+        assert compiled is not None and compiled.name == name
+
+        start = time.perf_counter()
+        _row_wise(frame, compiled)
+        row_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        normalized = profiles.normalize(frame)
+        profile_seconds = time.perf_counter() - start
+        assert len(normalized) == count
+
+        results[name] = {
+            "file_mb": round(len(content) / 2 ** 20, 1),
+            "parse_seconds": round(parse_seconds, 3),
+            "row_wise": {"seconds": round(row_seconds, 3), "rows_per_second": round(count / row_seconds)},
+            "profile": {"seconds": round(profile_seconds, 3), "rows_per_second": round(count / profile_seconds)},
+            "speedup": round(row_seconds / profile_seconds, 1),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+CSV ingest benchmark: whole-file upload path vs streaming chunked ingest.
+
+Writes a synthetic statement to a temporary file and imports it twice
+against an in-process PostgREST stub that charges a fixed latency per
+request plus a per-row insert cost: once the way the default upload path does it (read, decode,
+parse, validate, one insert) and once through `csv_import.ingest_csv`.
+Reports wall time, rows/s and peak traced Python memory (from a second,
+traced run).
+
+Usage: python backend/benchmarks/bench_streaming_ingest.py [rows] [request_latency_ms] [row_cost_us]
+"""
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+import pandas as pd
+
+import supabase_async
+from services import rollups
+from services.csv_import import ingest_csv, validate_transactions
+
+CATEGORIES = ["groceries", "rent", "utilities", "dining", "transportation", "shopping", "salary"]
+
+
+def _write_statement(path: str, count: int) -> None:
+    rng = random.Random(5)
+    with open(path, "w") as handle:
+        handle.write("date,amount,category,description\n")
+        for i in range(count):
+            handle.write(f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d},{-rng.uniform(10, 5000):.2f},"
+                         f"{rng.choice(CATEGORIES)},card purchase {i}\n")
+
+
+def _install_stub(latency: float, row_cost: float) -> None:
+    async def handler(request):
+        await asyncio.sleep(latency + row_cost * request.content.count(b'"user_id"'))
+        if "/rpc/" in request.url.path:
+            return httpx.Response(200, json=[])
+        if request.method == "GET":
+            return httpx.Response(200, json=[], headers={"content-range": "*/0"})
+        # inserts echo the fingerprints they stored (return=representation)
+        batch = json.loads(request.content)
+        return httpx.Response(201, json=[{"fingerprint": row.get("fingerprint")} for row in batch])
+
+    supabase_async._client = supabase_async.AsyncSupabaseClient(
+        "https://bench.supabase.co", "bench-key", transport=httpx.MockTransport(handler))
+
+
+async def _whole_file(path: str) -> int:
+    with open(path, "rb") as handle:
+        content = handle.read()
+    df = pd.read_csv(io.StringIO(content.decode("utf-8")))
+    payload, _ = validate_transactions(df, "bench-user")
+    await supabase_async.get_async_client().table("transactions").insert(payload, returning="minimal").execute()
+    await rollups.apply_transaction_rows("bench-user", payload)
+    return len(payload)
+
+
+async def _streaming(path: str) -> int:
+    with open(path, "rb") as handle:
+        progress = await ingest_csv(handle, "bench-user")
+    return progress.rows_inserted
+
+
+def _measure(fn, path: str):
+    # timed without tracing (tracemalloc slows allocation-heavy code severalfold)
+    start = time.perf_counter()
+    rows = asyncio.run(fn(path))
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    asyncio.run(fn(path))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 2),
+        "rows_per_second": round(rows / seconds),
+        "peak_traced_mb": round(peak / 2 ** 20, 1),
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+    row_cost = (float(sys.argv[3]) if len(sys.argv) > 3 else 20.0) / 1_000_000
+    _install_stub(latency, row_cost)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.csv")
+        _write_statement(path, count)
+        size_mb = os.path.getsize(path) / 2 ** 20
+        results = {
+            "file_mb": round(size_mb, 1),
+            "request_latency_ms": latency * 1000,
+            "row_cost_us": row_cost * 1_000_000,
+            "whole_file": _measure(_whole_file, path),
+            "streaming": _measure(_streaming, path),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
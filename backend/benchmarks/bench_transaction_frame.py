@@ -0,0 +1,88 @@
+"""
+Bulk transaction read benchmark: JSON row dicts vs CSV into a TransactionFrame.
+
+Encodes synthetic transactions the way PostgREST would (a JSON array and a
+CSV body) and times decoding each into typed date/amount/category columns,
+which is the client-side cost that dominates long histories.
+
+Usage: python backend/benchmarks/bench_transaction_frame.py [rows]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import pandas as pd
+
+from services.transaction_frame import TransactionFrame
+
+CATEGORIES = ["groceries", "rent", "utilities", "dining", "transportation", "shopping", "salary"]
+PAGE_SIZE = 1000
+
+
+def _synthetic_rows(count: int):
+    rng = random.Random(7)
+    rows = []
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        amount = rng.uniform(20000, 90000) if category == "salary" else -rng.uniform(10, 5000)
+        rows.append({
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "date": f"20{15 + i % 10:02d}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "amount": round(amount, 2),
+            "category": category,
+        })
+    return rows
+
+
+def _json_pages(rows):
+    return [json.dumps(rows[i:i + PAGE_SIZE]) for i in range(0, len(rows), PAGE_SIZE)]
+
+
+def _csv_pages(rows):
+    return [pd.DataFrame(rows[i:i + PAGE_SIZE]).to_csv(index=False) for i in range(0, len(rows), PAGE_SIZE)]
+
+
+def _decode_json(pages):
+    records = []
+    for page in pages:
+        records.extend(json.loads(page))
+    frame = pd.DataFrame(records)
+    frame["date"] = pd.to_datetime(frame["date"])
+    frame["amount"] = pd.to_numeric(frame["amount"], errors="coerce").fillna(0)
+    return frame
+
+
+def _time(fn, *args, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rows = _synthetic_rows(count)
+    json_pages, csv_pages = _json_pages(rows), _csv_pages(rows)
+
+    json_seconds = _time(_decode_json, json_pages)
+    csv_seconds = _time(TransactionFrame.from_csv_pages, csv_pages)
+    print(json.dumps({
+        "rows": count,
+        "json_bytes": sum(len(p) for p in json_pages),
+        "csv_bytes": sum(len(p) for p in csv_pages),
+        "json_rows_to_frame_ms": round(json_seconds * 1000, 1),
+        "csv_to_transaction_frame_ms": round(csv_seconds * 1000, 1),
+        "speedup": round(json_seconds / csv_seconds, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Upload parsing benchmark: pandas over decoded text vs the Arrow readers.
+
+Writes a synthetic statement as CSV and Parquet, then parses it in a fresh
+interpreter per reader so peak RSS is not shared between runs:
+
+- pandas_decode: the old upload path, `pd.read_csv(StringIO(content.decode()))`
+- arrow_csv:     `csv_import.read_upload(content)` (multi-threaded, from bytes)
+- parquet:       `csv_import.read_upload(content, "parquet")`
+
+Reports the best parse time of `repeats`, rows/s and peak RSS growth over
+the interpreter's baseline after imports (file bytes already loaded). RSS
+is sampled from /proc/self/statm every millisecond, as `ru_maxrss` is
+updated lazily and overstates short-lived peaks (Linux only).
+
+Usage: python backend/benchmarks/bench_upload_parse.py [rows] [repeats]
+"""
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+CATEGORIES = ["groceries", "rent", "utilities", "dining", "transportation", "shopping", "salary"]
+
+
+def _write_statement(path: str, count: int) -> None:
+    rng = random.Random(11)
+    with open(path, "w") as handle:
+        handle.write("date,amount,category,description,reference\n")
+        for i in range(count):
+            handle.write(f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d},{-rng.uniform(10, 5000):.2f},"
+                         f"{rng.choice(CATEGORIES)},card purchase {i},{rng.randrange(10 ** 8):08d}\n")
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class _PeakRss:
+    """Track peak resident memory with a sampling thread while the block runs."""
+
+    def __enter__(self):
+        self.peak = _rss_mb()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._done.wait(0.001):
+            self.peak = max(self.peak, _rss_mb())
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_mb())
+
+
+def _run(reader: str, path: str, rows: int, repeats: int) -> dict:
+    import pandas as pd
+
+    from services.csv_import import read_upload
+
+    with open(path, "rb") as handle:
+        content = handle.read()
+    baseline = _rss_mb()
+
+    def parse():
+        if reader == "pandas_decode":
+            return pd.read_csv(io.StringIO(content.decode("utf-8")))
+        return read_upload(content, "parquet" if reader == "parquet" else "csv")
+
+    best = float("inf")
+    with _PeakRss() as rss:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            frame = parse()
+            best = min(best, time.perf_counter() - start)
+            del frame
+    return {
+        "file_mb": round(len(content) / 2 ** 20, 1),
+        "parse_seconds": round(best, 3),
+        "rows_per_second": round(rows / best),
+        "peak_rss_growth_mb": round(rss.peak - baseline, 1),
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    import pyarrow.csv
+    import pyarrow.parquet
+
+    results = {"rows": count, "cpu_count": os.cpu_count()}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "statement.csv")
+        parquet_path = os.path.join(tmp, "statement.parquet")
+        _write_statement(csv_path, count)
+        table = pyarrow.csv.read_csv(csv_path, convert_options=pyarrow.csv.ConvertOptions(
+            column_types={"date": "string", "reference": "string"}))
+        pyarrow.parquet.write_table(table, parquet_path)
+        del table
+        for reader, path in (("pandas_decode", csv_path), ("arrow_csv", csv_path), ("parquet", parquet_path)):
+            output = subprocess.run(
+                [sys.executable, __file__, "--run", reader, path, str(count), str(repeats)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[reader] = json.loads(output)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        print(json.dumps(_run(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]))))
+    else:
+        main()
@@ -0,0 +1,18 @@
+-- Migration 004: Per-user token version
+-- Run this in Supabase SQL Editor
+--
+-- Access tokens carry a "ver" claim. Bumping users.token_version (logout
+-- from all devices) invalidates every refresh token issued before the bump.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
+
+-- Logout from all devices: bump the version in one statement and return the
+-- new value, so two logouts never write the same version twice.
+CREATE OR REPLACE FUNCTION bump_token_version(p_user_id UUID)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    UPDATE users SET token_version = token_version + 1
+    WHERE id = p_user_id
+    RETURNING token_version;
+$$;
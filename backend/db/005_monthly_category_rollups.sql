@@ -0,0 +1,117 @@
+-- Migration 005: Monthly category rollups
+-- Run this in Supabase SQL Editor. It ends by backfilling every existing
+-- user; backend/scripts/backfill_rollups.py repairs rollups that drift.
+--
+-- Pre-aggregated sums per (user, month, category) so insights read tens of
+-- rows instead of a user's whole transaction history. The backend applies
+-- deltas through apply_rollup_deltas() on every import and manual expense
+-- write; rebuild_monthly_rollups() recomputes a user from raw rows.
+
+CREATE TABLE IF NOT EXISTS monthly_category_rollups (
+    user_id UUID NOT NULL,
+    month TEXT NOT NULL, -- YYYY-MM
+    category TEXT NOT NULL DEFAULT '',
+    expense_total NUMERIC NOT NULL DEFAULT 0,   -- transactions with amount < 0, stored positive
+    expense_count INTEGER NOT NULL DEFAULT 0,
+    income_total NUMERIC NOT NULL DEFAULT 0,    -- transactions with amount > 0
+    income_count INTEGER NOT NULL DEFAULT 0,
+    manual_expense_total NUMERIC NOT NULL DEFAULT 0,  -- manual_expenses (always positive)
+    manual_expense_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, month, category),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_monthly_category_rollups_user_month
+    ON monthly_category_rollups(user_id, month);
+
+ALTER TABLE monthly_category_rollups ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "users_can_access_own_rollups" ON monthly_category_rollups;
+CREATE POLICY "users_can_access_own_rollups" ON monthly_category_rollups
+    FOR ALL USING (true);
+
+-- Atomically add a batch of deltas:
+-- p_deltas = [{"month": "2025-10", "category": "rent", "expense_total": 12000, "expense_count": 1, ...}, ...]
+CREATE OR REPLACE FUNCTION apply_rollup_deltas(p_user_id UUID, p_deltas JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO monthly_category_rollups AS r (
+        user_id, month, category,
+        expense_total, expense_count, income_total, income_count,
+        manual_expense_total, manual_expense_count, updated_at
+    )
+    SELECT
+        p_user_id,
+        d->>'month',
+        COALESCE(d->>'category', ''),
+        COALESCE((d->>'expense_total')::NUMERIC, 0),
+        COALESCE((d->>'expense_count')::INTEGER, 0),
+        COALESCE((d->>'income_total')::NUMERIC, 0),
+        COALESCE((d->>'income_count')::INTEGER, 0),
+        COALESCE((d->>'manual_expense_total')::NUMERIC, 0),
+        COALESCE((d->>'manual_expense_count')::INTEGER, 0),
+        NOW()
+    FROM jsonb_array_elements(p_deltas) AS d
+    ON CONFLICT (user_id, month, category) DO UPDATE SET
+        expense_total = r.expense_total + EXCLUDED.expense_total,
+        expense_count = r.expense_count + EXCLUDED.expense_count,
+        income_total = r.income_total + EXCLUDED.income_total,
+        income_count = r.income_count + EXCLUDED.income_count,
+        manual_expense_total = r.manual_expense_total + EXCLUDED.manual_expense_total,
+        manual_expense_count = r.manual_expense_count + EXCLUDED.manual_expense_count,
+        updated_at = NOW();
+$$;
+
+-- Recompute one user's rollups from raw transactions and manual_expenses (backfill/repair)
+CREATE OR REPLACE FUNCTION rebuild_monthly_rollups(p_user_id UUID)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    rebuilt INTEGER;
+BEGIN
+    DELETE FROM monthly_category_rollups WHERE user_id = p_user_id;
+
+    INSERT INTO monthly_category_rollups (
+        user_id, month, category,
+        expense_total, expense_count, income_total, income_count,
+        manual_expense_total, manual_expense_count, updated_at
+    )
+    SELECT p_user_id, month, category,
+           SUM(expense_total), SUM(expense_count), SUM(income_total), SUM(income_count),
+           SUM(manual_expense_total), SUM(manual_expense_count), NOW()
+    FROM (
+        SELECT to_char(date, 'YYYY-MM') AS month,
+               COALESCE(category, '') AS category,
+               SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END) AS expense_total,
+               COUNT(*) FILTER (WHERE amount < 0) AS expense_count,
+               SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) AS income_total,
+               COUNT(*) FILTER (WHERE amount > 0) AS income_count,
+               0 AS manual_expense_total,
+               0 AS manual_expense_count
+        FROM transactions
+        WHERE user_id = p_user_id
+        GROUP BY 1, 2
+        UNION ALL
+        SELECT to_char(date, 'YYYY-MM'),
+               COALESCE(category, ''),
+               0, 0, 0, 0,
+               SUM(amount),
+               COUNT(*)
+        FROM manual_expenses
+        WHERE user_id = p_user_id
+        GROUP BY 1, 2
+    ) AS parts
+    GROUP BY month, category;
+
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$;
+
+-- Backfill every existing user, so rollup reads are complete as soon as this
+-- migration is applied (ROLLUPS_ENABLED defaults to true). Rebuilding is
+-- idempotent, so re-running the migration is safe.
+SELECT rebuild_monthly_rollups(id) FROM users;
@@ -0,0 +1,64 @@
+-- Migration 006: Transaction fingerprints for import deduplication
+-- Run this in Supabase SQL Editor (after 003_complete_schema.sql).
+--
+-- Every imported row carries a stable fingerprint of
+--   user_id | date | amount (2 dp) | normalized category | normalized description
+-- plus '#n' for the n-th identical row of the same file (n > 1), hashed with
+-- SHA-256 and truncated to 32 hex characters. The backend computes the same
+-- value in services/dedupe.py; the unique index makes re-imports idempotent.
+
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+
+-- Canonical text of a row, shared by the backfill below
+CREATE OR REPLACE FUNCTION transaction_fingerprint(
+    p_user_id UUID, p_date DATE, p_amount NUMERIC, p_category TEXT, p_description TEXT, p_occurrence BIGINT
+)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT left(encode(sha256(convert_to(
+        p_user_id::TEXT
+        || '|' || to_char(p_date, 'YYYY-MM-DD')
+        || '|' || trim(to_char(round(p_amount, 2), 'FM999999999999990.00'))
+        || '|' || lower(regexp_replace(trim(COALESCE(p_category, '')), '\s+', ' ', 'g'))
+        || '|' || lower(regexp_replace(trim(COALESCE(p_description, '')), '\s+', ' ', 'g'))
+        || CASE WHEN p_occurrence > 1 THEN '#' || p_occurrence::TEXT ELSE '' END,
+        'UTF8')), 'hex'), 32);
+$$;
+
+-- Backfill existing rows; identical rows are numbered so they keep distinct fingerprints
+WITH numbered AS (
+    SELECT
+        id,
+        transaction_fingerprint(
+            user_id, date, amount, category, metadata->>'description',
+            ROW_NUMBER() OVER (
+                PARTITION BY user_id, date, round(amount, 2),
+                    lower(regexp_replace(trim(COALESCE(category, '')), '\s+', ' ', 'g')),
+                    lower(regexp_replace(trim(COALESCE(metadata->>'description', '')), '\s+', ' ', 'g'))
+                ORDER BY created_at, id
+            )
+        ) AS fingerprint
+    FROM transactions
+    WHERE fingerprint IS NULL
+)
+UPDATE transactions t
+SET fingerprint = numbered.fingerprint
+FROM numbered
+WHERE t.id = numbered.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_user_fingerprint
+    ON transactions(user_id, fingerprint);
+
+-- Exact lookup for a batch of candidate fingerprints (one round trip per import chunk)
+CREATE OR REPLACE FUNCTION existing_fingerprints(p_user_id UUID, p_fingerprints TEXT[])
+RETURNS TABLE (fingerprint TEXT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT t.fingerprint
+    FROM transactions t
+    WHERE t.user_id = p_user_id
+      AND t.fingerprint = ANY(p_fingerprints);
+$$;
@@ -0,0 +1,48 @@
+-- Migration 007: Per-user category rules
+-- Run this in Supabase SQL Editor (after 003_complete_schema.sql).
+--
+-- Keyword -> category overrides a user has set. Imports compile them ahead
+-- of the built-in keyword rules (backend/utils/category_engine.py), so a
+-- narration containing `keyword` (case-insensitive) gets `category`.
+-- Lower priority values are checked first.
+
+CREATE TABLE IF NOT EXISTS category_rules (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL,
+    keyword TEXT NOT NULL,
+    category TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE (user_id, keyword)
+);
+
+CREATE INDEX IF NOT EXISTS idx_category_rules_user_priority
+    ON category_rules(user_id, priority);
+
+ALTER TABLE category_rules ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "users_can_access_own_category_rules" ON category_rules;
+CREATE POLICY "users_can_access_own_category_rules" ON category_rules
+    FOR ALL USING (true);
+
+-- Replace a user's rules in one transaction (PUT /upload/category-rules), so a
+-- failed insert leaves the previous rules in place. p_rules is a JSON array of
+-- {"keyword", "category"} in priority order.
+CREATE OR REPLACE FUNCTION replace_category_rules(p_user_id UUID, p_rules JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    inserted INTEGER;
+BEGIN
+    DELETE FROM category_rules WHERE user_id = p_user_id;
+
+    INSERT INTO category_rules (user_id, keyword, category, priority)
+    SELECT p_user_id, rule->>'keyword', rule->>'category', (position - 1)::INTEGER
+    FROM jsonb_array_elements(COALESCE(p_rules, '[]'::jsonb)) WITH ORDINALITY AS rules(rule, position);
+
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+    RETURN inserted;
+END;
+$$;
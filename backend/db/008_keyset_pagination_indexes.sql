@@ -0,0 +1,13 @@
+-- Migration 008: Keyset pagination indexes
+-- Run this in Supabase SQL Editor (after 003_complete_schema.sql).
+--
+-- /upload/transactions and /expenses/list page by (date, id) descending
+-- (backend/services/pagination.py). These indexes serve the per-user order
+-- and the `date < D OR (date = D AND id < ID)` cursor filter directly, so
+-- every page costs the same regardless of how deep it is.
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id
+    ON transactions(user_id, date DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_manual_expenses_user_date_id
+    ON manual_expenses(user_id, date DESC, id DESC);
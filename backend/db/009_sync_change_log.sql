@@ -0,0 +1,165 @@
+-- Migration 009: Change log for delta sync
+-- Run this in Supabase SQL Editor (after 003_complete_schema.sql).
+--
+-- Every insert, update and delete on transactions, manual_expenses, budgets
+-- and goals is recorded in change_log under a per-user sequence number, and
+-- /sync/changes?since=<seq> returns what changed after a client's cursor
+-- (backend/services/sync.py). change_log keeps only the latest entry per row:
+-- an 'upsert' for live rows, a 'delete' tombstone for removed ones.
+--
+-- Sequence numbers come from user_sync_state.last_seq, bumped inside the
+-- writing transaction. The row lock that takes serializes a user's writers,
+-- so a user's changes commit in sequence order and a cursor never skips a
+-- change that commits late.
+
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+ALTER TABLE manual_expenses ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+-- budgets already has updated_at (003)
+
+CREATE TABLE IF NOT EXISTS user_sync_state (
+    user_id UUID PRIMARY KEY,
+    last_seq BIGINT NOT NULL DEFAULT 0,
+    pruned_seq BIGINT NOT NULL DEFAULT 0, -- highest tombstone seq removed by prune_sync_tombstones()
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS change_log (
+    user_id UUID NOT NULL,
+    seq BIGINT NOT NULL,
+    table_name TEXT NOT NULL,
+    row_id UUID NOT NULL,
+    op TEXT NOT NULL CHECK (op IN ('upsert', 'delete')),
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, seq),
+    UNIQUE (user_id, table_name, row_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_change_log_tombstones
+    ON change_log(changed_at) WHERE op = 'delete';
+
+ALTER TABLE user_sync_state ENABLE ROW LEVEL SECURITY;
+ALTER TABLE change_log ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "users_can_access_own_sync_state" ON user_sync_state;
+CREATE POLICY "users_can_access_own_sync_state" ON user_sync_state
+    FOR ALL USING (true);
+
+DROP POLICY IF EXISTS "users_can_access_own_change_log" ON change_log;
+CREATE POLICY "users_can_access_own_change_log" ON change_log
+    FOR ALL USING (true);
+
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$;
+
+-- Statement-level: one sequence bump per user per statement, however many
+-- rows it touched (a CSV import batch is one statement). `changed_rows` is
+-- the transition table named by each trigger below.
+CREATE OR REPLACE FUNCTION log_sync_changes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH changed AS (
+        SELECT c.user_id, c.id,
+               ROW_NUMBER() OVER (PARTITION BY c.user_id ORDER BY c.id) AS n,
+               COUNT(*) OVER (PARTITION BY c.user_id) AS total
+        FROM changed_rows c
+        -- rows removed by deleting their user need no tombstone
+        WHERE EXISTS (SELECT 1 FROM users u WHERE u.id = c.user_id)
+    ),
+    bumped AS (
+        INSERT INTO user_sync_state AS s (user_id, last_seq)
+        SELECT user_id, MAX(total) FROM changed GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET last_seq = s.last_seq + EXCLUDED.last_seq
+        RETURNING s.user_id, s.last_seq
+    )
+    INSERT INTO change_log (user_id, seq, table_name, row_id, op, changed_at)
+    SELECT c.user_id, b.last_seq - c.total + c.n, TG_TABLE_NAME, c.id,
+           CASE TG_OP WHEN 'DELETE' THEN 'delete' ELSE 'upsert' END, NOW()
+    FROM changed c
+    JOIN bumped b ON b.user_id = c.user_id
+    ON CONFLICT (user_id, table_name, row_id) DO UPDATE SET
+        seq = EXCLUDED.seq,
+        op = EXCLUDED.op,
+        changed_at = EXCLUDED.changed_at;
+    RETURN NULL;
+END;
+$$;
+
+-- Backfill: every existing row becomes an 'upsert' entry, so since=0 is a full sync
+WITH existing AS (
+    SELECT user_id, 'transactions' AS table_name, id FROM transactions
+    UNION ALL SELECT user_id, 'manual_expenses', id FROM manual_expenses
+    UNION ALL SELECT user_id, 'budgets', id FROM budgets
+    UNION ALL SELECT user_id, 'goals', id FROM goals
+)
+INSERT INTO change_log (user_id, seq, table_name, row_id, op)
+SELECT user_id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY table_name, id), table_name, id, 'upsert'
+FROM existing
+WHERE NOT EXISTS (SELECT 1 FROM change_log);
+
+INSERT INTO user_sync_state AS s (user_id, last_seq)
+SELECT user_id, MAX(seq) FROM change_log GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET last_seq = GREATEST(s.last_seq, EXCLUDED.last_seq);
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['transactions', 'manual_expenses', 'budgets', 'goals'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_set_updated_at', t);
+        EXECUTE format('CREATE TRIGGER %I BEFORE UPDATE ON %I FOR EACH ROW EXECUTE FUNCTION set_updated_at()',
+                       t || '_set_updated_at', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_sync_insert', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS changed_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION log_sync_changes()', t || '_sync_insert', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_sync_update', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING NEW TABLE AS changed_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION log_sync_changes()', t || '_sync_update', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_sync_delete', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS changed_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION log_sync_changes()', t || '_sync_delete', t);
+    END LOOP;
+END;
+$$;
+
+-- Drop tombstones older than p_older_than (schedule with pg_cron, e.g. daily);
+-- returns the number of tombstones deleted.
+-- Clients whose cursor predates a removed tombstone are told to resync from 0.
+CREATE OR REPLACE FUNCTION prune_sync_tombstones(p_older_than INTERVAL DEFAULT INTERVAL '90 days')
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    pruned INTEGER;
+BEGIN
+    WITH removed AS (
+        DELETE FROM change_log
+        WHERE op = 'delete' AND changed_at < NOW() - p_older_than
+        RETURNING user_id, seq
+    ),
+    horizon AS (
+        SELECT user_id, MAX(seq) AS seq FROM removed GROUP BY user_id
+    ),
+    advanced AS (
+        UPDATE user_sync_state s
+        SET pruned_seq = GREATEST(s.pruned_seq, h.seq)
+        FROM horizon h
+        WHERE s.user_id = h.user_id
+        RETURNING s.user_id
+    )
+    -- data-modifying CTEs run whether or not they are read
+    SELECT count(*) INTO pruned FROM removed;
+
+    RETURN pruned;
+END;
+$$;
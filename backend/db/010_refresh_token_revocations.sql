@@ -0,0 +1,39 @@
+-- Migration 010: Used and revoked refresh tokens
+-- Run this in Supabase SQL Editor (after 004_token_version.sql).
+--
+-- Refresh tokens are single use: /auth/refresh records the presented
+-- token's jti here before issuing a new pair, and /auth/logout records the
+-- refresh token it is given. A jti that is already present is refused, so
+-- a rotated or logged-out refresh token stops working on every worker and
+-- across restarts, not only in the process that saw it. Rows are only
+-- needed until the token would have expired anyway.
+
+CREATE TABLE IF NOT EXISTS revoked_refresh_tokens (
+    jti TEXT PRIMARY KEY,
+    user_id UUID NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    revoked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_refresh_tokens_expires_at ON revoked_refresh_tokens(expires_at);
+
+ALTER TABLE revoked_refresh_tokens ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "users_can_access_own_revoked_refresh_tokens" ON revoked_refresh_tokens;
+CREATE POLICY "users_can_access_own_revoked_refresh_tokens" ON revoked_refresh_tokens
+    FOR ALL USING (true);
+
+-- Drop entries for tokens past their expiry (schedule with pg_cron, e.g. daily).
+CREATE OR REPLACE FUNCTION prune_revoked_refresh_tokens()
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    pruned INTEGER;
+BEGIN
+    DELETE FROM revoked_refresh_tokens WHERE expires_at < NOW();
+    GET DIAGNOSTICS pruned = ROW_COUNT;
+    RETURN pruned;
+END;
+$$;
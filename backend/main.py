@@ -44,6 +44,10 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type", "Accept"],
 )
 
+# Compress larger responses (list pages, CSV/NDJSON exports) for clients that accept gzip
+from utils.responses import GZIP_COMPRESS_LEVEL, GZIP_MINIMUM_SIZE, ExportGZipMiddleware
+app.add_middleware(ExportGZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -53,7 +57,7 @@ async def health_check():
 from routes import auth, questions, upload, finance, debug
 from routes import advisor as advisor_routes
 from routes import chat_proxy as chat_routes
-from routes import budgets, expenses, goals, investments
+from routes import budgets, expenses, goals, investments, transactions, sync
 
 app.include_router(auth.router, prefix="/auth", tags=["authentication"])
 app.include_router(questions.router, prefix="/questions", tags=["onboarding"])
@@ -63,6 +67,8 @@ app.include_router(budgets.router, prefix="/budgets", tags=["budgets"])
 app.include_router(expenses.router, prefix="/expenses", tags=["expenses"])
 app.include_router(goals.router, prefix="/goals", tags=["goals"])
 app.include_router(investments.router, prefix="/investments", tags=["investments"])
+app.include_router(transactions.router, prefix="/transactions", tags=["transactions"])
+app.include_router(sync.router, prefix="/sync", tags=["sync"])
 
 # Optional: Predict router (requires PyTorch - comment out if not installed)
 try:
@@ -94,6 +100,28 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"Supabase client initialization issue: {e}")
         logger.warning("Ensure SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY are set in environment")
+    
+    # Open the shared async PostgREST connection pool
+    try:
+        from supabase_async import init_async_client
+        await init_async_client()
+        logger.info("Async Supabase client initialized successfully")
+    except Exception as e:
+        logger.warning(f"Async Supabase client initialization issue: {e}")
+    
+    # Start the background CSV import workers
+    from services.import_jobs import import_jobs
+    import_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release application resources on shutdown"""
+    from auth_utils import password_pool
+    from supabase_async import close_async_client
+    from services.import_jobs import import_jobs
+    await import_jobs.stop()
+    password_pool.shutdown()
+    await close_async_client()
 
 if __name__ == "__main__":
     import uvicorn
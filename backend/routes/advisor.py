@@ -89,43 +89,34 @@ def _get_default_profile(user_id: str) -> Dict[str, Any]:
     }
 
 
-def _load_latest_summary(user_id: str) -> Dict[str, Any]:
+async def _load_latest_summary(user_id: str) -> Dict[str, Any]:
     """Load real transaction summary from database"""
     try:
-        from supabase_client import get_server_client
+        from services.ledger_cache import get_ledger
         from datetime import datetime, timedelta
         import pandas as pd
         
-        supabase = get_server_client()
-        
-        # Get transactions from last 3 months
+        # Get transactions from last 3 months as typed columns (from the cached ledger)
         three_months_ago = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
         
-        transactions_result = supabase.table("transactions").select("*").eq("user_id", user_id).gte("date", three_months_ago).execute()
+        ledger = await get_ledger(user_id)
+        transactions = ledger.to_frame(start_date=three_months_ago)
         
-        if not transactions_result.data:
+        if transactions.is_empty:
             return _get_default_summary()
         
-        # Process transactions
-        df = pd.DataFrame(transactions_result.data)
-        df['date'] = pd.to_datetime(df['date'])
-        df['amount'] = pd.to_numeric(df['amount'], errors='coerce').fillna(0)
-        
         # Calculate last month spending
         last_month = datetime.now().replace(day=1) - timedelta(days=1)
         last_month_start = last_month.replace(day=1)
         last_month_end = last_month
         
-        last_month_transactions = df[
-            (df['date'] >= last_month_start) & 
-            (df['date'] <= last_month_end)
-        ]
+        last_month_transactions = transactions.between(last_month_start.date(), last_month_end.date())
         
-        last_month_spend = abs(last_month_transactions['amount'].sum()) if not last_month_transactions.empty else 0.0
+        last_month_spend = abs(last_month_transactions.amounts.sum()) if not last_month_transactions.is_empty else 0.0
         
         # Calculate top categories from all transactions
-        df['amount'] = df['amount'].abs()  # Make all amounts positive for spending analysis
-        category_totals = df.groupby('category')['amount'].sum().sort_values(ascending=False)
+        spend = pd.Series(abs(transactions.amounts))  # Make all amounts positive for spending analysis
+        category_totals = spend.groupby(transactions.categories, observed=True).sum().sort_values(ascending=False)
         
         top_categories = [
             {"category": cat, "total": float(total)} 
@@ -135,8 +126,8 @@ def _load_latest_summary(user_id: str) -> Dict[str, Any]:
         return {
             "last_month_spend": float(last_month_spend),
             "top_categories": top_categories,
-            "total_transactions": len(df),
-            "avg_monthly_spend": float(df.groupby(df['date'].dt.to_period('M'))['amount'].sum().mean()) if not df.empty else 0.0,
+            "total_transactions": len(transactions),
+            "avg_monthly_spend": float(spend.groupby(transactions.months).sum().mean()),
         }
     except Exception as e:
         print(f"Error loading transaction summary: {e}")
@@ -481,7 +472,7 @@ def advisor_generator(query: str, profile: Dict[str, Any], summary: Dict[str, An
 async def advisor_endpoint(req: AdvisorRequest, current_user = Depends(get_current_user)):
     try:
         profile = _load_user_profile(req.user_id)
-        summary = _load_latest_summary(req.user_id)
+        summary = await _load_latest_summary(req.user_id)
 
         from utils.router import router as query_router
         route, rule = query_router.route_with_reason(req.query)
@@ -1,12 +1,22 @@
 from fastapi import APIRouter, HTTPException, Header
 from pydantic import BaseModel, EmailStr, field_validator
+from postgrest.exceptions import APIError
 from typing import Optional, List, Dict, Any
 import uuid
 from datetime import datetime, date
 import re
 
 from supabase_client import get_server_client
-from auth_utils import get_password_hash, verify_password, create_access_token, verify_token
+from auth_utils import (
+    get_password_hash_async, verify_password_async, verify_token, PasswordPoolSaturated,
+    create_user_access_token, create_refresh_token, token_type, revoked_tokens,
+    ACCESS_TOKEN_TYPE, REFRESH_TOKEN_TYPE,
+)
+from services.principal_cache import Principal, principal_cache, invalidate_principal
+from services.rollups import apply_transaction_rows
+from services.ledger_cache import record_transactions
+from services.dedupe import DEDUPE_ENABLED, assign_fingerprints
+from services.refresh_tokens import RefreshTokenStoreMissing, claim_refresh_token, revoke_refresh_token
 
 router = APIRouter()
 
@@ -63,8 +73,16 @@ class AuthResponse(BaseModel):
     message: str
     user_id: Optional[str] = None
     access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
     onboarding_complete: Optional[bool] = False
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+    all_devices: bool = False
+
 class UserResponse(BaseModel):
     id: str
     email: str
@@ -72,6 +90,21 @@ class UserResponse(BaseModel):
     created_at: datetime
     onboarding_complete: bool
 
+def issue_tokens(user_id: str, email: str, name: str, onboarding_complete: bool,
+                 token_version: int = 0, created_at: Optional[str] = None):
+    """Mint an (access, refresh) token pair for a user"""
+    access_token = create_user_access_token(
+        user_id, email, name, onboarding_complete,
+        token_version=token_version, created_at=created_at,
+    )
+    refresh_token = create_refresh_token(user_id, token_version=token_version)
+    return access_token, refresh_token
+
+def _is_onboarding_complete(sb, user_id: str) -> bool:
+    """Return True once the user has answered all 15 onboarding questions"""
+    questions_result = sb.table("user_questions").select("id").eq("user_id", user_id).execute()
+    return len(questions_result.data) >= 15 if questions_result.data else False
+
 @router.post("/signup", response_model=AuthResponse)
 async def signup(request: SignupRequest):
     """
@@ -91,7 +124,7 @@ async def signup(request: SignupRequest):
         
         # Hash the password (truncation is handled inside get_password_hash if needed)
         # The Pydantic validator already checks password length
-        password_hash = get_password_hash(request.password)
+        password_hash = await get_password_hash_async(request.password)
         
         new_user = {
             "id": user_id,
@@ -105,22 +138,46 @@ async def signup(request: SignupRequest):
         
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to create user")
+        invalidate_principal(user_id)
         
-        # Create access token
-        access_token = create_access_token(data={"sub": user_id})
+        # Create access and refresh tokens
+        access_token, refresh_token = issue_tokens(
+            user_id, request.email, request.full_name, False, created_at=new_user["created_at"]
+        )
         
         return AuthResponse(
             success=True,
             message="User registered successfully",
             user_id=user_id,
             access_token=access_token,
+            refresh_token=refresh_token,
             onboarding_complete=False  # New users haven't completed onboarding
         )
     except HTTPException:
         raise
+    except PasswordPoolSaturated:
+        raise HTTPException(status_code=503, detail="Server is busy, please retry shortly")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def _select_user(sb, column: str, value: str, columns: str):
+    """Select a user by `column`; before db/004 adds users.token_version, retry without it (version 0)"""
+    try:
+        return sb.table("users").select(f"{columns}, token_version").eq(column, value).execute()
+    except APIError as e:
+        # 42703: undefined column
+        if e.code != "42703":
+            raise
+        return sb.table("users").select(columns).eq(column, value).execute()
+
+def _bump_token_version(sb, user_id: str) -> int:
+    """Increment users.token_version in the database and return the stored value"""
+    # the token's "ver" claim may be stale, so the increment must not start from it
+    result = sb.rpc("bump_token_version", {"p_user_id": user_id}).execute()
+    if result.data is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return int(result.data)
+
 @router.post("/signin", response_model=AuthResponse)
 async def signin(request: SigninRequest):
     """
@@ -130,37 +187,66 @@ async def signin(request: SigninRequest):
         sb = get_server_client()
         
         # Check if user exists and verify password
-        result = sb.table("users").select("id, email, name, password_hash").eq("email", request.email).execute()
+        result = _select_user(sb, "email", request.email, "id, email, name, password_hash, created_at")
         
         if not result.data or len(result.data) == 0:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         user = result.data[0]
         
-        if not verify_password(request.password, user["password_hash"]):
+        if not await verify_password_async(request.password, user["password_hash"]):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         user_id = str(user["id"])
         
         # Check if user has completed onboarding (answered 15 questions)
-        questions_result = sb.table("user_questions").select("id").eq("user_id", user_id).execute()
-        onboarding_complete = len(questions_result.data) >= 15 if questions_result.data else False
+        onboarding_complete = _is_onboarding_complete(sb, user_id)
         
-        # Create access token
-        access_token = create_access_token(data={"sub": user_id})
+        # Create access and refresh tokens
+        access_token, refresh_token = issue_tokens(
+            user_id, user["email"], user["name"], onboarding_complete,
+            token_version=user.get("token_version") or 0, created_at=user.get("created_at"),
+        )
         
         return AuthResponse(
             success=True,
             message="User authenticated successfully",
             user_id=user_id,
             access_token=access_token,
+            refresh_token=refresh_token,
             onboarding_complete=onboarding_complete
         )
     except HTTPException:
         raise
+    except PasswordPoolSaturated:
+        raise HTTPException(status_code=503, detail="Server is busy, please retry shortly")
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+def _parse_created_at(created_at_str: str) -> datetime:
+    """Parse a Supabase timestamp, tolerating variable-length microseconds."""
+    try:
+        # Handle microseconds with different lengths
+        if "." in created_at_str and "+" in created_at_str:
+            # Split at the timezone part
+            tz_part = created_at_str[created_at_str.find("+"):]
+            main_part = created_at_str[:created_at_str.find("+")]
+            if "." in main_part:
+                # Ensure microseconds are 6 digits
+                date_part, time_part = main_part.split("T")
+                if "." in time_part:
+                    time_base, microsec = time_part.split(".")
+                    microsec = microsec.ljust(6, "0")[:6]  # Pad or truncate to 6 digits
+                    main_part = f"{date_part}T{time_base}.{microsec}"
+            created_at_str = main_part + tz_part
+        elif created_at_str.endswith("Z"):
+            created_at_str = created_at_str.replace("Z", "+00:00")
+        
+        return datetime.fromisoformat(created_at_str)
+    except ValueError:
+        # If all else fails, use current time
+        return datetime.utcnow()
+
 async def get_current_user(authorization: str = Header(None)):
     """Get current user from JWT token"""
     if not authorization or not authorization.startswith("Bearer "):
@@ -176,9 +262,32 @@ async def get_current_user(authorization: str = Header(None)):
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
+    if token_type(payload) != ACCESS_TOKEN_TYPE:
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    
+    if revoked_tokens.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    
+    # Self-contained tokens carry everything handlers need; no database round trip
+    if "ver" in payload and "email" in payload:
+        created_at = payload.get("created_at")
+        return Principal(
+            id=user_id,
+            email=payload["email"],
+            name=payload.get("name") or "",
+            created_at=_parse_created_at(created_at) if created_at else datetime.utcnow(),
+            onboarding_complete=bool(payload.get("onboarding_complete")),
+            token_version=int(payload["ver"]),
+        )
+    
+    # Legacy subject-only tokens are resolved against Supabase
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
     # Verify user still exists via Supabase
     sb = get_server_client()
-    result = sb.table("users").select("id, email, name, created_at").eq("id", user_id).execute()
+    result = _select_user(sb, "id", user_id, "id, email, name, created_at")
     
     if not result.data or len(result.data) == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -186,41 +295,18 @@ async def get_current_user(authorization: str = Header(None)):
     user = result.data[0]
     
     # Check onboarding status
-    questions_result = sb.table("user_questions").select("id").eq("user_id", user_id).execute()
-    onboarding_complete = len(questions_result.data) >= 15 if questions_result.data else False
+    onboarding_complete = _is_onboarding_complete(sb, user_id)
     
-    # Create a simple object with attributes for compatibility
-    class UserObject:
-        def __init__(self, data, onboarding_complete):
-            self.id = data["id"]
-            self.email = data["email"]
-            self.name = data["name"]
-            # Fix datetime parsing for Supabase format
-            created_at_str = data["created_at"]
-            try:
-                # Handle microseconds with different lengths
-                if "." in created_at_str and "+" in created_at_str:
-                    # Split at the timezone part
-                    tz_part = created_at_str[created_at_str.find("+"):]
-                    main_part = created_at_str[:created_at_str.find("+")]
-                    if "." in main_part:
-                        # Ensure microseconds are 6 digits
-                        date_part, time_part = main_part.split("T")
-                        if "." in time_part:
-                            time_base, microsec = time_part.split(".")
-                            microsec = microsec.ljust(6, "0")[:6]  # Pad or truncate to 6 digits
-                            main_part = f"{date_part}T{time_base}.{microsec}"
-                    created_at_str = main_part + tz_part
-                elif created_at_str.endswith("Z"):
-                    created_at_str = created_at_str.replace("Z", "+00:00")
-                
-                self.created_at = datetime.fromisoformat(created_at_str)
-            except ValueError:
-                # If all else fails, use current time
-                self.created_at = datetime.utcnow()
-            self.onboarding_complete = onboarding_complete
-    
-    return UserObject(user, onboarding_complete)
+    principal = Principal(
+        id=user["id"],
+        email=user["email"],
+        name=user["name"],
+        created_at=_parse_created_at(user["created_at"]),
+        onboarding_complete=onboarding_complete,
+        token_version=user.get("token_version") or 0,
+    )
+    principal_cache.put(user_id, principal)
+    return principal
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user = Header(None, alias="Authorization")):
@@ -256,6 +342,86 @@ async def check_onboarding_status(authorization: str = Header(None, alias="Autho
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/refresh", response_model=AuthResponse)
+async def refresh_access_token(request: RefreshRequest):
+    """
+    Exchange a refresh token for a new access/refresh token pair
+    """
+    payload = verify_token(request.refresh_token)
+    if not payload or token_type(payload) != REFRESH_TOKEN_TYPE or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if revoked_tokens.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+    
+    try:
+        user_id = str(payload["sub"])
+        sb = get_server_client()
+        result = _select_user(sb, "id", user_id, "id, email, name, created_at")
+        if not result.data:
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+        
+        user = result.data[0]
+        token_version = user.get("token_version") or 0
+        if int(payload.get("ver") or 0) != token_version:
+            raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+        
+        # Rotate: the presented refresh token can only be used once, on any worker
+        revoked_tokens.revoke_token(payload)
+        if not claim_refresh_token(sb, payload):
+            raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+        
+        onboarding_complete = _is_onboarding_complete(sb, user_id)
+        access_token, refresh_token = issue_tokens(
+            user_id, user["email"], user["name"], onboarding_complete,
+            token_version=token_version, created_at=user.get("created_at"),
+        )
+        
+        return AuthResponse(
+            success=True,
+            message="Token refreshed successfully",
+            user_id=user_id,
+            access_token=access_token,
+            refresh_token=refresh_token,
+            onboarding_complete=onboarding_complete
+        )
+    except HTTPException:
+        raise
+    except RefreshTokenStoreMissing as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+@router.post("/logout")
+async def logout(request: LogoutRequest, authorization: str = Header(None, alias="Authorization")):
+    """
+    Revoke the presented access token (and refresh token, if given).
+    With all_devices=true, every token issued so far for the user is revoked.
+    """
+    user = await get_current_user(authorization=authorization)
+    revoked_tokens.revoke_token(verify_token(authorization.split(" ")[1]))
+    
+    if request.refresh_token:
+        refresh_payload = verify_token(request.refresh_token)
+        if refresh_payload and str(refresh_payload.get("sub")) == str(user.id):
+            revoked_tokens.revoke_token(refresh_payload)
+            if token_type(refresh_payload) == REFRESH_TOKEN_TYPE:
+                try:
+                    revoke_refresh_token(get_server_client(), refresh_payload)
+                except Exception as e:
+                    raise HTTPException(status_code=500, detail=str(e))
+    
+    if request.all_devices:
+        try:
+            new_version = _bump_token_version(get_server_client(), str(user.id))
+            revoked_tokens.revoke_user(str(user.id), new_version)
+            invalidate_principal(user.id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    return {"success": True, "message": "Logged out"}
+
 class CompleteSignupRequest(BaseModel):
     email: EmailStr
     password: str
@@ -303,7 +469,7 @@ async def complete_signup(request: CompleteSignupRequest):
         
         # Create new user with hashed password
         user_id = str(uuid.uuid4())
-        password_hash = get_password_hash(request.password)
+        password_hash = await get_password_hash_async(request.password)
         
         new_user = {
             "id": user_id,
@@ -338,6 +504,7 @@ async def complete_signup(request: CompleteSignupRequest):
                 sb.table("users").delete().eq("id", user_id).execute()
             except:
                 pass
+            invalidate_principal(user_id)
             raise HTTPException(status_code=500, detail="Failed to save questions")
         
         # Prepare transactions for insertion (if any)
@@ -369,6 +536,9 @@ async def complete_signup(request: CompleteSignupRequest):
             
             # Insert transactions
             if transaction_rows:
+                if DEDUPE_ENABLED:
+                    # fingerprints let later uploads of the same statement skip these rows
+                    assign_fingerprints(user_id, transaction_rows)
                 transactions_result = sb.table('transactions').insert(transaction_rows).execute()
                 if getattr(transactions_result, 'error', None):
                     # If transactions fail, clean up user and questions
@@ -377,19 +547,29 @@ async def complete_signup(request: CompleteSignupRequest):
                         sb.table("users").delete().eq("id", user_id).execute()
                     except:
                         pass
+                    invalidate_principal(user_id)
                     raise HTTPException(status_code=500, detail="Failed to save transactions")
+                await apply_transaction_rows(user_id, transaction_rows)
+                record_transactions(user_id, transaction_rows)
+        
+        invalidate_principal(user_id)
         
-        # Create access token
-        access_token = create_access_token(data={"sub": user_id})
+        # Create access and refresh tokens
+        access_token, refresh_token = issue_tokens(
+            user_id, request.email, new_user["name"], True, created_at=new_user["created_at"]
+        )
         
         return AuthResponse(
             success=True,
             message="Account created successfully with all onboarding data",
             user_id=user_id,
             access_token=access_token,
+            refresh_token=refresh_token,
             onboarding_complete=True  # User has completed all onboarding steps
         )
     except HTTPException:
         raise
+    except PasswordPoolSaturated:
+        raise HTTPException(status_code=503, detail="Server is busy, please retry shortly")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
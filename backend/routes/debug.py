@@ -1,6 +1,12 @@
 """Debug endpoints to test Supabase connectivity and permissions"""
 from fastapi import APIRouter, HTTPException
 from supabase_client import get_server_client
+from services.principal_cache import principal_cache, invalidate_principal
+from services.ledger_cache import ledger_cache, invalidate_ledger
+from services.dedupe import fingerprint_index
+from services.category_rules import category_rule_cache
+from utils.category_engine import engine_stats
+from auth_utils import password_pool
 import uuid
 from datetime import datetime
 
@@ -51,6 +57,10 @@ async def test_supabase_connection():
                 
                 # Clean up test user
                 sb.table("users").delete().eq("id", test_user_id).execute()
+                invalidate_principal(test_user_id)
+                invalidate_ledger(test_user_id)
+                fingerprint_index.invalidate(test_user_id)
+                category_rule_cache.invalidate(test_user_id)
             else:
                 response["tests"]["insert_user"] = {
                     "status": "FAIL",
@@ -98,3 +108,32 @@ async def list_users():
             detail=f"Failed to list users: {str(e)}"
         )
 
+
+@router.get("/debug/auth-cache")
+async def auth_cache_stats():
+    """Report principal cache hit/miss counters"""
+    return principal_cache.stats()
+
+
+@router.get("/debug/password-pool")
+async def password_pool_stats():
+    """Report password hashing pool queue depth and throughput"""
+    return password_pool.stats()
+
+
+@router.get("/debug/ledger-cache")
+async def ledger_cache_stats():
+    """Report ledger cache residency, bytes and hit/miss counters"""
+    return ledger_cache.stats()
+
+
+@router.get("/debug/fingerprint-index")
+async def fingerprint_index_stats():
+    """Report dedupe filter residency and exact-lookup counters"""
+    return fingerprint_index.stats()
+
+
+@router.get("/debug/category-engine")
+async def category_engine_stats():
+    """Report category rule hits, fallbacks and memo counters"""
+    return engine_stats()
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Any
 from datetime import datetime, date
 import uuid
 
 from routes.auth import get_current_user
 from supabase_client import get_server_client
+from supabase_async import get_async_client, fetch_all
+from services.rollups import apply_manual_expense_rows
+from services.manual_expenses import EXPENSE_BULK_MAX_ITEMS, create_expenses
+from services.pagination import EXPENSE_FIELDS, CursorError, FieldsError, keyset_page, keyset_query, select_fields
+from utils.responses import ListJSONResponse
 
 router = APIRouter()
 
@@ -16,6 +21,10 @@ class ExpenseCreate(BaseModel):
     description: Optional[str] = None
     expense_type: str = 'one-time'  # 'daily', 'monthly', 'one-time'
 
+class ExpenseBulkCreate(BaseModel):
+    # items are validated one by one by the service, so one bad item does not reject the batch
+    expenses: List[Any]
+
 class ExpenseResponse(BaseModel):
     id: str
     user_id: str
@@ -57,6 +66,8 @@ async def add_expense(
         if not resp.data or len(resp.data) == 0:
             raise HTTPException(status_code=500, detail="Failed to add expense: No data returned from database")
         
+        await apply_manual_expense_rows(user_id, [expense_data])
+        
         return {
             "success": True,
             "expense_id": expense_data['id'],
@@ -71,19 +82,56 @@ async def add_expense(
         error_detail = f"{str(e)}\n{traceback.format_exc()}"
         raise HTTPException(status_code=500, detail=f"Failed to add expense: {error_detail}")
 
+@router.post("/bulk")
+async def add_expenses_bulk(
+    payload: ExpenseBulkCreate,
+    current_user = Depends(get_current_user)
+):
+    """Add up to EXPENSE_BULK_MAX_ITEMS manual expenses in one request.
+
+    Returns one result per submitted expense, in order: its new `expense_id`,
+    or the validation or insert `error` that kept it out.
+    """
+    try:
+        user_id = str(current_user.id)
+        if not payload.expenses:
+            raise HTTPException(status_code=400, detail="No expenses provided")
+        if len(payload.expenses) > EXPENSE_BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {EXPENSE_BULK_MAX_ITEMS} expenses per request, got {len(payload.expenses)}"
+            )
+        
+        outcome = await create_expenses(user_id, payload.expenses)
+        return {
+            "success": outcome["failed"] == 0,
+            **outcome
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to add expenses: {str(e)}")
+
 @router.get("/list")
 async def get_expenses(
     month: Optional[str] = None,
-    limit: int = 100,
-    offset: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user = Depends(get_current_user)
 ):
-    """Get user's manual expenses with optional month filter"""
+    """Get user's manual expenses with optional month filter, newest first.
+
+    Pass the returned `next_cursor` as `cursor` for the next page; `offset` paging still works.
+    `fields` (e.g. `date,amount,category`) limits the columns returned.
+    """
     try:
         user_id = str(current_user.id)
         sb = get_server_client()
         
-        query = sb.table('manual_expenses').select('*').eq('user_id', user_id)
+        query = sb.table('manual_expenses').select(select_fields(fields, EXPENSE_FIELDS, '*')).eq('user_id', user_id)
         
         if month:
             # Filter by month (YYYY-MM)
@@ -97,18 +145,19 @@ async def get_expenses(
             
             query = query.gte('date', start_date).lt('date', end_date)
         
-        query = query.order('date', desc=True).range(offset, offset + limit - 1)
-        resp = query.execute()
+        resp = keyset_query(query, limit, cursor, offset).execute()
+        expenses, next_cursor = keyset_page(resp.data or [], limit)
         
-        expenses = resp.data or []
-        
-        return {
+        return ListJSONResponse({
             "expenses": expenses,
             "total": len(expenses),
             "limit": limit,
-            "offset": offset
-        }
+            "offset": offset,
+            "next_cursor": next_cursor
+        })
         
+    except (CursorError, FieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -120,9 +169,9 @@ async def get_expense_summary(
     """Get expense summary by category"""
     try:
         user_id = str(current_user.id)
-        sb = get_server_client()
+        sb = get_async_client()
         
-        query = sb.table('manual_expenses').select('category, amount').eq('user_id', user_id)
+        query = sb.table('manual_expenses').select('id, category, amount').eq('user_id', user_id)
         
         if month:
             start_date = f"{month}-01"
@@ -133,8 +182,7 @@ async def get_expense_summary(
                 end_date = f"{year}-{int(mon)+1:02d}-01"
             query = query.gte('date', start_date).lt('date', end_date)
         
-        resp = query.execute()
-        expenses = resp.data or []
+        expenses = await fetch_all(query)
         
         # Aggregate by category
         summary = {}
@@ -170,12 +218,13 @@ async def delete_expense(
         sb = get_server_client()
         
         # Verify ownership
-        resp = sb.table('manual_expenses').select('id').eq('id', expense_id).eq('user_id', user_id).execute()
+        resp = sb.table('manual_expenses').select('id, date, amount, category').eq('id', expense_id).eq('user_id', user_id).execute()
         
         if not resp.data:
             raise HTTPException(status_code=404, detail="Expense not found")
         
         sb.table('manual_expenses').delete().eq('id', expense_id).execute()
+        await apply_manual_expense_rows(user_id, resp.data, sign=-1)
         
         return {"success": True, "message": "Expense deleted"}
         
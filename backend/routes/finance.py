@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional
 
 from routes.auth import get_current_user
-from services.insights import get_total_expenses, get_total_income, get_expense_by_category, get_monthly_trend
+from services.insights import get_month_summary, get_monthly_trend
 
 
 router = APIRouter()
@@ -19,16 +19,14 @@ async def finance_summary(
     """
     try:
         user_id = str(current_user.id)
-        total_expenses = get_total_expenses(user_id, month)
-        total_income = get_total_income(user_id, month)
-        by_category = get_expense_by_category(user_id, month)
+        summary = await get_month_summary(user_id, month)
         return {
             "user_id": user_id,
             "month": month,
-            "total_expenses": total_expenses,
-            "total_income": total_income,
-            "month_saving": total_income - total_expenses,
-            "categories": by_category,
+            "total_expenses": summary["total_expenses"],
+            "total_income": summary["total_income"],
+            "month_saving": summary["total_income"] - summary["total_expenses"],
+            "categories": summary["categories"],
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -37,16 +35,19 @@ async def finance_summary(
 @router.get("/trend")
 async def finance_trend(
     months: int = Query(3, ge=1, le=24, description="Number of recent months"),
+    series: str = Query("expense", pattern="^(expense|income)$", description="Series reported as 'total'"),
+    end_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Last month (YYYY-MM); defaults to latest activity"),
     current_user = Depends(get_current_user),
 ):
-    """Return monthly expense trend for last N months for the current user."""
+    """Return a gap-filled monthly trend for last N months for the current user."""
     try:
         user_id = str(current_user.id)
-        series = get_monthly_trend(user_id, months)
+        points = await get_monthly_trend(user_id, months, series=series, end_month=end_month)
         return {
             "user_id": user_id,
             "months": months,
-            "series": series,
+            "kind": series,
+            "series": points,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -6,6 +6,8 @@ import uuid
 
 from routes.auth import get_current_user
 from supabase_client import get_server_client
+from supabase_async import get_async_client, fetch_all
+from services.ledger_cache import get_ledger
 
 router = APIRouter()
 
@@ -34,13 +36,10 @@ async def create_goal(
         sb = get_server_client()
         
         # Calculate suggestions based on user's financial data
-        # Get user's average monthly savings
-        transactions_resp = sb.table('transactions').select('amount').eq('user_id', user_id).execute()
-        transactions = transactions_resp.data or []
-        
-        # Simple heuristic: calculate average positive transactions (income)
-        positive_amounts = [float(t['amount']) for t in transactions if float(t['amount']) > 0]
-        avg_income = sum(positive_amounts) / len(positive_amounts) if positive_amounts else 5000
+        # Simple heuristic: average positive transaction (income)
+        amounts = (await get_ledger(user_id)).amounts
+        income = amounts[amounts > 0]
+        avg_income = float(income.mean()) if len(income) else 5000
         
         # Generate suggestions
         suggestions = []
@@ -88,11 +87,11 @@ async def get_goals(
     """Get all goals for the user"""
     try:
         user_id = str(current_user.id)
-        sb = get_server_client()
-        
-        resp = sb.table('goals').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
+        sb = get_async_client()
         
-        goals = resp.data or []
+        goals = await fetch_all(
+            sb.table('goals').select('*').eq('user_id', user_id).order('created_at', desc=True).order('id')
+        )
         
         return {
             "goals": goals
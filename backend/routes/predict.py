@@ -7,6 +7,8 @@ import pandas as pd
 import numpy as np
 
 from routes.auth import get_current_user
+from services.transaction_frame import TransactionFrame
+from services.ledger_cache import get_ledger
 from models.utils import load_lstm_predictor, load_baseline_model, forecast_with_models, load_recommender, recommend_actions
 from models.train_predictor import load_monthly_expenses, generate_synthetic_series
 from sklearn.metrics import mean_absolute_percentage_error
@@ -76,19 +78,24 @@ class RecommendResponse(BaseModel):
 async def recommend(req: RecommendRequest, current_user = Depends(get_current_user)):
     try:
         # derive simple category scores from latest month vs mean to date
-        data_path = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'sample_user.csv'))
-        df = pd.read_csv(data_path)
-        df['date'] = pd.to_datetime(df['date'])
-        df = df[df['amount'] < 0].copy()
-        df['spend'] = -df['amount']
-        df['month'] = df['date'].values.astype('datetime64[M]')
-        if df.empty:
+        transactions = (await get_ledger(current_user.id)).to_frame()
+        if transactions.is_empty:
+            # no uploaded history yet: fall back to the bundled sample (local mode)
+            data_path = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'sample_user.csv'))
+            transactions = TransactionFrame.from_csv(data_path, columns=("date", "amount", "category"))
+        expenses = transactions.expenses()
+        if expenses.is_empty:
             raise HTTPException(status_code=400, detail="No expense data available")
+        df = pd.DataFrame({
+            'category': expenses.categories,
+            'spend': -expenses.amounts,
+            'month': expenses.months,
+        })
         last_month = df['month'].max()
         hist = df[df['month'] < last_month]
         cur = df[df['month'] == last_month]
-        means = hist.groupby('category')['spend'].mean() if not hist.empty else pd.Series(1.0, index=cur['category'].unique())
-        sums = cur.groupby('category')['spend'].sum()
+        means = hist.groupby('category', observed=True)['spend'].mean() if not hist.empty else pd.Series(1.0, index=cur['category'].unique())
+        sums = cur.groupby('category', observed=True)['spend'].sum()
         cats = sorted(set(means.index).union(set(sums.index)))
         scores = {}
         for c in cats:
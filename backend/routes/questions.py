@@ -1,11 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 import uuid
 from datetime import datetime
 
-from routes.auth import get_current_user
+from routes.auth import get_current_user, issue_tokens
 from supabase_client import get_server_client
+from services.principal_cache import invalidate_principal
 
 router = APIRouter()
 
@@ -21,6 +22,8 @@ class QuestionsSubmitResponse(BaseModel):
     success: bool
     message: str
     questions_saved: int
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
 
 @router.post("/submit", response_model=QuestionsSubmitResponse)
 async def submit_questions(
@@ -65,14 +68,24 @@ async def submit_questions(
             for ans in request.answers
         ]
         res = sb.table('user_questions').insert(rows).execute()
+        invalidate_principal(user_id)
         if getattr(res, 'error', None):
             raise HTTPException(status_code=500, detail="Failed to save questions")
         questions_saved = len(rows)
         
+        # Tokens carry onboarding_complete, so hand back a refreshed pair
+        created_at = current_user.created_at.isoformat() if current_user.created_at else None
+        access_token, refresh_token = issue_tokens(
+            user_id, current_user.email, current_user.name, True,
+            token_version=getattr(current_user, "token_version", 0), created_at=created_at,
+        )
+        
         return QuestionsSubmitResponse(
             success=True,
             message="Questions submitted successfully",
-            questions_saved=questions_saved
+            questions_saved=questions_saved,
+            access_token=access_token,
+            refresh_token=refresh_token
         )
         
     except HTTPException:
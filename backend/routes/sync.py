@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from routes.auth import get_current_user
+from services.sync import SYNC_PAGE_SIZE, changes_since
+from utils.responses import ListJSONResponse
+
+router = APIRouter()
+
+
+@router.get("/changes")
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=1000),
+    current_user = Depends(get_current_user)
+):
+    """
+    Transactions, manual expenses, budgets and goals created, updated or deleted
+    after the `since` cursor; pass the returned `cursor` on the next pull
+    """
+    try:
+        user_id = str(current_user.id)
+        return ListJSONResponse(await changes_since(user_id, since, limit))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,139 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import date
+import logging
+
+from routes.auth import get_current_user
+from supabase_async import get_async_client
+from services.category_rules import engine_for_user
+from services.pagination import CursorError, iter_keyset_pages
+from services.transaction_export import (
+    ARROW_AVAILABLE, EXPORT_COLUMNS, EXPORT_MEDIA_TYPES, FORMAT_CSV, FORMAT_PARQUET, export_chunks,
+)
+from services.unified_ledger import iter_ledger, ledger_page, summarize_ledger
+from utils.responses import ListJSONResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _iso_date(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be a date (YYYY-MM-DD)")
+
+
+@router.get("/export")
+async def export_transactions(
+    format: str = FORMAT_CSV,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Stream the user's transactions oldest first as csv, ndjson or parquet,
+    optionally limited to dates between `from` and `to` (inclusive)
+    """
+    try:
+        user_id = str(current_user.id)
+        if format not in EXPORT_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"format must be one of {sorted(EXPORT_MEDIA_TYPES)}")
+        if format == FORMAT_PARQUET and not ARROW_AVAILABLE:
+            raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+        start, end = _iso_date(date_from, "from"), _iso_date(date_to, "to")
+        
+        query = get_async_client().table('transactions').select(", ".join(EXPORT_COLUMNS)).eq('user_id', user_id)
+        if start:
+            query = query.gte('date', start)
+        if end:
+            query = query.lte('date', end)
+        
+        pages = iter_keyset_pages(query, desc=False)
+        # the first page is read before responding, so a failing query is still a 500, not a truncated file
+        try:
+            first_page = [await pages.__anext__()]
+        except StopAsyncIteration:
+            first_page = []
+        
+        async def all_pages():
+            for page in first_page:
+                yield page
+            async for page in pages:
+                yield page
+        
+        filename = "transactions" + (f"-{start}" if start else "") + (f"-to-{end}" if end else "") + f".{format}"
+        return StreamingResponse(
+            export_chunks(all_pages(), format),
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/ledger")
+async def get_ledger(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    order: str = "desc",
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Transactions and manual expenses as one list ordered by date (newest first,
+    or oldest first with `order=asc`). Amounts are signed, so manual expenses
+    are negative. Pass the returned `next_cursor` as `cursor` for the next page.
+    """
+    try:
+        user_id = str(current_user.id)
+        if order not in ("asc", "desc"):
+            raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+        start, end = _iso_date(date_from, "from"), _iso_date(date_to, "to")
+        
+        entries, next_cursor = await ledger_page(
+            user_id, limit, cursor, start, end, desc=order == "desc", engine=await engine_for_user(user_id)
+        )
+        return ListJSONResponse({
+            "entries": entries,
+            "total": len(entries),
+            "limit": limit,
+            "next_cursor": next_cursor
+        })
+        
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/ledger/summary")
+async def get_ledger_summary(
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Income, expenses (manual expenses included), expense by category and
+    per-month totals over the unified ledger between `from` and `to` (inclusive)
+    """
+    try:
+        user_id = str(current_user.id)
+        start, end = _iso_date(date_from, "from"), _iso_date(date_to, "to")
+        engine = await engine_for_user(user_id)
+        return await summarize_ledger(iter_ledger(user_id, start, end, desc=False, engine=engine))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,17 +1,34 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List
-import pandas as pd
-import uuid
-from datetime import datetime, date
+from typing import List, Optional
+import asyncio
 import io
 import logging
+import os
 
 from routes.auth import get_current_user
 from supabase_client import get_server_client
+from services.rollups import apply_transaction_rows
+from services.ledger_cache import record_transactions
+from services.csv_import import (
+    REQUIRED_COLUMNS, UPLOAD_STREAM_MAX_BYTES, CsvImportError, ingest_csv, open_upload, read_upload,
+    upload_compression, upload_format, validate_transactions,
+)
+from services.import_jobs import import_jobs
+from services.dedupe import insert_new_transactions
+from services.pagination import (
+    TRANSACTION_FIELDS, CursorError, FieldsError, keyset_page, keyset_query, select_fields,
+)
+from utils.responses import ListJSONResponse
+from services.category_rules import MAX_RULES_PER_USER, engine_for_user, load_user_rules, replace_user_rules
+from utils.statement_profiles import profiles
 
 router = APIRouter()
 
+# Whole-file uploads; for .gz / .zst the limit applies to the decompressed size
+UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
 # Request/Response Models
 class TransactionResponse(BaseModel):
     success: bool
@@ -19,50 +36,144 @@ class TransactionResponse(BaseModel):
     transactions_imported: int
     errors: List[str] = []
 
+class CategoryRule(BaseModel):
+    keyword: str
+    category: str
+
+class CategoryRulesRequest(BaseModel):
+    rules: List[CategoryRule]
+
+
+def _import_message(imported: int, duplicates: int) -> str:
+    message = f"Successfully imported {imported} transactions"
+    if duplicates:
+        message += f" ({duplicates} already imported, skipped)"
+    return message
+
+
+async def _stream_upload(file: UploadFile, user_id: str, fmt: str) -> TransactionResponse:
+    """Chunked parse + pipelined batch inserts for large statements"""
+    if file.size and file.size > UPLOAD_STREAM_MAX_BYTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File size must be less than {UPLOAD_STREAM_MAX_BYTES // (1024 * 1024)}MB"
+        )
+    try:
+        source = open_upload(file.file, file.filename, UPLOAD_STREAM_MAX_BYTES)
+        progress = await ingest_csv(source, user_id, fmt=fmt)
+    except CsvImportError as e:
+        if e.progress is None:
+            raise HTTPException(status_code=400, detail=str(e))
+        # earlier chunks are committed; say how far the import got
+        raise HTTPException(status_code=400, detail={
+            "message": str(e),
+            "failed_at_row": e.row,
+            "transactions_imported": e.progress.rows_inserted,
+            "progress": e.progress.to_dict(),
+        })
+    
+    if progress.rows_inserted == 0 and not progress.rows_duplicate:
+        if progress.rows_failed:
+            raise HTTPException(status_code=500, detail="Failed to insert transactions")
+        raise HTTPException(status_code=400, detail="No valid transactions found in CSV")
+    
+    return TransactionResponse(
+        success=progress.rows_failed == 0,
+        message=_import_message(progress.rows_inserted, progress.rows_duplicate),
+        transactions_imported=progress.rows_inserted,
+        errors=progress.error_report()
+    )
+
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+
+async def _background_upload(file: UploadFile, user_id: str) -> JSONResponse:
+    """Spool the upload to disk and queue it as an import job (202 + job id)"""
+    job = import_jobs.create(user_id, file.filename)
+    loop = asyncio.get_running_loop()
+    try:
+        with open(job.spool_path, "wb") as spool:
+            while True:
+                chunk = await file.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                job.bytes_received += len(chunk)
+                if job.bytes_received > UPLOAD_STREAM_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File size must be less than {UPLOAD_STREAM_MAX_BYTES // (1024 * 1024)}MB"
+                    )
+                await loop.run_in_executor(None, spool.write, chunk)
+    except BaseException:
+        if os.path.exists(job.spool_path):
+            os.remove(job.spool_path)
+        raise
+    
+    import_jobs.submit(job)
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job.id, "status": job.status, "status_url": f"/upload/jobs/{job.id}"}
+    )
+
 @router.post("/upload-csv", response_model=TransactionResponse)
 async def upload_csv(
     file: UploadFile = File(...),
+    stream: bool = Query(False, description="Parse in chunks and insert in concurrent batches (large files)"),
+    background: bool = Query(False, description="Import asynchronously; returns 202 and a job id to poll"),
     current_user = Depends(get_current_user)
 ):
     """
-    Upload and parse CSV file with transactions
-    Expected columns: date, amount, category
+    Upload and parse a CSV file with transactions (Parquet and Arrow IPC files are accepted too)
+    Expected columns: date, amount, category, or a recognised bank export layout
+    (see utils/statement_profiles.py)
+    CSV may be gzip (.csv.gz) or Zstandard (.csv.zst) compressed
     """
     try:
         user_id = str(current_user.id)
         
+        # Validate file type
+        fmt = upload_format(file.filename)
+        if fmt is None:
+            raise HTTPException(status_code=400, detail="File must be a CSV (optionally .gz/.zst), Parquet or Arrow file")
+        
+        if background:
+            return await _background_upload(file, user_id)
+        if stream:
+            return await _stream_upload(file, user_id, fmt)
+        
         # Validate file size (max 10MB)
-        if file.size and file.size > 10 * 1024 * 1024:
+        if file.size and file.size > UPLOAD_MAX_BYTES:
             raise HTTPException(status_code=400, detail="File size must be less than 10MB")
         
-        # Validate file type
-        if not file.filename or not file.filename.lower().endswith('.csv'):
-            raise HTTPException(status_code=400, detail="File must be a CSV")
-        
         # Read CSV content
         content = await file.read()
         
         try:
-            # Parse CSV with error handling
-            df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+            source = content
+            if upload_compression(file.filename):
+                # decompressed while parsing, never materialized
+                source = open_upload(io.BytesIO(content), file.filename, UPLOAD_MAX_BYTES)
+            # Parse straight from the bytes (multi-threaded Arrow reader when available), then
+            # rewrite recognised bank export layouts to date/amount/category
+            engine = await engine_for_user(user_id)
+            df = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: profiles.normalize(read_upload(source, fmt), engine)
+            )
             
-            # Check if CSV is empty
+            # Check if the file is empty
             if df.empty:
                 raise HTTPException(status_code=400, detail="CSV file is empty")
                 
-        except UnicodeDecodeError:
-            raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
-        except pd.errors.EmptyDataError:
-            raise HTTPException(status_code=400, detail="CSV file is empty")
-        except pd.errors.ParserError as e:
-            raise HTTPException(status_code=400, detail=f"Invalid CSV format: {str(e)}")
+        except HTTPException:
+            raise
+        except CsvImportError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logging.error(f"CSV parsing error: {str(e)}")
             raise HTTPException(status_code=400, detail="Error parsing CSV file")
         
         # Validate required columns
-        required_columns = ['date', 'amount', 'category']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
         
         if missing_columns:
             raise HTTPException(
@@ -70,73 +181,24 @@ async def upload_csv(
                 detail=f"Missing required columns: {missing_columns}"
             )
         
-        # Validate and clean data
-        errors = []
-        transactions_to_insert = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Parse date
-                if isinstance(row['date'], str):
-                    transaction_date = datetime.strptime(row['date'], '%Y-%m-%d').date()
-                else:
-                    transaction_date = pd.to_datetime(row['date']).date()
-                
-                # Parse amount
-                amount = float(row['amount'])
-                if amount == 0:
-                    errors.append(f"Row {index + 1}: Amount cannot be zero")
-                    continue
-                
-                # Parse category
-                category = str(row['category']).strip()
-                if not category:
-                    errors.append(f"Row {index + 1}: Category cannot be empty")
-                    continue
-                
-                # Extract metadata (any additional columns)
-                metadata = {}
-                for col in df.columns:
-                    if col not in required_columns and pd.notna(row[col]):
-                        metadata[col] = str(row[col])
-                
-                transactions_to_insert.append({
-                    "id": str(uuid.uuid4()),
-                    "user_id": user_id,
-                    "date": transaction_date,
-                    "amount": amount,
-                    "category": category,
-                    "metadata": metadata,
-                    "created_at": datetime.utcnow()
-                })
-                
-            except Exception as e:
-                errors.append(f"Row {index + 1}: {str(e)}")
-                continue
+        # Validate and clean data (column-wise; see services/csv_import.py)
+        payload, errors = validate_transactions(df, user_id)
         
-        if not transactions_to_insert:
+        if not payload:
             raise HTTPException(
                 status_code=400, 
                 detail="No valid transactions found in CSV"
             )
         
-        # Bulk insert transactions via Supabase API (service role)
-        sb = get_server_client()
-        # Convert date objects to isoformat strings
-        payload = []
-        for t in transactions_to_insert:
-            row = t.copy()
-            row["date"] = row["date"].isoformat() if isinstance(row["date"], (datetime, date)) else row["date"]
-            row["created_at"] = row["created_at"].isoformat() if isinstance(row["created_at"], (datetime, date)) else row["created_at"]
-            payload.append(row)
-        resp = sb.table('transactions').insert(payload).execute()
-        if getattr(resp, 'error', None):
-            raise HTTPException(status_code=500, detail="Failed to insert transactions")
-        transactions_imported = len(payload)
+        # Bulk insert the rows not imported before (fingerprint dedupe; see services/dedupe.py)
+        inserted, duplicates = await insert_new_transactions(user_id, payload)
+        await apply_transaction_rows(user_id, inserted)
+        record_transactions(user_id, inserted)
+        transactions_imported = len(inserted)
         
         return TransactionResponse(
             success=True,
-            message=f"Successfully imported {transactions_imported} transactions",
+            message=_import_message(transactions_imported, duplicates),
             transactions_imported=transactions_imported,
             errors=errors
         )
@@ -146,47 +208,85 @@ async def upload_csv(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/jobs/{job_id}")
+async def get_import_job(job_id: str, current_user = Depends(get_current_user)):
+    """
+    Report a background import: status, rows parsed/inserted/rejected, throughput and errors
+    """
+    job = import_jobs.get(job_id)
+    if not job or job.get("user_id") != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.get("/category-rules")
+async def get_category_rules(current_user = Depends(get_current_user)):
+    """
+    List the user's keyword -> category overrides, highest priority first
+    """
+    try:
+        user_id = str(current_user.id)
+        return {"user_id": user_id, "rules": await load_user_rules(user_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/category-rules")
+async def put_category_rules(request: CategoryRulesRequest, current_user = Depends(get_current_user)):
+    """
+    Replace the user's category overrides; they apply to statement imports ahead of the built-in rules
+    """
+    try:
+        user_id = str(current_user.id)
+        if len(request.rules) > MAX_RULES_PER_USER:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_RULES_PER_USER} rules are allowed")
+        rules, seen = [], set()
+        for rule in request.rules:
+            keyword, category = rule.keyword.strip().lower(), rule.category.strip()
+            if not keyword or not category:
+                raise HTTPException(status_code=400, detail="Rules need a keyword and a category")
+            if keyword in seen:
+                raise HTTPException(status_code=400, detail=f"Duplicate keyword: {keyword}")
+            seen.add(keyword)
+            rules.append({"keyword": keyword, "category": category})
+        return {"user_id": user_id, "rules": await replace_user_rules(user_id, rules)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/transactions")
 async def get_user_transactions(
-    limit: int = 100,
-    offset: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user = Depends(get_current_user)
 ):
     """
-    Get transactions for a user with pagination
+    Get transactions for a user, newest first. Pass the returned `next_cursor`
+    as `cursor` for the next page; `offset` paging still works. `fields`
+    (e.g. `date,amount,category`) limits the columns returned.
     """
     try:
         user_id = str(current_user.id)
         
         sb = get_server_client()
-        start = offset
-        end = max(offset, offset + limit - 1)
-        res = (
+        query = (
             sb.table('transactions')
-              .select('id, date, amount, category, metadata, created_at')
+              .select(select_fields(fields, TRANSACTION_FIELDS))
               .eq('user_id', user_id)
-              .order('date', desc=True)
-              .range(start, end)
-              .execute()
         )
-        data = getattr(res, 'data', []) or []
+        res = keyset_query(query, limit, cursor, offset).execute()
+        data, next_cursor = keyset_page(getattr(res, 'data', []) or [], limit)
         
-        return {
+        return ListJSONResponse({
             "user_id": user_id,
-            "transactions": [
-                {
-                    "id": str(t.get('id')),
-                    "date": str(t.get('date')),
-                    "amount": float(t.get('amount', 0)),
-                    "category": t.get('category'),
-                    "metadata": t.get('metadata'),
-                    "created_at": str(t.get('created_at'))
-                }
-                for t in data
-            ],
+            "transactions": data,
             "limit": limit,
-            "offset": offset
-        }
+            "offset": offset,
+            "next_cursor": next_cursor
+        })
         
+    except (CursorError, FieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
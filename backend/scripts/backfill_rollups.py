@@ -0,0 +1,67 @@
+"""
+Backfill monthly_category_rollups from raw transactions and manual_expenses.
+
+db/005_monthly_category_rollups.sql backfills every user when applied; run
+this to repair rollups that drifted (for example after writes made while
+ROLLUPS_ENABLED was off):
+
+    python backend/scripts/backfill_rollups.py              # every user
+    python backend/scripts/backfill_rollups.py <user_id>    # one user
+"""
+import asyncio
+import os
+import sys
+from typing import List
+
+# Route and service modules import siblings as top-level packages
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.normpath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv
+
+from supabase_async import get_async_client, close_async_client
+from services.rollups import rebuild_user_rollups
+
+
+async def _all_user_ids() -> List[str]:
+    sb = get_async_client()
+    user_ids: List[str] = []
+    page_size = 1000
+    start = 0
+    while True:
+        res = await sb.table("users").select("id").order("id").range(start, start + page_size - 1).execute()
+        batch = [str(row["id"]) for row in res.data or []]
+        user_ids.extend(batch)
+        if len(batch) < page_size:
+            return user_ids
+        start += page_size
+
+
+async def run_backfill(user_ids: List[str]) -> int:
+    try:
+        if not user_ids:
+            user_ids = await _all_user_ids()
+        total_rows = 0
+        for user_id in user_ids:
+            rows = await rebuild_user_rollups(user_id)
+            total_rows += rows
+            print(f"user {user_id}: {rows} rollup rows")
+        print(f"Backfill complete: users={len(user_ids)}, rollup_rows={total_rows}")
+        return 0
+    finally:
+        await close_async_client()
+
+
+if __name__ == "__main__":
+    load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+    if not os.getenv("SUPABASE_URL", "").strip() or not os.getenv("SUPABASE_SERVICE_ROLE_KEY", "").strip():
+        print("Missing required env: SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY. Set them in your environment or .env.")
+        sys.exit(2)
+    try:
+        sys.exit(asyncio.run(run_backfill(sys.argv[1:])))
+    except Exception as e:
+        # Helpful, but do not include secrets
+        print(f"Backfill failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,97 @@
+"""Per-user category overrides, compiled into category engines.
+
+`category_rules` (db/007_category_rules.sql) stores keyword -> category
+rules a user has set. `engine_for_user` loads them (cached for a short
+TTL) and returns the compiled `CategoryEngine` with those rules ahead of
+the built-ins; users without rules share `default_engine`.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from supabase_async import fetch_all, get_async_client
+from utils.category_engine import CategoryEngine, default_engine, engine_with_overrides
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_RULES_TABLE = "category_rules"
+CATEGORY_RULES_TTL_SECONDS = float(os.getenv("CATEGORY_RULES_TTL_SECONDS", "300"))
+CATEGORY_RULES_CACHE_USERS = int(os.getenv("CATEGORY_RULES_CACHE_USERS", "4096"))
+MAX_RULES_PER_USER = 500
+
+
+def _as_overrides(rows: List[Dict[str, str]]) -> List[Tuple[str, Tuple[str, ...]]]:
+    """One (category, (keyword,)) rule per row, in priority order."""
+    return [(row["category"], (row["keyword"],)) for row in rows]
+
+
+class CategoryRuleCache:
+    """user_id -> compiled engine, LRU with a TTL."""
+
+    def __init__(self, maxsize: int = CATEGORY_RULES_CACHE_USERS, ttl: float = CATEGORY_RULES_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, CategoryEngine]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[CategoryEngine]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= self._clock():
+                self._entries.pop(user_id, None)
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id: str, engine: CategoryEngine) -> None:
+        with self._lock:
+            self._entries[user_id] = (self._clock() + self.ttl, engine)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+category_rule_cache = CategoryRuleCache()
+
+
+async def load_user_rules(user_id: str) -> List[Dict[str, str]]:
+    rows = await fetch_all(
+        get_async_client().table(CATEGORY_RULES_TABLE).select("keyword, category, priority")
+        .eq("user_id", user_id).order("priority").order("created_at")
+    )
+    return [{"keyword": row["keyword"], "category": row["category"]} for row in rows]
+
+
+async def engine_for_user(user_id: str) -> CategoryEngine:
+    """Compiled engine with the user's overrides; the default engine if they cannot be loaded."""
+    engine = category_rule_cache.get(user_id)
+    if engine is not None:
+        return engine
+    try:
+        engine = engine_with_overrides(_as_overrides(await load_user_rules(user_id)))
+    except Exception as e:
+        logger.warning(f"Could not load category rules for user {user_id}: {e}")
+        return default_engine
+    category_rule_cache.put(user_id, engine)
+    return engine
+
+
+async def replace_user_rules(user_id: str, rules: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Replace a user's rules with `rules` (keyword, category), keeping their order as priority.
+
+    One `replace_category_rules` call deletes and inserts in a single
+    transaction, so a failure leaves the previous rules untouched.
+    """
+    replacement = [{"keyword": rule["keyword"], "category": rule["category"]} for rule in rules]
+    await get_async_client().rpc("replace_category_rules", {"p_user_id": user_id, "p_rules": replacement})
+    category_rule_cache.invalidate(user_id)
+    return replacement
@@ -0,0 +1,560 @@
+"""Column-wise validation of uploaded transaction CSVs.
+
+`validate_transactions` replaces the per-row `iterrows()` loop of
+`/upload/upload-csv`: dates go through one `to_datetime` call with an
+explicit format, amounts through `to_numeric`, and the zero / empty checks
+are boolean masks. Error messages are generated from the masks, so only
+rejected rows are touched in Python.
+
+`read_upload` parses a whole upload. CSV is read straight from the
+uploaded bytes by pyarrow's multi-threaded reader (no `decode` /
+`StringIO` copy); Parquet and Arrow IPC files are accepted too. Without
+pyarrow, CSV falls back to pandas and the binary formats are rejected.
+`.csv.gz` / `.csv.zst` uploads are decompressed on the fly by
+`DecompressedReader`, which enforces the size limit on decompressed bytes.
+
+`ingest_csv` is the streaming import path: it reads a binary file object
+in row chunks, validates each chunk on a worker thread while the previous
+chunk's rows are inserted as bounded, concurrent batches, so memory stays
+at roughly one chunk plus the in-flight batches regardless of file size.
+"""
+import asyncio
+import csv
+import gzip
+import io
+import logging
+import os
+import time
+import uuid
+import zlib
+from contextlib import closing
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pa_parquet
+    ARROW_AVAILABLE = True
+except ImportError:
+    pa = pa_csv = pa_parquet = None
+    ARROW_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+from supabase_async import get_async_client
+from services.rollups import apply_transaction_rows
+from services.ledger_cache import record_transactions
+from services.dedupe import OccurrenceCounter, assign_fingerprints, drop_known, insert_fingerprinted
+from services.category_rules import engine_for_user
+from utils.category_engine import CategoryEngine
+from utils.statement_profiles import profiles
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ["date", "amount", "category"]
+DATE_FORMAT = "%Y-%m-%d"
+
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "20000"))
+UPLOAD_INSERT_BATCH_ROWS = int(os.getenv("UPLOAD_INSERT_BATCH_ROWS", "1000"))
+UPLOAD_INSERT_CONCURRENCY = int(os.getenv("UPLOAD_INSERT_CONCURRENCY", "4"))
+UPLOAD_STREAM_MAX_BYTES = int(os.getenv("UPLOAD_STREAM_MAX_BYTES", str(512 * 1024 * 1024)))
+# Rejected-row messages kept per import; the rest are only counted
+UPLOAD_MAX_REPORTED_ERRORS = int(os.getenv("UPLOAD_MAX_REPORTED_ERRORS", "1000"))
+
+
+class CsvImportError(ValueError):
+    """The uploaded file cannot be imported at all (empty, wrong encoding, missing columns).
+
+    When the file breaks part way through a streamed import, the earlier
+    chunks are already committed: `progress` then holds what was imported
+    and `row` is the first row that was not.
+    """
+
+    def __init__(self, message: str, progress: Optional["ImportProgress"] = None, row: Optional[int] = None):
+        super().__init__(message)
+        self.progress = progress
+        self.row = row
+
+
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+UPLOAD_EXTENSIONS = {
+    ".csv": FORMAT_CSV,
+    ".parquet": FORMAT_PARQUET,
+    ".arrow": FORMAT_ARROW,
+    ".arrows": FORMAT_ARROW,
+    ".feather": FORMAT_ARROW,
+    ".ipc": FORMAT_ARROW,
+}
+_FORMAT_NAMES = {FORMAT_CSV: "CSV", FORMAT_PARQUET: "Parquet", FORMAT_ARROW: "Arrow"}
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+UPLOAD_COMPRESSIONS = {".gz": COMPRESSION_GZIP, ".zst": COMPRESSION_ZSTD}
+# Bytes buffered ahead of the CSV parser when reading a stream (also the header sniffing window)
+UPLOAD_READ_BUFFER_BYTES = 1024 * 1024
+
+
+def upload_compression(filename: Optional[str]) -> Optional[str]:
+    """Compression of an upload from its file extension, or None if uncompressed."""
+    name = (filename or "").lower()
+    for extension, compression in UPLOAD_COMPRESSIONS.items():
+        if name.endswith(extension):
+            return compression
+    return None
+
+
+def upload_format(filename: Optional[str]) -> Optional[str]:
+    """Format of an upload from its file extension, or None if unsupported."""
+    name = (filename or "").lower()
+    if upload_compression(name):
+        # only CSV is accepted compressed; Parquet/Arrow carry their own codecs
+        return FORMAT_CSV if name[:name.rfind(".")].endswith(".csv") else None
+    for extension, fmt in UPLOAD_EXTENSIONS.items():
+        if name.endswith(extension):
+            return fmt
+    return None
+
+
+_DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if ZSTD_AVAILABLE else ())
+
+
+def _size_text(num_bytes: int) -> str:
+    """'512MB' for whole mebibytes, else the exact byte count (never rounds a limit down to '0MB')."""
+    mib = 1024 * 1024
+    if num_bytes >= mib and num_bytes % mib == 0:
+        return f"{num_bytes // mib}MB"
+    return f"{num_bytes:,} bytes"
+
+
+class DecompressedReader(io.RawIOBase):
+    """Readable stream of a compressed upload's decompressed bytes.
+
+    Decompresses as the parser reads, so the decompressed file is never
+    held in memory; raises `CsvImportError` once more than `max_bytes`
+    have come out, or if the input is not valid for its codec.
+    """
+
+    def __init__(self, source: BinaryIO, compression: str, max_bytes: int):
+        if compression == COMPRESSION_ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise CsvImportError("Zstandard (.zst) uploads require the zstandard package")
+            self._inner = zstandard.ZstdDecompressor().stream_reader(source, read_across_frames=True, closefd=False)
+        else:
+            self._inner = gzip.GzipFile(fileobj=source, mode="rb")
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            count = self._inner.readinto(buffer)
+        except _DECOMPRESSION_ERRORS as e:
+            raise CsvImportError(f"Invalid {self.compression} file: {e}")
+        self.bytes_read += count
+        if self.bytes_read > self.max_bytes:
+            raise CsvImportError(f"Decompressed file must be at most {_size_text(self.max_bytes)}")
+        return count
+
+    def close(self) -> None:
+        if not self.closed:
+            self._inner.close()
+        super().close()
+
+
+def open_upload(source: BinaryIO, filename: Optional[str], max_bytes: int) -> BinaryIO:
+    """`source` as a stream of CSV/Parquet/Arrow bytes, decompressing `.gz` / `.zst` uploads."""
+    compression = upload_compression(filename)
+    if compression is None:
+        return source
+    return DecompressedReader(source, compression, max_bytes)
+
+
+def _csv_header(content: bytes) -> List[str]:
+    line = content[:content.find(b"\n")] if b"\n" in content else content
+    return next(csv.reader([line.decode("utf-8-sig", errors="replace")]), [])
+
+
+def _normalize_table(table: "pa.Table") -> "pa.Table":
+    """Give Arrow tables the column types `validate_transactions` expects."""
+    for index, field in enumerate(table.schema):
+        column = table.column(index)
+        if field.name == "date" and (pa.types.is_date(field.type) or pa.types.is_timestamp(field.type)):
+            # typed dates (Parquet/Arrow) become YYYY-MM-DD text; time of day is dropped
+            column = column.cast(pa.date32(), safe=False).cast(pa.string())
+        elif field.name == "amount" and pa.types.is_decimal(field.type):
+            column = column.cast(pa.float64())
+        else:
+            continue
+        table = table.set_column(index, field.name, column)
+    return table
+
+
+def _table_frame(table: "pa.Table") -> pd.DataFrame:
+    # strings stay in Arrow buffers instead of becoming one Python object per cell
+    types = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}
+    return _normalize_table(table).to_pandas(split_blocks=True, self_destruct=True, types_mapper=types.get)
+
+
+def _read_csv_arrow(source: Union[bytes, BinaryIO]) -> pd.DataFrame:
+    if isinstance(source, bytes):
+        header, stream = _csv_header(source), pa.BufferReader(source)
+    else:
+        stream = io.BufferedReader(source, UPLOAD_READ_BUFFER_BYTES)
+        header = _csv_header(stream.peek(UPLOAD_READ_BUFFER_BYTES))
+    # everything but the amount stays text, as pandas leaves strings: dates are
+    # validated against DATE_FORMAT and metadata is stored verbatim
+    columns = {name: pa.string() for name in header if name != "amount"}
+    table = pa_csv.read_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        convert_options=pa_csv.ConvertOptions(column_types=columns, strings_can_be_null=True),
+    )
+    if any(pa.types.is_binary(field.type) for field in table.schema):
+        # Arrow infers binary for columns that are not valid UTF-8
+        raise CsvImportError("CSV file must be UTF-8 encoded")
+    return _table_frame(table)
+
+
+def _arrow_source(content: Union[bytes, BinaryIO]) -> Any:
+    return pa.BufferReader(content) if isinstance(content, bytes) else content
+
+
+def _read_arrow_ipc(source: Any) -> "pa.Table":
+    try:
+        return pa.ipc.open_file(source).read_all()
+    except pa.ArrowInvalid:
+        # not the random-access file format; try the streaming format
+        source.seek(0)
+        return pa.ipc.open_stream(source).read_all()
+
+
+def read_upload(content: Union[bytes, BinaryIO], fmt: str = FORMAT_CSV) -> pd.DataFrame:
+    """Parse a whole uploaded file (bytes, or a stream such as `open_upload`'s) for `validate_transactions`.
+
+    Raises `CsvImportError` for empty, undecodable or malformed files.
+    """
+    if isinstance(content, bytes) and not content:
+        raise CsvImportError(f"{_FORMAT_NAMES[fmt]} file is empty")
+    if fmt != FORMAT_CSV and not ARROW_AVAILABLE:
+        raise CsvImportError(f"{_FORMAT_NAMES[fmt]} uploads require pyarrow")
+    try:
+        if fmt == FORMAT_PARQUET:
+            return _table_frame(pa_parquet.read_table(_arrow_source(content)))
+        if fmt == FORMAT_ARROW:
+            return _table_frame(_read_arrow_ipc(_arrow_source(content)))
+        if ARROW_AVAILABLE:
+            return _read_csv_arrow(content)
+        return pd.read_csv(io.BytesIO(content) if isinstance(content, bytes) else content, encoding="utf-8")
+    except CsvImportError:
+        raise
+    except UnicodeDecodeError:
+        raise CsvImportError("CSV file must be UTF-8 encoded")
+    except pd.errors.EmptyDataError:
+        raise CsvImportError("CSV file is empty")
+    except pd.errors.ParserError as e:
+        raise CsvImportError(f"Invalid CSV format: {str(e)}")
+    except Exception as e:
+        if ARROW_AVAILABLE and isinstance(e, pa.ArrowInvalid):
+            message = str(e)
+            if fmt == FORMAT_CSV and message.startswith("Empty CSV"):
+                raise CsvImportError("CSV file is empty")
+            if "UTF8" in message:
+                raise CsvImportError("CSV file must be UTF-8 encoded")
+            raise CsvImportError(f"Invalid {_FORMAT_NAMES[fmt]} format: {message}")
+        raise
+
+
+def _row_errors(rows: np.ndarray, message: str, values: Any = None) -> List[Tuple[int, str]]:
+    if values is None:
+        return [(int(row), f"Row {int(row) + 1}: {message}") for row in rows]
+    return [(int(row), f"Row {int(row) + 1}: {message} '{value}'") for row, value in zip(rows, values)]
+
+
+def _metadata(extra: pd.DataFrame) -> List[Dict[str, str]]:
+    """Non-null extra columns of each row as {column: str(value)}."""
+    if extra.columns.empty:
+        return [{} for _ in range(len(extra))]
+    columns = [str(column) for column in extra.columns]
+    values = [
+        np.where(extra[column].notna().to_numpy(), extra[column].astype(str).to_numpy(dtype=object), None)
+        for column in extra.columns
+    ]
+    return [
+        {column: value for column, value in zip(columns, row) if value is not None}
+        for row in zip(*values)
+    ]
+
+
+def validate_transactions(df: pd.DataFrame, user_id: str, row_offset: int = 0,
+                          occurrences: Optional[OccurrenceCounter] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Validate a parsed CSV frame and build insert-ready, fingerprinted transaction rows.
+
+    Returns (rows, errors). Each rejected row gets one message, for the
+    first failing check in the order date, amount, category. When
+    validating a chunk of a file, `row_offset` is added to reported row
+    numbers and `occurrences` carries identical-row counts between chunks.
+    """
+    positions = np.arange(len(df)) + row_offset
+
+    raw_dates = df["date"]
+    dates = pd.to_datetime(raw_dates.astype(str).where(raw_dates.notna()), format=DATE_FORMAT, errors="coerce")
+    bad_date = dates.isna().to_numpy()
+
+    raw_amounts = df["amount"]
+    # float64 so masks below never carry NA (Arrow-backed columns parse to nullable dtypes)
+    amounts = pd.to_numeric(raw_amounts, errors="coerce").astype("float64")
+    bad_amount = amounts.isna().to_numpy() & ~bad_date
+    zero_amount = (amounts == 0).to_numpy() & ~bad_date & ~bad_amount
+
+    categories = df["category"].astype(str).str.strip().where(df["category"].notna(), "")
+    empty_category = (categories == "").to_numpy() & ~bad_date & ~bad_amount & ~zero_amount
+
+    flagged: List[Tuple[int, str]] = []
+    missing_date = raw_dates.isna().to_numpy()
+    invalid_date = bad_date & ~missing_date
+    flagged += _row_errors(positions[missing_date], "Date is required")
+    flagged += _row_errors(positions[invalid_date], "Invalid date (expected YYYY-MM-DD):",
+                           raw_dates.to_numpy(dtype=object)[invalid_date])
+    flagged += _row_errors(positions[bad_amount], "Invalid amount", raw_amounts.to_numpy(dtype=object)[bad_amount])
+    flagged += _row_errors(positions[zero_amount], "Amount cannot be zero")
+    flagged += _row_errors(positions[empty_category], "Category cannot be empty")
+    flagged.sort(key=lambda item: item[0])
+
+    valid = ~(bad_date | bad_amount | zero_amount | empty_category)
+    if not valid.any():
+        return [], [message for _, message in flagged]
+
+    extra = df.loc[valid, [column for column in df.columns if column not in REQUIRED_COLUMNS]]
+    created_at = datetime.utcnow().isoformat()
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "date": day,
+            "amount": amount,
+            "category": category,
+            "metadata": metadata,
+            "created_at": created_at,
+        }
+        for day, amount, category, metadata in zip(
+            dates[valid].dt.strftime(DATE_FORMAT).tolist(),
+            amounts[valid].astype(float).tolist(),
+            categories[valid].tolist(),
+            _metadata(extra),
+        )
+    ]
+    assign_fingerprints(user_id, rows, occurrences)
+    return rows, [message for _, message in flagged]
+
+
+class ImportProgress:
+    """Counters for one import, updated as chunks are parsed and batches inserted."""
+
+    def __init__(self):
+        self.rows_parsed = 0
+        self.rows_inserted = 0
+        self.rows_rejected = 0
+        self.rows_failed = 0
+        self.rows_duplicate = 0
+        self.errors: List[str] = []
+        self.errors_dropped = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def add_errors(self, messages: List[str]) -> None:
+        room = max(0, UPLOAD_MAX_REPORTED_ERRORS - len(self.errors))
+        self.errors.extend(messages[:room])
+        self.errors_dropped += max(0, len(messages) - room)
+
+    def error_report(self) -> List[str]:
+        if self.errors_dropped:
+            return self.errors + [f"... and {self.errors_dropped} more errors"]
+        return list(self.errors)
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.rows_inserted / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows_parsed": self.rows_parsed,
+            "rows_inserted": self.rows_inserted,
+            "rows_rejected": self.rows_rejected,
+            "rows_failed": self.rows_failed,
+            "rows_duplicate": self.rows_duplicate,
+            "rows_per_second": round(self.rows_per_second, 1),
+            "errors": self.error_report(),
+        }
+
+
+def _arrow_batches(source: BinaryIO, fmt: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    if fmt == FORMAT_PARQUET:
+        batches = pa_parquet.ParquetFile(source).iter_batches(batch_size=chunk_rows)
+    else:
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            batches = iter(pa.ipc.open_stream(source))
+    for batch in batches:
+        yield _table_frame(pa.Table.from_batches([batch]))
+
+
+def _chunk_reader(source: BinaryIO, fmt: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Iterator of row-chunk frames over an upload (runs on a worker thread)."""
+    if fmt == FORMAT_CSV:
+        return pd.read_csv(source, chunksize=chunk_rows, encoding="utf-8")
+    if not ARROW_AVAILABLE:
+        raise CsvImportError(f"{_FORMAT_NAMES[fmt]} uploads require pyarrow")
+    try:
+        batches = _arrow_batches(source, fmt, chunk_rows)
+        # the first chunk surfaces a bad file here rather than mid-import
+        first = next(batches, None)
+    except pa.ArrowInvalid as e:
+        raise CsvImportError(f"Invalid {_FORMAT_NAMES[fmt]} format: {e}")
+    if first is None:
+        raise CsvImportError(f"{_FORMAT_NAMES[fmt]} file is empty")
+
+    def chunks():
+        yield first
+        yield from batches
+    return chunks()
+
+
+def _read_chunk(reader, user_id: str, offset: int, occurrences: OccurrenceCounter,
+                engine: Optional[CategoryEngine] = None) -> Optional[Tuple[int, List[Dict[str, Any]], List[str]]]:
+    """Parse and validate the next chunk (runs on a worker thread)."""
+    chunk = next(reader, None)
+    if chunk is None:
+        return None
+    # bank export layouts are rewritten to date/amount/category (detection is memoized per header)
+    chunk = profiles.normalize(chunk, engine)
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+    if missing_columns:
+        raise CsvImportError(f"Missing required columns: {missing_columns}")
+    rows, errors = validate_transactions(chunk, user_id, row_offset=offset, occurrences=occurrences)
+    return len(chunk), rows, errors
+
+
+async def _insert_batch(user_id: str, batch: List[Dict[str, Any]], progress: ImportProgress,
+                        slots: asyncio.Semaphore) -> List[Dict[str, Any]]:
+    async with slots:
+        try:
+            inserted = await insert_fingerprinted(user_id, batch)
+        except Exception as e:
+            progress.rows_failed += len(batch)
+            progress.add_errors([f"Failed to insert {len(batch)} rows: {e}"])
+            return []
+    progress.rows_inserted += len(inserted)
+    progress.rows_duplicate += len(batch) - len(inserted)
+    return inserted
+
+
+async def _insert_chunk(user_id: str, rows: List[Dict[str, Any]], progress: ImportProgress,
+                        slots: asyncio.Semaphore) -> None:
+    # one fingerprint check per chunk, then the new rows in concurrent batches
+    try:
+        rows, duplicates = await drop_known(user_id, rows)
+        progress.rows_duplicate += duplicates
+    except Exception as e:
+        # the unique fingerprint index still skips duplicates on insert
+        logger.warning(f"Fingerprint pre-check failed for user {user_id}: {e}")
+    batches = [rows[start:start + UPLOAD_INSERT_BATCH_ROWS] for start in range(0, len(rows), UPLOAD_INSERT_BATCH_ROWS)]
+    results = await asyncio.gather(*(_insert_batch(user_id, batch, progress, slots) for batch in batches))
+    inserted = [row for batch in results for row in batch]
+    # one rollup/ledger update per chunk rather than per batch
+    await apply_transaction_rows(user_id, inserted)
+    record_transactions(user_id, inserted)
+
+
+async def ingest_csv(source: BinaryIO, user_id: str, progress: Optional[ImportProgress] = None,
+                     chunk_rows: Optional[int] = None, fmt: str = FORMAT_CSV) -> ImportProgress:
+    """Stream a CSV (or Parquet / Arrow IPC, see `fmt`) file object into `transactions` chunk by chunk.
+
+    Parsing of chunk k+1 overlaps the inserts of chunk k; across chunks at
+    most UPLOAD_INSERT_CONCURRENCY batches of UPLOAD_INSERT_BATCH_ROWS rows
+    are in flight, and the reader waits while two chunks are still being
+    inserted. Raises `CsvImportError` for files that cannot be imported at
+    all; per-row and per-batch problems are recorded on the returned progress.
+    If the file breaks after some chunks were handed to the database, those
+    chunks are finished (rows, rollups, ledger cache) before the error, which
+    carries the partial progress, is raised.
+    """
+    progress = progress or ImportProgress()
+    loop = asyncio.get_running_loop()
+    try:
+        reader = await loop.run_in_executor(None, _chunk_reader, source, fmt, chunk_rows or UPLOAD_CHUNK_ROWS)
+    except pd.errors.EmptyDataError:
+        raise CsvImportError("CSV file is empty")
+    except UnicodeDecodeError:
+        raise CsvImportError("CSV file must be UTF-8 encoded")
+
+    # the user's category overrides, resolved once per import
+    engine = await engine_for_user(user_id)
+    slots = asyncio.Semaphore(max(1, UPLOAD_INSERT_CONCURRENCY))
+    occurrences = OccurrenceCounter()
+    inflight: "List[asyncio.Future]" = []
+    offset = 0
+    try:
+        with closing(reader):
+            next_chunk = loop.run_in_executor(None, _read_chunk, reader, user_id, offset, occurrences, engine)
+            while True:
+                try:
+                    parsed = await next_chunk
+                except UnicodeDecodeError:
+                    raise CsvImportError("CSV file must be UTF-8 encoded")
+                except pd.errors.ParserError as e:
+                    raise CsvImportError(f"Invalid CSV format: {str(e)}")
+                except Exception as e:
+                    if ARROW_AVAILABLE and isinstance(e, pa.ArrowInvalid):
+                        raise CsvImportError(f"Invalid {_FORMAT_NAMES[fmt]} format: {e}")
+                    raise
+                if parsed is None:
+                    break
+                count, rows, errors = parsed
+                offset += count
+                progress.rows_parsed += count
+                progress.rows_rejected += len(errors)
+                progress.add_errors(errors)
+
+                inflight.append(asyncio.ensure_future(_insert_chunk(user_id, rows, progress, slots)))
+                if len(inflight) > 1:
+                    # backpressure: never hold more than two parsed chunks
+                    await inflight.pop(0)
+                # parse the next chunk while this one is inserted
+                next_chunk = loop.run_in_executor(None, _read_chunk, reader, user_id, offset, occurrences, engine)
+        if inflight:
+            await asyncio.gather(*inflight)
+    except BaseException as e:
+        # a chunk cancelled between its insert and its rollup/ledger update would leave them short
+        if inflight:
+            await asyncio.gather(*inflight, return_exceptions=True)
+        if isinstance(e, CsvImportError) and offset:
+            e.progress, e.row = progress, offset + 1
+        raise
+    finally:
+        progress.finished_at = time.time()
+
+    if progress.rows_parsed == 0:
+        raise CsvImportError(f"{_FORMAT_NAMES[fmt]} file is empty")
+    logger.info(
+        f"Imported {progress.rows_inserted}/{progress.rows_parsed} rows for user {user_id} "
+        f"({progress.rows_per_second:.0f} rows/s)"
+    )
+    return progress
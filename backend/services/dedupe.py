@@ -0,0 +1,322 @@
+"""Row fingerprints and import-time deduplication of transactions.
+
+Each imported row gets `fingerprint` = first 32 hex chars of SHA-256 over
+
+    user_id | YYYY-MM-DD | amount (2 dp) | category | description [#n]
+
+with category/description trimmed, whitespace-collapsed and lowercased,
+and `#n` appended to the n-th identical row of the same file so genuine
+repeats (two coffees on one day) survive while re-uploads do not. The
+same text is produced in SQL by `transaction_fingerprint()` (db/006).
+
+`FingerprintIndex` keeps a per-user Bloom filter of stored fingerprints.
+An import chunk is checked against it in memory; only possible hits are
+confirmed with one `existing_fingerprints` RPC, so dedupe costs at most
+one round trip per chunk. While a user has no filter (first import, or
+after the TTL) the whole chunk goes to that RPC instead, and the filter
+is built in the background from the user's stored fingerprints, so no
+import waits for its history to be read. The unique (user_id,
+fingerprint) index is the final guard against races with other workers.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from supabase_async import fetch_all, get_async_client
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_ENABLED = os.getenv("TRANSACTION_DEDUPE_ENABLED", "true").lower() == "true"
+DEDUPE_FILTER_USERS = int(os.getenv("DEDUPE_FILTER_USERS", "256"))
+DEDUPE_FILTER_TTL_SECONDS = float(os.getenv("DEDUPE_FILTER_TTL_SECONDS", "600"))
+DEDUPE_FALSE_POSITIVE_RATE = float(os.getenv("DEDUPE_FALSE_POSITIVE_RATE", "0.01"))
+
+FINGERPRINT_HEX_CHARS = 32
+_CENT = Decimal("0.01")
+
+
+def _normalize(text: Any) -> str:
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ""
+    return " ".join(str(text).split()).lower()
+
+
+def canonical_row(user_id: str, row: Dict[str, Any]) -> str:
+    """Canonical text of a transaction row, without the occurrence suffix."""
+    amount = Decimal(str(row["amount"])).quantize(_CENT, rounding=ROUND_HALF_UP)
+    description = (row.get("metadata") or {}).get("description")
+    return f"{user_id}|{str(row['date'])[:10]}|{amount}|{_normalize(row.get('category'))}|{_normalize(description)}"
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class OccurrenceCounter:
+    """Counts identical rows across the chunks of one file, in sorted uint64 arrays (16 bytes per distinct row)."""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def number(self, keys: np.ndarray) -> np.ndarray:
+        """Return the 1-based occurrence of each key, counting earlier calls."""
+        if not len(keys):
+            return np.empty(0, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        group_start = np.maximum.accumulate(np.where(starts, np.arange(len(keys)), 0))
+        within = np.arange(len(keys)) - group_start + 1
+
+        positions = np.searchsorted(self.keys, sorted_keys)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == sorted_keys[found]
+        prior = np.zeros(len(keys), dtype=np.int64)
+        prior[found] = self.counts[positions[found]]
+
+        occurrences = np.empty(len(keys), dtype=np.int64)
+        occurrences[order] = prior + within
+
+        unique, counts = np.unique(sorted_keys, return_counts=True)
+        merged_keys = np.concatenate([self.keys, unique])
+        merged_counts = np.concatenate([self.counts, counts])
+        merged_keys, inverse = np.unique(merged_keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=merged_counts).astype(np.int64)
+        self.keys = merged_keys
+        return occurrences
+
+
+def assign_fingerprints(user_id: str, rows: List[Dict[str, Any]],
+                        occurrences: Optional[OccurrenceCounter] = None) -> List[Dict[str, Any]]:
+    """Set `row["fingerprint"]` on every row (in place) and return the rows."""
+    if not rows:
+        return rows
+    occurrences = occurrences or OccurrenceCounter()
+    canonical = [canonical_row(user_id, row) for row in rows]
+    digests = [_digest(text) for text in canonical]
+    keys = np.frombuffer(b"".join(digest[:8] for digest in digests), dtype=np.uint64)
+    numbers = occurrences.number(keys)
+    for row, text, digest, number in zip(rows, canonical, digests, numbers.tolist()):
+        if number > 1:
+            digest = _digest(f"{text}#{number}")
+        row["fingerprint"] = digest.hex()[:FINGERPRINT_HEX_CHARS]
+    return rows
+
+
+class BloomFilter:
+    """Bit-array Bloom filter over hex fingerprints (which are already uniform hashes)."""
+
+    def __init__(self, capacity: int, error_rate: float = DEDUPE_FALSE_POSITIVE_RATE):
+        self.capacity = max(1024, int(capacity))
+        bits = int(np.ceil(-self.capacity * np.log(error_rate) / (np.log(2) ** 2)))
+        self.size = max(64, bits)
+        self.hashes = max(1, int(round(self.size / self.capacity * np.log(2))))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, fingerprints: Sequence[str]) -> np.ndarray:
+        # double hashing: h1 + i * h2 over two 64-bit halves of the fingerprint
+        h1 = np.fromiter((int(fp[:16], 16) for fp in fingerprints), dtype=np.uint64, count=len(fingerprints))
+        h2 = np.fromiter((int(fp[16:32], 16) | 1 for fp in fingerprints), dtype=np.uint64, count=len(fingerprints))
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            combined = h1[:, None] + steps[None, :] * h2[:, None]
+        return (combined % np.uint64(self.size)).astype(np.int64)
+
+    def add(self, fingerprints: Sequence[str]) -> None:
+        if not fingerprints:
+            return
+        positions = self._positions(fingerprints).ravel()
+        np.bitwise_or.at(self.bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+        self.count += len(fingerprints)
+
+    def might_contain(self, fingerprints: Sequence[str]) -> np.ndarray:
+        if not fingerprints:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(fingerprints)
+        set_bits = (self.bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1
+        return set_bits.all(axis=1)
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+
+class FingerprintIndex:
+    """Per-user Bloom filters of stored fingerprints, LRU by user count with a TTL."""
+
+    def __init__(self, max_users: int = DEDUPE_FILTER_USERS, ttl: float = DEDUPE_FILTER_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._clock = clock
+        self._filters: "OrderedDict[str, Tuple[float, BloomFilter]]" = OrderedDict()
+        # users whose filter is being built -> fingerprints inserted meanwhile
+        self._warming: Dict[str, List[str]] = {}
+        self._builds: Set["asyncio.Future"] = set()
+        self._lock = threading.Lock()
+        self.cold_lookups = 0
+        self.exact_lookups = 0
+        self.candidates_checked = 0
+        self.duplicates_found = 0
+
+    def _cached(self, user_id: str) -> Optional[BloomFilter]:
+        with self._lock:
+            entry = self._filters.get(user_id)
+            if entry is None or entry[0] <= self._clock() or entry[1].saturated:
+                self._filters.pop(user_id, None)
+                return None
+            self._filters.move_to_end(user_id)
+            return entry[1]
+
+    def _store_locked(self, user_id: str, bloom: BloomFilter) -> None:
+        self._filters[user_id] = (self._clock() + self.ttl, bloom)
+        self._filters.move_to_end(user_id)
+        while len(self._filters) > self.max_users:
+            self._filters.popitem(last=False)
+
+    def _warm(self, user_id: str, incoming: int) -> None:
+        """Start building `user_id`'s filter in the background unless a build is already running."""
+        with self._lock:
+            if user_id in self._warming:
+                return
+            self._warming[user_id] = []
+        build = asyncio.ensure_future(self._build(user_id, incoming))
+        self._builds.add(build)
+        build.add_done_callback(self._builds.discard)
+
+    async def _build(self, user_id: str, incoming: int) -> None:
+        try:
+            stored = await fetch_all(
+                get_async_client().table("transactions").select("fingerprint")
+                .eq("user_id", user_id).not_("fingerprint", "is", "null")
+            )
+        except Exception as e:
+            logger.warning(f"Could not build fingerprint filter for user {user_id}: {e}")
+            with self._lock:
+                self._warming.pop(user_id, None)
+            return
+        fingerprints = [row["fingerprint"] for row in stored]
+        # headroom so a few more imports fit before the filter is rebuilt
+        bloom = BloomFilter(2 * (len(fingerprints) + incoming))
+        bloom.add(fingerprints)
+        with self._lock:
+            inserted_meanwhile = self._warming.pop(user_id, None)
+            if inserted_meanwhile is None:
+                return  # invalidated while building
+            bloom.add(inserted_meanwhile)
+            self._store_locked(user_id, bloom)
+
+    async def wait_warm(self) -> None:
+        """Wait for filters being built in the background."""
+        while self._builds:
+            await asyncio.gather(*list(self._builds), return_exceptions=True)
+
+    async def split_new(self, user_id: str, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Return (rows whose fingerprint is not stored yet, number of duplicates dropped)."""
+        if not rows:
+            return rows, 0
+        fingerprints = [row["fingerprint"] for row in rows]
+        bloom = self._cached(user_id)
+        if bloom is None:
+            # no filter yet: one exact lookup for the whole chunk beats reading the user's history first
+            self._warm(user_id, len(rows))
+            candidates = fingerprints
+            self.cold_lookups += 1
+        else:
+            maybe = bloom.might_contain(fingerprints)
+            candidates = [fp for fp, hit in zip(fingerprints, maybe) if hit]
+        existing = set()
+        if candidates:
+            result = await get_async_client().rpc(
+                "existing_fingerprints", {"p_user_id": user_id, "p_fingerprints": candidates}
+            )
+            existing = {row["fingerprint"] for row in (result.data or [])}
+            self.exact_lookups += 1
+            self.candidates_checked += len(candidates)
+            self.duplicates_found += len(existing)
+        fresh = [row for row in rows if row["fingerprint"] not in existing]
+        return fresh, len(rows) - len(fresh)
+
+    def record(self, user_id: str, fingerprints: Iterable[str]) -> None:
+        """Add fingerprints just inserted for `user_id` to its cached (or still building) filter."""
+        fingerprints = list(fingerprints)
+        with self._lock:
+            pending = self._warming.get(user_id)
+            if pending is not None:
+                pending.extend(fingerprints)
+                return
+        bloom = self._cached(user_id)
+        if bloom is not None:
+            bloom.add(fingerprints)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._filters.pop(user_id, None)
+            self._warming.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._filters),
+                "bytes": sum(bloom.nbytes for _, bloom in self._filters.values()),
+                "warming": len(self._warming),
+                "cold_lookups": self.cold_lookups,
+                "exact_lookups": self.exact_lookups,
+                "candidates_checked": self.candidates_checked,
+                "duplicates_found": self.duplicates_found,
+            }
+
+
+fingerprint_index = FingerprintIndex()
+
+
+async def insert_fingerprinted(user_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert rows carrying fingerprints, ignoring ones already stored; returns the rows actually inserted.
+
+    Conflicts on the unique index (e.g. a concurrent import of the same
+    rows) are skipped by PostgREST, and only rows it reports back count.
+    """
+    if not rows:
+        return []
+    if not DEDUPE_ENABLED:
+        for row in rows:
+            row.pop("fingerprint", None)
+        await get_async_client().table("transactions").insert(rows, returning="minimal").execute()
+        return rows
+    result = await (
+        get_async_client().table("transactions")
+        .upsert(rows, on_conflict="user_id,fingerprint", ignore_duplicates=True)
+        .returning("fingerprint")
+        .execute()
+    )
+    stored = {row["fingerprint"] for row in (result.data or [])}
+    fingerprint_index.record(user_id, stored)
+    return [row for row in rows if row["fingerprint"] in stored]
+
+
+async def drop_known(user_id: str, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Remove rows whose fingerprint is already stored; returns (remaining rows, duplicates dropped)."""
+    if not DEDUPE_ENABLED:
+        return rows, 0
+    return await fingerprint_index.split_new(user_id, rows)
+
+
+async def insert_new_transactions(user_id: str, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Insert the rows that are not already stored; returns (inserted rows, duplicates skipped)."""
+    fresh, duplicates = await drop_known(user_id, rows)
+    inserted = await insert_fingerprinted(user_id, fresh)
+    return inserted, duplicates + len(fresh) - len(inserted)
@@ -0,0 +1,267 @@
+"""Background CSV import jobs.
+
+`/upload/upload-csv?background=true` spools the upload to local disk,
+registers an `ImportJob` and returns 202 with its id; a small pool of
+worker tasks runs `csv_import.ingest_csv` on the spooled file while the
+client polls `/upload/jobs/{id}`.
+
+`LocalJobStore` keeps each job as a JSON file next to the spool files
+(written atomically), so any worker process on the host can answer a poll
+without external services. Jobs are not resumed: a job still queued or
+running at shutdown is marked failed, and on start a worker process marks
+failed the unfinished jobs of processes that are no longer alive (each
+record carries its owner's pid), keeping their last saved counters and
+deleting their spool files, so every poll ends in a terminal status.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from services.csv_import import (
+    FORMAT_CSV, UPLOAD_STREAM_MAX_BYTES, CsvImportError, ImportProgress, ingest_csv, open_upload, upload_format,
+)
+
+logger = logging.getLogger(__name__)
+
+IMPORT_JOB_DIR = os.getenv("IMPORT_JOB_DIR", os.path.join(tempfile.gettempdir(), "famfinity-imports"))
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
+IMPORT_JOB_RETENTION_SECONDS = float(os.getenv("IMPORT_JOB_RETENTION_SECONDS", str(24 * 3600)))
+# How often a running job's counters are written to the store
+IMPORT_JOB_PROGRESS_INTERVAL = float(os.getenv("IMPORT_JOB_PROGRESS_INTERVAL", "1"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_TERMINAL = (JOB_SUCCEEDED, JOB_FAILED)
+
+INTERRUPTED_BY_SHUTDOWN = "Interrupted by shutdown"
+INTERRUPTED_BY_RESTART = "Interrupted by restart"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ImportJob:
+    """One background import and its progress counters."""
+
+    def __init__(self, user_id: str, filename: str, spool_path: str, job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.user_id = user_id
+        self.filename = filename
+        self.spool_path = spool_path
+        self.status = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.bytes_received = 0
+        self.progress = ImportProgress()
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.worker_pid = os.getpid()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "user_id": self.user_id,
+            "filename": self.filename,
+            "status": self.status,
+            "error": self.error,
+            "bytes_received": self.bytes_received,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "worker_pid": self.worker_pid,
+            **self.progress.to_dict(),
+        }
+
+
+class LocalJobStore:
+    """Job records as `<directory>/<job_id>.json`, replaced atomically on every save."""
+
+    def __init__(self, directory: str = IMPORT_JOB_DIR):
+        self.directory = directory
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def spool_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.csv")
+
+    def save(self, job: ImportJob) -> None:
+        self._write(job.to_dict())
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(record["job_id"]) + ".tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump(record, handle)
+        os.replace(tmp_path, self._path(record["job_id"]))
+
+    def remove_spool(self, job_id: str) -> None:
+        try:
+            os.remove(self.spool_path(job_id))
+        except OSError:
+            pass
+
+    def _records(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        records = (self.get(name[:-5]) for name in os.listdir(self.directory) if name.endswith(".json"))
+        return [record for record in records if record]
+
+    def fail_interrupted(self, error: str = INTERRUPTED_BY_RESTART) -> int:
+        """Mark failed every unfinished job whose worker process is gone (or is this one), deleting its spool.
+
+        Called when a runner starts, before it owns any job, so unfinished
+        jobs of this pid are leftovers too; live processes keep theirs.
+        """
+        failed = 0
+        for record in self._records():
+            if record["status"] in JOB_TERMINAL:
+                continue
+            pid = record.get("worker_pid")
+            if pid and pid != os.getpid() and _process_alive(pid):
+                continue
+            record.update(status=JOB_FAILED, error=error, finished_at=time.time())
+            self._write(record)
+            self.remove_spool(record["job_id"])
+            failed += 1
+        return failed
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # job ids are hex; anything else cannot name a job file
+        if not job_id or not all(ch in "0123456789abcdef" for ch in job_id):
+            return None
+        try:
+            with open(self._path(job_id)) as handle:
+                return json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def prune(self, max_age: float = IMPORT_JOB_RETENTION_SECONDS) -> int:
+        """Delete finished job records, and spool files without a record, older than `max_age` seconds."""
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        cutoff = time.time() - max_age
+        for record in self._records():
+            if record["status"] in JOB_TERMINAL and (record["finished_at"] or 0) < cutoff:
+                os.remove(self._path(record["job_id"]))
+                removed += 1
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            # uploads abandoned before their job was registered
+            if name.endswith(".csv") and not os.path.exists(path[:-4] + ".json") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        return removed
+
+
+class ImportJobRunner:
+    """Queue of spooled imports drained by `workers` asyncio tasks."""
+
+    def __init__(self, store: Optional[LocalJobStore] = None, workers: int = IMPORT_JOB_WORKERS):
+        self.store = store or LocalJobStore()
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        try:
+            interrupted = self.store.fail_interrupted()
+            if interrupted:
+                logger.warning(f"Marked {interrupted} interrupted import jobs as failed")
+            self.store.prune()
+        except OSError as e:
+            logger.warning(f"Could not clean up import jobs: {e}")
+
+    async def stop(self) -> None:
+        # running jobs record their own failure when cancelled (see `run`)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            job.status, job.error, job.finished_at = JOB_FAILED, INTERRUPTED_BY_SHUTDOWN, time.time()
+            self.store.save(job)
+            self.store.remove_spool(job.id)
+
+    def create(self, user_id: str, filename: str) -> ImportJob:
+        job_id = uuid.uuid4().hex
+        job = ImportJob(user_id, filename, self.store.spool_path(job_id), job_id=job_id)
+        os.makedirs(self.store.directory, exist_ok=True)
+        return job
+
+    def submit(self, job: ImportJob) -> None:
+        self.start()
+        self.store.save(job)
+        self._queue.put_nowait(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.run(job)
+            except Exception as e:
+                logger.exception(f"Import job {job.id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _report(self, job: ImportJob) -> None:
+        while True:
+            await asyncio.sleep(IMPORT_JOB_PROGRESS_INTERVAL)
+            self.store.save(job)
+
+    async def run(self, job: ImportJob) -> None:
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        job.progress = ImportProgress()
+        self.store.save(job)
+        reporter = asyncio.ensure_future(self._report(job))
+        try:
+            with open(job.spool_path, "rb") as spool:
+                source = open_upload(spool, job.filename, UPLOAD_STREAM_MAX_BYTES)
+                await ingest_csv(source, job.user_id, job.progress, fmt=upload_format(job.filename) or FORMAT_CSV)
+            if job.progress.rows_inserted == 0 and not job.progress.rows_duplicate:
+                job.status = JOB_FAILED
+                job.error = "Failed to insert transactions" if job.progress.rows_failed else "No valid transactions found in CSV"
+            else:
+                job.status = JOB_SUCCEEDED
+        except CsvImportError as e:
+            job.status, job.error = JOB_FAILED, str(e)
+        except asyncio.CancelledError:
+            job.status, job.error = JOB_FAILED, INTERRUPTED_BY_SHUTDOWN
+            raise
+        except Exception as e:
+            logger.error(f"Import job {job.id} failed: {e}")
+            job.status, job.error = JOB_FAILED, str(e)
+        finally:
+            reporter.cancel()
+            job.finished_at = time.time()
+            self.store.save(job)
+            try:
+                os.remove(job.spool_path)
+            except OSError:
+                pass
+
+
+import_jobs = ImportJobRunner()
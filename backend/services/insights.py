@@ -1,149 +1,205 @@
+import logging
 from datetime import date, datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 
-from supabase_client import get_server_client
+import numpy as np
+import pandas as pd
 
+from supabase_async import AsyncAPIError, fetch_all, get_async_client
+from services.rollups import ROLLUPS_TABLE, fetch_rollups, rollups_usable
+from services.transaction_frame import load_transaction_frame
+from services.ledger_cache import peek_ledger
 
-def get_total_expenses(user_id: str, month: str | None) -> float:
+logger = logging.getLogger(__name__)
+
+
+def _month_range(month: str) -> Tuple[str, str]:
+    """Return [first day of month, first day of next month) for 'YYYY-MM'."""
+    year, month_num = month.split('-')
+    year, month_num = int(year), int(month_num)
+    start_date = f"{year}-{month_num:02d}-01"
+    if month_num == 12:
+        end_date = f"{year + 1}-01-01"
+    else:
+        end_date = f"{year}-{month_num + 1:02d}-01"
+    return start_date, end_date
+
+
+def summarize_amounts(amounts: np.ndarray, categories: np.ndarray) -> Dict[str, Any]:
+    """Totals and expense-by-category breakdown from parallel amount/category arrays."""
+    expense_mask = amounts < 0
+    total_expenses = float(-amounts[expense_mask].sum())
+    total_income = float(amounts[amounts > 0].sum())
+
+    by_category = (
+        pd.Series(-amounts[expense_mask])
+        .groupby(categories[expense_mask], dropna=False, sort=False)
+        .sum()
+    )
+    by_category = by_category[by_category > 0].sort_values(ascending=False, kind="stable")
+    categories_out = [
+        {"category": None if pd.isna(cat) else cat, "total": float(total)}
+        for cat, total in by_category.items()
+    ]
+    return {
+        "total_expenses": total_expenses,
+        "total_income": total_income,
+        "categories": categories_out,
+    }
+
+
+def _summary_from_rollups(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    frame = pd.DataFrame.from_records(rows, columns=["category", "expense_total", "income_total"])
+    expenses = pd.to_numeric(frame["expense_total"]).to_numpy(dtype=np.float64)
+    income = pd.to_numeric(frame["income_total"]).to_numpy(dtype=np.float64)
+
+    by_category = pd.Series(expenses).groupby(frame["category"].to_numpy(dtype=object), sort=False).sum()
+    by_category = by_category[by_category > 0].sort_values(ascending=False, kind="stable")
+    return {
+        "total_expenses": float(expenses.sum()),
+        "total_income": float(income.sum()),
+        "categories": [{"category": cat, "total": float(total)} for cat, total in by_category.items()],
+    }
+
+
+async def _scan_month_summary(user_id: str, month: str | None) -> Dict[str, Any]:
+    start_date, end_date = _month_range(month) if month else (None, None)
+    transactions = await load_transaction_frame(user_id, start_date, end_date, columns=("amount", "category"))
+    if transactions.is_empty:
+        return {"total_expenses": 0.0, "total_income": 0.0, "categories": []}
+    return summarize_amounts(transactions.amounts, np.asarray(transactions.categories, dtype=object))
+
+
+async def get_month_summary(user_id: str, month: str | None) -> Dict[str, Any]:
+    """Return total expenses, total income and expense-by-category in one query.
+
+    Answered from the user's cached ledger when it is resident; otherwise
+    reads the monthly rollups (one row per category per month), falling back
+    to scanning raw transactions when rollups are disabled, missing, or stale
+    after a failed update.
+    """
+    ledger = peek_ledger(user_id)
+    if ledger is not None:
+        return ledger.month_summary(month)
+    if rollups_usable(user_id):
+        try:
+            return _summary_from_rollups(await fetch_rollups(user_id, month))
+        except AsyncAPIError as e:
+            logger.warning(f"Rollup read failed, scanning transactions instead: {e}")
+    return await _scan_month_summary(user_id, month)
+
+
+async def get_total_expenses(user_id: str, month: str | None) -> float:
     """Return total expenses for user. If month provided as 'YYYY-MM', filter to that month."""
-    sb = get_server_client()
-    
-    query = sb.table("transactions").select("amount").eq("user_id", user_id)
-    
-    if month:
-        # Filter by month prefix (YYYY-MM) - use proper date range
-        from datetime import datetime
-        year, month_num = month.split('-')
-        year, month_num = int(year), int(month_num)
-        
-        # Get the first day of the month
-        start_date = f"{year}-{month_num:02d}-01"
-        
-        # Get the first day of the next month
-        if month_num == 12:
-            end_date = f"{year + 1}-01-01"
-        else:
-            end_date = f"{year}-{month_num + 1:02d}-01"
-        
-        query = query.gte("date", start_date).lt("date", end_date)
-    
-    result = query.execute()
-    
-    if not result.data:
-        return 0.0
-    
-    # Sum up negative amounts (expenses)
-    total = sum(abs(float(row["amount"])) for row in result.data if float(row["amount"]) < 0)
-    return total
-
-
-def get_total_income(user_id: str, month: str | None) -> float:
+    return (await get_month_summary(user_id, month))["total_expenses"]
+
+
+async def get_total_income(user_id: str, month: str | None) -> float:
     """Return total income for user. If month provided as 'YYYY-MM', filter to that month."""
-    sb = get_server_client()
-    
-    query = sb.table("transactions").select("amount").eq("user_id", user_id)
-    
-    if month:
-        # Filter by month prefix (YYYY-MM) - use proper date range
-        from datetime import datetime
-        year, month_num = month.split('-')
-        year, month_num = int(year), int(month_num)
-        
-        # Get the first day of the month
-        start_date = f"{year}-{month_num:02d}-01"
-        
-        # Get the first day of the next month
-        if month_num == 12:
-            end_date = f"{year + 1}-01-01"
-        else:
-            end_date = f"{year}-{month_num + 1:02d}-01"
-        
-        query = query.gte("date", start_date).lt("date", end_date)
-    
-    result = query.execute()
-    
-    if not result.data:
-        return 0.0
-    
-    # Sum up positive amounts (income)
-    total = sum(float(row["amount"]) for row in result.data if float(row["amount"]) > 0)
-    return total
-
-
-def get_expense_by_category(user_id: str, month: str | None) -> List[Dict[str, Any]]:
+    return (await get_month_summary(user_id, month))["total_income"]
+
+
+async def get_expense_by_category(user_id: str, month: str | None) -> List[Dict[str, Any]]:
     """Return expense totals by category. If month provided as 'YYYY-MM', filter to that month."""
-    sb = get_server_client()
-    
-    query = sb.table("transactions").select("category, amount").eq("user_id", user_id)
-    
-    if month:
-        # Filter by month prefix (YYYY-MM) - use proper date range
-        from datetime import datetime
-        year, month_num = month.split('-')
-        year, month_num = int(year), int(month_num)
-        
-        # Get the first day of the month
-        start_date = f"{year}-{month_num:02d}-01"
-        
-        # Get the first day of the next month
-        if month_num == 12:
-            end_date = f"{year + 1}-01-01"
-        else:
-            end_date = f"{year}-{month_num + 1:02d}-01"
-        
-        query = query.gte("date", start_date).lt("date", end_date)
-    
-    result = query.execute()
-    
-    if not result.data:
+    return (await get_month_summary(user_id, month))["categories"]
+
+
+TREND_SERIES = ("expense", "income")
+
+
+def _shift_month(month: str, delta: int) -> str:
+    """Return the 'YYYY-MM' month `delta` months away from `month`."""
+    year, month_num = (int(part) for part in month.split('-'))
+    index = year * 12 + (month_num - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def fill_monthly_series(months: np.ndarray, expenses: np.ndarray, income: np.ndarray,
+                        start_month: str, end_month: str) -> pd.DataFrame:
+    """Sum per month and reindex onto every month in [start_month, end_month], zero-filling gaps."""
+    frame = pd.DataFrame({"month": months, "expense": expenses, "income": income})
+    totals = frame.groupby("month", sort=False)[["expense", "income"]].sum()
+    calendar = [str(p) for p in pd.period_range(start_month, end_month, freq="M")]
+    return totals.reindex(calendar, fill_value=0.0)
+
+
+async def _latest_activity_month(user_id: str) -> str | None:
+    ledger = peek_ledger(user_id)
+    if ledger is not None:
+        return ledger.latest_month()
+    sb = get_async_client()
+    if rollups_usable(user_id):
+        try:
+            res = await sb.table(ROLLUPS_TABLE).select("month").eq("user_id", user_id).order("month", desc=True).limit(1).execute()
+            return res.data[0]["month"] if res.data else None
+        except AsyncAPIError as e:
+            logger.warning(f"Rollup read failed, scanning transactions instead: {e}")
+    res = await sb.table("transactions").select("date").eq("user_id", user_id).order("date", desc=True).limit(1).execute()
+    return str(res.data[0]["date"])[:7] if res.data else None
+
+
+async def _window_totals(user_id: str, start_month: str, end_month: str) -> pd.DataFrame:
+    """Per-month expense/income totals for the window, read with the window pushed into the query."""
+    ledger = peek_ledger(user_id)
+    if ledger is not None:
+        return ledger.monthly_totals(start_month, end_month)
+    sb = get_async_client()
+    if rollups_usable(user_id):
+        try:
+            rows = await fetch_all(
+                sb.table(ROLLUPS_TABLE).select("month, expense_total, income_total")
+                .eq("user_id", user_id).gte("month", start_month).lte("month", end_month)
+                .order("month").order("category")
+            )
+            frame = pd.DataFrame.from_records(rows, columns=["month", "expense_total", "income_total"])
+            return fill_monthly_series(
+                frame["month"].to_numpy(dtype=object),
+                pd.to_numeric(frame["expense_total"]).to_numpy(dtype=np.float64),
+                pd.to_numeric(frame["income_total"]).to_numpy(dtype=np.float64),
+                start_month, end_month,
+            )
+        except AsyncAPIError as e:
+            logger.warning(f"Rollup read failed, scanning transactions instead: {e}")
+
+    transactions = await load_transaction_frame(
+        user_id, f"{start_month}-01", f"{_shift_month(end_month, 1)}-01", columns=("date", "amount")
+    )
+    amounts = transactions.amounts
+    return fill_monthly_series(
+        transactions.month_keys(),
+        np.where(amounts < 0, -amounts, 0.0),
+        np.where(amounts > 0, amounts, 0.0),
+        start_month, end_month,
+    )
+
+
+async def get_monthly_trend(user_id: str, last_n_months: int, series: str = "expense",
+                            end_month: str | None = None) -> List[Dict[str, Any]]:
+    """Return a dense, chronological series of the last N months (inclusive).
+
+    Each point is {month: 'YYYY-MM', total, expense, income}; `total` is the
+    requested series ('expense' or 'income'). Months without activity are
+    present with zeros. The window ends at `end_month`, or at the user's
+    latest month with activity, and only that window is read, so cost scales
+    with N rather than with account age.
+    """
+    if series not in TREND_SERIES:
+        raise ValueError(f"Unknown trend series: {series}")
+    if last_n_months <= 0:
         return []
-    
-    # Aggregate by category
-    category_totals: Dict[str, float] = {}
-    for row in result.data:
-        amount = float(row["amount"])
-        if amount < 0:  # Only expenses
-            category = row["category"]
-            category_totals[category] = category_totals.get(category, 0.0) + abs(amount)
-    
-    # Convert to list and sort by total
-    categories = [
-        {"category": cat, "total": total}
-        for cat, total in category_totals.items()
-        if total > 0
-    ]
-    categories.sort(key=lambda x: x["total"], reverse=True)
-    
-    return categories
-
-
-def get_monthly_trend(user_id: str, last_n_months: int) -> List[Dict[str, Any]]:
-    """Return a list of {month: 'YYYY-MM', total: float} for the last N months (inclusive)."""
-    sb = get_server_client()
-    
-    # Get all transactions for user
-    result = sb.table("transactions").select("date, amount").eq("user_id", user_id).order("date", desc=True).execute()
-    
-    if not result.data:
+
+    end_month = end_month or await _latest_activity_month(user_id)
+    if not end_month:
         return []
-    
-    # Aggregate by month
-    monthly_totals: Dict[str, float] = {}
-    for row in result.data:
-        amount = float(row["amount"])
-        if amount < 0:  # Only expenses
-            # Extract YYYY-MM from date
-            date_str = row["date"]
-            month = date_str[:7]  # Get YYYY-MM
-            monthly_totals[month] = monthly_totals.get(month, 0.0) + abs(amount)
-    
-    # Sort months and take last N
-    sorted_months = sorted(monthly_totals.keys(), reverse=True)[:last_n_months]
-    
-    # Reverse to chronological order
-    trend = [
-        {"month": month, "total": monthly_totals[month]}
-        for month in reversed(sorted_months)
+    start_month = _shift_month(end_month, -(last_n_months - 1))
+
+    totals = await _window_totals(user_id, start_month, end_month)
+    return [
+        {
+            "month": month,
+            "total": float(row[series]),
+            "expense": float(row["expense"]),
+            "income": float(row["income"]),
+        }
+        for month, row in totals.iterrows()
     ]
-    
-    return trend
@@ -0,0 +1,353 @@
+"""Process-local cache of each active user's transactions as sorted NumPy arrays.
+
+Finance, advisor, goals and recommendations all read the same user's
+transactions. A `UserLedger` keeps them once, sorted by date:
+
+    days    int32    date as days since 1970-01-01
+    months  int32    year * 12 + month - 1
+    amounts float64
+    codes   int32    index into `categories`, -1 when missing
+
+so a month or window is two `searchsorted` calls and per-category or
+per-month totals are one `bincount`. Ledgers are immutable; writes build a
+new ledger. The `LedgerCache` is an LRU bounded by total bytes with a TTL
+(other workers' writes are only seen after it expires). Write endpoints
+call `record_transactions` after inserting rows; a per-user version counter
+makes sure a load that raced with a write is not cached.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.transaction_frame import TransactionFrame, load_transaction_frame
+
+LEDGER_CACHE_MAX_BYTES = int(os.getenv("LEDGER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LEDGER_CACHE_TTL_SECONDS = float(os.getenv("LEDGER_CACHE_TTL_SECONDS", "300"))
+
+# Rough per-category overhead of the Python strings and index dict entry
+_CATEGORY_OVERHEAD_BYTES = 120
+
+
+def _month_index(month: str) -> int:
+    year, month_num = month.split("-")
+    return int(year) * 12 + int(month_num) - 1
+
+
+def _month_key(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _day(value: Any) -> int:
+    return int(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64))
+
+
+def _months_of(days: np.ndarray) -> np.ndarray:
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    # datetime64[M] counts from 1970-01
+    return (months + 1970 * 12).astype(np.int32)
+
+
+class UserLedger:
+    """Immutable, date-sorted columnar copy of one user's transactions."""
+
+    __slots__ = ("days", "months", "amounts", "codes", "categories", "_category_index")
+
+    def __init__(self, days: np.ndarray, amounts: np.ndarray, codes: np.ndarray, categories: Sequence[str]):
+        self.days = days
+        self.months = _months_of(days)
+        self.amounts = amounts
+        self.codes = codes
+        self.categories = list(categories)
+        self._category_index = {name: code for code, name in enumerate(self.categories)}
+
+    @classmethod
+    def empty(cls) -> "UserLedger":
+        return cls(np.empty(0, np.int32), np.empty(0, np.float64), np.empty(0, np.int32), [])
+
+    @classmethod
+    def from_frame(cls, transactions: TransactionFrame) -> "UserLedger":
+        frame = transactions.frame
+        valid = frame["date"].notna().to_numpy()
+        days = frame["date"].to_numpy(dtype="datetime64[D]")[valid].astype(np.int64).astype(np.int32)
+        categorical = frame["category"].astype("category").array
+        order = np.argsort(days, kind="stable")
+        return cls(
+            days[order],
+            transactions.amounts[valid][order],
+            np.asarray(categorical.codes, dtype=np.int32)[valid][order],
+            [str(name) for name in categorical.categories],
+        )
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = self.days.nbytes + self.months.nbytes + self.amounts.nbytes + self.codes.nbytes
+        return arrays + sum(len(name) + _CATEGORY_OVERHEAD_BYTES for name in self.categories)
+
+    def with_rows(self, rows: Iterable[Dict[str, Any]]) -> "UserLedger":
+        """Return a new ledger with `rows` (date, amount, category) merged in date order."""
+        rows = list(rows)
+        if not rows:
+            return self
+        frame = pd.DataFrame.from_records(rows, columns=["date", "amount", "category"])
+        # written rows carry 'YYYY-MM-DD' (or an ISO datetime, cut to its date)
+        dates = pd.to_datetime(frame["date"].astype(str).str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+        valid = dates.notna().to_numpy()
+        days = np.zeros(len(frame), dtype=np.int32)
+        days[valid] = dates[valid].to_numpy(dtype="datetime64[D]").astype(np.int64)
+        amounts = pd.to_numeric(frame["amount"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+
+        categories = list(self.categories)
+        index = dict(self._category_index)
+        codes = np.empty(len(frame), dtype=np.int32)
+        for i, name in enumerate(frame["category"].tolist()):
+            if name is None or (isinstance(name, float) and np.isnan(name)):
+                codes[i] = -1
+                continue
+            name = str(name)
+            code = index.get(name)
+            if code is None:
+                code = index[name] = len(categories)
+                categories.append(name)
+            codes[i] = code
+
+        order = np.argsort(days[valid], kind="stable")
+        new_days = days[valid][order]
+        positions = np.searchsorted(self.days, new_days, side="right")
+        return UserLedger(
+            np.insert(self.days, positions, new_days),
+            np.insert(self.amounts, positions, amounts[valid][order]),
+            np.insert(self.codes, positions, codes[valid][order]),
+            categories,
+        )
+
+    def _slice(self, start_day: Optional[int], end_day: Optional[int]) -> Tuple[int, int]:
+        """Index bounds of rows with start_day <= day < end_day."""
+        lo = 0 if start_day is None else int(np.searchsorted(self.days, start_day, side="left"))
+        hi = len(self.days) if end_day is None else int(np.searchsorted(self.days, end_day, side="left"))
+        return lo, max(lo, hi)
+
+    def _month_bounds(self, month: Optional[str]) -> Tuple[int, int]:
+        if not month:
+            return 0, len(self.days)
+        index = _month_index(month)
+        lo = int(np.searchsorted(self.months, index, side="left"))
+        hi = int(np.searchsorted(self.months, index, side="right"))
+        return lo, hi
+
+    def month_summary(self, month: Optional[str] = None) -> Dict[str, Any]:
+        """Totals and expense-by-category for one 'YYYY-MM' month (or all time).
+
+        Same shape as `insights.summarize_amounts`.
+        """
+        lo, hi = self._month_bounds(month)
+        amounts = self.amounts[lo:hi]
+        codes = self.codes[lo:hi]
+        expense = amounts < 0
+        # slot 0 holds rows without a category (code -1)
+        per_category = np.bincount(codes[expense] + 1, weights=-amounts[expense],
+                                   minlength=len(self.categories) + 1)
+        order = np.argsort(-per_category, kind="stable")
+        return {
+            "total_expenses": float(-amounts[expense].sum()),
+            "total_income": float(amounts[amounts > 0].sum()),
+            "categories": [
+                {"category": None if slot == 0 else self.categories[slot - 1], "total": float(per_category[slot])}
+                for slot in order if per_category[slot] > 0
+            ],
+        }
+
+    def monthly_totals(self, start_month: str, end_month: str) -> pd.DataFrame:
+        """Expense/income per month over [start_month, end_month], zero-filled, indexed by 'YYYY-MM'."""
+        first, last = _month_index(start_month), _month_index(end_month)
+        lo = int(np.searchsorted(self.months, first, side="left"))
+        hi = int(np.searchsorted(self.months, last, side="right"))
+        offsets = self.months[lo:hi] - first
+        amounts = self.amounts[lo:hi]
+        size = max(0, last - first + 1)
+        return pd.DataFrame(
+            {
+                "expense": np.bincount(offsets, weights=np.where(amounts < 0, -amounts, 0.0), minlength=size),
+                "income": np.bincount(offsets, weights=np.where(amounts > 0, amounts, 0.0), minlength=size),
+            },
+            index=[_month_key(index) for index in range(first, last + 1)],
+        )
+
+    def latest_month(self) -> Optional[str]:
+        return _month_key(int(self.months[-1])) if len(self.months) else None
+
+    def to_frame(self, start_date: Optional[Any] = None, end_date: Optional[Any] = None) -> TransactionFrame:
+        """Rows with start_date <= date < end_date as a `TransactionFrame` (date, amount, category)."""
+        lo, hi = self._slice(
+            None if start_date is None else _day(start_date),
+            None if end_date is None else _day(end_date),
+        )
+        frame = pd.DataFrame({
+            "date": self.days[lo:hi].astype("datetime64[D]"),
+            "amount": self.amounts[lo:hi],
+            "category": pd.Categorical.from_codes(self.codes[lo:hi], categories=self.categories),
+        })
+        return TransactionFrame(frame, columns=("date", "amount", "category"))
+
+
+class LedgerCache:
+    """LRU of `UserLedger`s bounded by total bytes, with a TTL and per-user version counters."""
+
+    def __init__(self, max_bytes: int = LEDGER_CACHE_MAX_BYTES, ttl: float = LEDGER_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, UserLedger]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.appends = 0
+        self.invalidations = 0
+
+    def version(self, user_id: str) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def _drop(self, user_id: str) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self.total_bytes -= entry[1].nbytes
+
+    def get(self, user_id: str) -> Optional[UserLedger]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                self._drop(user_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id: str, ledger: UserLedger, version: Optional[int] = None) -> bool:
+        """Cache `ledger`; refused if a write happened since `version` was read or it does not fit."""
+        size = ledger.nbytes
+        if self.ttl <= 0 or size > self.max_bytes:
+            return False
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            if version is not None and self._versions.get(user_id, 0) != version:
+                return False
+            self._drop(user_id)
+            self._entries[user_id] = (expires_at, ledger)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, old) = self._entries.popitem(last=False)
+                self.total_bytes -= old.nbytes
+                self.evictions += 1
+        return True
+
+    def append(self, user_id: str, rows: Iterable[Dict[str, Any]]) -> None:
+        """Merge newly written rows into a resident ledger and bump the user's version."""
+        rows = list(rows)
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            entry = self._entries.get(user_id)
+            if entry is None or not rows:
+                return
+            expires_at, ledger = entry
+            updated = ledger.with_rows(rows)
+            self.total_bytes += updated.nbytes - ledger.nbytes
+            self._entries[user_id] = (expires_at, updated)
+            self.appends += 1
+            while self.total_bytes > self.max_bytes and self._entries:
+                _, (_, old) = self._entries.popitem(last=False)
+                self.total_bytes -= old.nbytes
+                self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            if user_id in self._entries:
+                self._drop(user_id)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._entries),
+                "rows": sum(len(ledger) for _, ledger in self._entries.values()),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "appends": self.appends,
+                "invalidations": self.invalidations,
+            }
+
+
+ledger_cache = LedgerCache()
+_loading: Dict[str, "asyncio.Future[UserLedger]"] = {}
+
+
+def peek_ledger(user_id: Any) -> Optional[UserLedger]:
+    """Return the user's ledger only if it is already resident (never touches the network)."""
+    return ledger_cache.get(str(user_id))
+
+
+async def get_ledger(user_id: Any) -> UserLedger:
+    """Return the user's ledger, loading full history once on a miss.
+
+    Concurrent misses for the same user share one load.
+    """
+    user_id = str(user_id)
+    ledger = ledger_cache.get(user_id)
+    if ledger is not None:
+        return ledger
+    pending = _loading.get(user_id)
+    if pending is not None and not pending.done():
+        return await asyncio.shield(pending)
+
+    async def load() -> UserLedger:
+        version = ledger_cache.version(user_id)
+        frame = await load_transaction_frame(user_id, columns=("date", "amount", "category"))
+        loaded = UserLedger.from_frame(frame)
+        ledger_cache.put(user_id, loaded, version)
+        return loaded
+
+    task = asyncio.ensure_future(load())
+    _loading[user_id] = task
+    try:
+        return await asyncio.shield(task)
+    finally:
+        if _loading.get(user_id) is task and task.done():
+            del _loading[user_id]
+
+
+def record_transactions(user_id: Any, rows: Iterable[Dict[str, Any]]) -> None:
+    """Fold rows just inserted into `transactions` into the user's cached ledger (call after writes)."""
+    if user_id:
+        ledger_cache.append(str(user_id), rows)
+
+
+def invalidate_ledger(user_id: Any) -> None:
+    """Drop the cached ledger for `user_id`."""
+    if user_id:
+        ledger_cache.invalidate(str(user_id))
@@ -0,0 +1,123 @@
+"""Bulk creation of manual expenses for `/expenses/bulk`.
+
+Every item is validated up front and gets its own result, so a bad item
+is reported by index instead of failing the request. The valid items are
+inserted in batches of EXPENSE_INSERT_BATCH_ROWS rows, at most
+EXPENSE_INSERT_CONCURRENCY requests in flight. Each batch is one insert
+statement, so a failed batch fails only its own items. The rollups are
+then updated once with every row that was written.
+"""
+import asyncio
+import logging
+import math
+import os
+import uuid
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from supabase_async import get_async_client
+from services.rollups import apply_manual_expense_rows
+
+logger = logging.getLogger(__name__)
+
+EXPENSE_BULK_MAX_ITEMS = int(os.getenv("EXPENSE_BULK_MAX_ITEMS", "1000"))
+EXPENSE_INSERT_BATCH_ROWS = int(os.getenv("EXPENSE_INSERT_BATCH_ROWS", "200"))
+EXPENSE_INSERT_CONCURRENCY = int(os.getenv("EXPENSE_INSERT_CONCURRENCY", "4"))
+
+EXPENSE_TYPES = ("daily", "monthly", "one-time")
+DEFAULT_EXPENSE_TYPE = "one-time"
+
+
+def _validate_item(item: Any, user_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(insert-ready row, None) or (None, error) for one submitted expense."""
+    if not isinstance(item, dict):
+        return None, "expense must be an object"
+    try:
+        day = date.fromisoformat(str(item.get("date"))).isoformat()
+    except ValueError:
+        return None, f"invalid date '{item.get('date')}' (expected YYYY-MM-DD)"
+    amount = item.get("amount")
+    if isinstance(amount, bool) or not isinstance(amount, (int, float, str)):
+        return None, f"invalid amount '{amount}'"
+    try:
+        amount = float(amount)
+    except ValueError:
+        return None, f"invalid amount '{amount}'"
+    if not math.isfinite(amount) or amount <= 0:
+        return None, f"amount must be a positive number, got {amount}"
+    category = item.get("category")
+    if not isinstance(category, str) or not category.strip():
+        return None, "category is required"
+    description = item.get("description")
+    if description is not None and not isinstance(description, str):
+        return None, "description must be a string"
+    expense_type = item.get("expense_type") or DEFAULT_EXPENSE_TYPE
+    if expense_type not in EXPENSE_TYPES:
+        return None, f"expense_type must be one of {list(EXPENSE_TYPES)}"
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "date": day,
+        "amount": amount,
+        "category": category.strip(),
+        "description": description,
+        "expense_type": expense_type,
+    }, None
+
+
+def validate_expenses(items: List[Any], user_id: str) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[int, str]]:
+    """([(index, row)] for valid items, {index: error} for the rest)."""
+    rows: List[Tuple[int, Dict[str, Any]]] = []
+    errors: Dict[int, str] = {}
+    for index, item in enumerate(items):
+        row, error = _validate_item(item, user_id)
+        if error is None:
+            rows.append((index, row))
+        else:
+            errors[index] = error
+    return rows, errors
+
+
+async def _insert_batch(batch: List[Tuple[int, Dict[str, Any]]], slots: asyncio.Semaphore) -> Optional[str]:
+    """None once the batch is written, else the error for every item in it."""
+    async with slots:
+        try:
+            # ids are generated here, so nothing needs to come back
+            await get_async_client().table("manual_expenses").insert(
+                [row for _, row in batch], returning="minimal").execute()
+        except Exception as e:
+            logger.warning(f"Failed to insert {len(batch)} manual expenses: {e}")
+            return f"insert failed: {e}"
+    return None
+
+
+async def create_expenses(user_id: str, items: List[Any]) -> Dict[str, Any]:
+    """Validate and insert `items`; per-item results in submission order plus counts.
+
+    Each result is {"index", "success": True, "expense_id"} or
+    {"index", "success": False, "error"}.
+    """
+    rows, errors = validate_expenses(items, user_id)
+    batches = [rows[start:start + EXPENSE_INSERT_BATCH_ROWS] for start in range(0, len(rows), EXPENSE_INSERT_BATCH_ROWS)]
+    slots = asyncio.Semaphore(max(1, EXPENSE_INSERT_CONCURRENCY))
+    failures = await asyncio.gather(*(_insert_batch(batch, slots) for batch in batches))
+
+    inserted: List[Dict[str, Any]] = []
+    results: Dict[int, Dict[str, Any]] = {
+        index: {"index": index, "success": False, "error": error} for index, error in errors.items()
+    }
+    for batch, failure in zip(batches, failures):
+        for index, row in batch:
+            if failure is None:
+                inserted.append(row)
+                results[index] = {"index": index, "success": True, "expense_id": row["id"]}
+            else:
+                results[index] = {"index": index, "success": False, "error": failure}
+
+    # one rollup update for everything written
+    await apply_manual_expense_rows(user_id, inserted)
+    return {
+        "inserted": len(inserted),
+        "failed": len(items) - len(inserted),
+        "results": [results[index] for index in range(len(items))],
+    }
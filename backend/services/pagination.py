@@ -0,0 +1,122 @@
+"""Keyset pagination over (date, id) for the transaction and expense lists.
+
+Offset paging (`.range(offset, ...)`) makes PostgREST skip every earlier
+row on each request, and `ORDER BY date` alone leaves rows sharing a date
+in no particular order, so pages can repeat or drop them. Lists are
+ordered by `date DESC, id DESC` instead (served by the composite indexes
+in db/008_keyset_pagination_indexes.sql), and the next page starts
+strictly after the last row returned:
+
+    date < D OR (date = D AND id < ID)
+
+The position travels as an opaque `cursor` (urlsafe base64 of the last
+row's date and id). Offset requests still work and get the same stable
+order, plus a `next_cursor` to continue from. `iter_keyset_pages` walks a
+whole selection the same way for bulk readers such as the export.
+
+`select_fields` turns a `fields=a,b` parameter into the PostgREST
+`select`, so unrequested columns (notably the `metadata` JSON) are never
+read or sent.
+"""
+import asyncio
+import base64
+import binascii
+import json
+import uuid
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from supabase_async import ASYNC_DB_PAGE_SIZE
+
+# Columns list endpoints may select with `fields=`
+TRANSACTION_FIELDS = ("id", "date", "amount", "category", "metadata", "created_at")
+EXPENSE_FIELDS = ("id", "user_id", "date", "amount", "category", "description", "expense_type", "created_at")
+# Always selected: the cursor is built from them
+CURSOR_FIELDS = ("id", "date")
+
+
+class CursorError(ValueError):
+    """A `cursor` parameter that was not produced by `encode_cursor`."""
+
+
+class FieldsError(ValueError):
+    """A `fields` parameter naming columns the endpoint does not expose."""
+
+
+def select_fields(fields: Optional[str], allowed: Sequence[str], default: Optional[str] = None) -> str:
+    """PostgREST `select` for a comma-separated `fields` parameter (`default` or every allowed column if empty).
+
+    `id` and `date` are always included, as the next page's cursor needs them.
+    """
+    requested = [name.strip() for name in (fields or "").split(",") if name.strip()]
+    if not requested:
+        return default or ",".join(allowed)
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise FieldsError(f"Unknown fields: {unknown} (allowed: {list(allowed)})")
+    return ",".join(dict.fromkeys(list(CURSOR_FIELDS) + requested))
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    payload = json.dumps([str(row["date"]), str(row["id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(date, id) from a cursor; both are validated, as they are spliced into the filter."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        day, row_id = json.loads(raw)
+        return date.fromisoformat(day).isoformat(), str(uuid.UUID(row_id))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise CursorError("Invalid cursor") from exc
+
+
+def keyset_query(query: Any, limit: int, cursor: Optional[str] = None, offset: int = 0, desc: bool = True) -> Any:
+    """Order `query` by (date, id) and select the page after `cursor` (or at `offset`).
+
+    Works with the sync and async query builders. One row beyond `limit` is
+    requested so `keyset_page` can tell whether another page exists.
+    """
+    if cursor and offset:
+        raise CursorError("Use either cursor or offset, not both")
+    query = query.order("date", desc=desc).order("id", desc=desc)
+    if cursor:
+        day, row_id = decode_cursor(cursor)
+        op = "lt" if desc else "gt"
+        return query.or_(f"date.{op}.{day},and(date.eq.{day},id.{op}.{row_id})").limit(limit + 1)
+    return query.range(offset, offset + limit)
+
+
+def keyset_page(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim the look-ahead row; (page, cursor for the next page or None on the last page)."""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1])
+
+
+async def iter_keyset_pages(query: Any, page_size: Optional[int] = None,
+                            desc: bool = True) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield every page of an async select in (date, id) order, one keyset request per page.
+
+    The next page is requested as soon as the current one arrives, so the
+    database read overlaps whatever the caller does with the page; at most
+    two pages are held at a time.
+    """
+    page_size = page_size or ASYNC_DB_PAGE_SIZE
+
+    async def fetch(cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        result = await keyset_query(query.copy(), page_size, cursor, desc=desc).execute()
+        return keyset_page(result.data or [], page_size)
+
+    pending = asyncio.ensure_future(fetch(None))
+    try:
+        while pending is not None:
+            page, cursor = await pending
+            pending = asyncio.ensure_future(fetch(cursor)) if cursor else None
+            if page:
+                yield page
+    finally:
+        if pending is not None:
+            pending.cancel()
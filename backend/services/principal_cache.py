@@ -0,0 +1,110 @@
+"""In-process cache of authenticated principals keyed by token subject.
+
+`get_current_user` runs on every authenticated request. Resolving the
+principal means a `users` select plus a `user_questions` select, so the
+result is kept here for a short TTL in a bounded LRU. Writes that change
+what a principal looks like (signup, onboarding answers, user deletion)
+must call `invalidate_principal`.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+
+class Principal:
+    """Authenticated user as seen by route handlers."""
+
+    __slots__ = ("id", "email", "name", "created_at", "onboarding_complete", "token_version")
+
+    def __init__(self, id: str, email: str, name: str, created_at: datetime, onboarding_complete: bool,
+                 token_version: int = 0):
+        self.id = id
+        self.email = email
+        self.name = name
+        self.created_at = created_at
+        self.onboarding_complete = onboarding_complete
+        self.token_version = token_version
+
+    def __repr__(self) -> str:
+        return f"Principal(id={self.id!r}, onboarding_complete={self.onboarding_complete!r})"
+
+
+class PrincipalCache:
+    """Bounded LRU of principals with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[Principal]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= now:
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return principal
+
+    def put(self, user_id: str, principal: Principal) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            self._entries[user_id] = (expires_at, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_principal(user_id: Any) -> None:
+    """Drop the cached principal for `user_id` (call after writes that affect it)."""
+    if user_id:
+        principal_cache.invalidate(str(user_id))
@@ -0,0 +1,57 @@
+"""Persisted single-use state for refresh tokens (db/010_refresh_token_revocations.sql).
+
+`revoked_tokens` in auth_utils only knows what this worker has seen, so
+the rule that a refresh token works once, and single-device logout, are
+enforced here in the database. Each exchanged or logged-out refresh
+token's `jti` is inserted into `revoked_refresh_tokens`; the insert
+ignores duplicates and returns only new rows, so claiming a token and
+finding it already used is one round trip and safe against two workers
+racing on the same token.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from postgrest.exceptions import APIError
+
+REVOKED_REFRESH_TOKENS_TABLE = "revoked_refresh_tokens"
+# PostgREST / Postgres codes for a table that does not exist yet
+_MISSING_TABLE_CODES = ("42P01", "PGRST205")
+
+
+class RefreshTokenStoreMissing(RuntimeError):
+    """`revoked_refresh_tokens` has not been created (migration 010 not applied)."""
+
+
+def _row(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "jti": str(payload["jti"]),
+        "user_id": str(payload["sub"]),
+        "expires_at": datetime.fromtimestamp(float(payload["exp"]), tz=timezone.utc).isoformat(),
+    }
+
+
+def _record(sb, payload: Dict[str, Any]) -> bool:
+    try:
+        result = sb.table(REVOKED_REFRESH_TOKENS_TABLE).upsert(
+            _row(payload), on_conflict="jti", ignore_duplicates=True
+        ).execute()
+    except APIError as e:
+        if e.code in _MISSING_TABLE_CODES:
+            raise RefreshTokenStoreMissing(
+                "Refresh token store is missing: apply db/010_refresh_token_revocations.sql"
+            ) from e
+        raise
+    return bool(result.data)
+
+
+def claim_refresh_token(sb, payload: Dict[str, Any]) -> bool:
+    """Mark a refresh token as used; False if it was already used or revoked by any worker."""
+    if not payload.get("jti"):
+        return False
+    return _record(sb, payload)
+
+
+def revoke_refresh_token(sb, payload: Dict[str, Any]) -> None:
+    """Persistently revoke a refresh token (logout)."""
+    if payload.get("jti"):
+        _record(sb, payload)
@@ -0,0 +1,167 @@
+"""Incrementally maintained monthly rollups of transactions and manual expenses.
+
+`monthly_category_rollups` (db/005_monthly_category_rollups.sql) holds, per
+(user_id, month, category), expense and income sums and counts. Writers
+call `apply_transaction_rows` / `apply_manual_expense_rows` after inserting
+(sign=1) or deleting (sign=-1) rows; deltas are grouped locally and applied
+atomically by the `apply_rollup_deltas` SQL function in one round trip.
+
+A delta that fails to apply leaves the user's rollup short while the raw
+rows are written. The user is then marked stale: `rollups_usable` is false,
+so readers scan raw rows instead, and `rebuild_user_rollups` is scheduled to
+recompute the rollup from those rows. Staleness is per process; the rebuild
+repairs the table for every worker.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from supabase_async import fetch_all, get_async_client
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_TABLE = "monthly_category_rollups"
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "true").lower() == "true"
+
+ROLLUP_COLUMNS = (
+    "expense_total", "expense_count",
+    "income_total", "income_count",
+    "manual_expense_total", "manual_expense_count",
+)
+
+
+def _frame(rows: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(list(rows), columns=["date", "amount", "category"])
+    frame["month"] = frame["date"].astype(str).str.slice(0, 7)
+    frame["category"] = frame["category"].fillna("").astype(str)
+    frame["amount"] = pd.to_numeric(frame["amount"], errors="coerce").fillna(0.0)
+    return frame
+
+
+def _to_deltas(grouped: pd.DataFrame, sign: int) -> List[Dict[str, Any]]:
+    deltas = grouped.reset_index().to_dict("records")
+    for delta in deltas:
+        for column in ROLLUP_COLUMNS:
+            if column not in delta:
+                continue
+            if column.endswith("_count"):
+                delta[column] = sign * int(delta[column])
+            else:
+                delta[column] = sign * round(float(delta[column]), 2)
+    return deltas
+
+
+def transaction_deltas(rows: Iterable[Dict[str, Any]], sign: int = 1) -> List[Dict[str, Any]]:
+    """Group transaction rows (date, amount, category) into rollup deltas."""
+    frame = _frame(rows)
+    if frame.empty:
+        return []
+    amounts = frame["amount"].to_numpy(dtype=np.float64)
+    frame["expense_total"] = np.where(amounts < 0, -amounts, 0.0)
+    frame["expense_count"] = (amounts < 0).astype(np.int64)
+    frame["income_total"] = np.where(amounts > 0, amounts, 0.0)
+    frame["income_count"] = (amounts > 0).astype(np.int64)
+    grouped = frame.groupby(["month", "category"], sort=True)[
+        ["expense_total", "expense_count", "income_total", "income_count"]
+    ].sum()
+    return _to_deltas(grouped, sign)
+
+
+def manual_expense_deltas(rows: Iterable[Dict[str, Any]], sign: int = 1) -> List[Dict[str, Any]]:
+    """Group manual expense rows (positive amounts) into rollup deltas."""
+    frame = _frame(rows)
+    if frame.empty:
+        return []
+    frame["manual_expense_total"] = frame["amount"].abs()
+    frame["manual_expense_count"] = 1
+    grouped = frame.groupby(["month", "category"], sort=True)[
+        ["manual_expense_total", "manual_expense_count"]
+    ].sum()
+    return _to_deltas(grouped, sign)
+
+
+# user_id -> failed deltas seen, for users whose rollup missed one and is not rebuilt yet
+_stale: Dict[str, int] = {}
+_rebuilds: Dict[str, "asyncio.Future"] = {}
+
+
+async def _rebuild_stale(user_id: str) -> None:
+    failures = _stale.get(user_id)
+    try:
+        await rebuild_user_rollups(user_id)
+    except Exception as e:
+        # still stale; the next read schedules another attempt
+        logger.warning(f"Failed to rebuild rollups for user {user_id}: {e}")
+    else:
+        # a delta that failed during the rebuild may not be in it
+        if _stale.get(user_id) == failures:
+            _stale.pop(user_id, None)
+    finally:
+        _rebuilds.pop(user_id, None)
+
+
+def _schedule_rebuild(user_id: str) -> None:
+    if user_id not in _rebuilds:
+        _rebuilds[user_id] = asyncio.ensure_future(_rebuild_stale(user_id))
+
+
+def mark_rollups_stale(user_id: str) -> None:
+    """Stop trusting a user's rollup and rebuild it in the background."""
+    user_id = str(user_id)
+    _stale[user_id] = _stale.get(user_id, 0) + 1
+    _schedule_rebuild(user_id)
+
+
+def rollups_usable(user_id: str) -> bool:
+    """Whether reads may use the user's rollup: enabled and not missing a failed delta."""
+    if not ROLLUPS_ENABLED:
+        return False
+    user_id = str(user_id)
+    if user_id in _stale:
+        _schedule_rebuild(user_id)
+        return False
+    return True
+
+
+async def _apply(user_id: str, deltas: List[Dict[str, Any]]) -> None:
+    if not ROLLUPS_ENABLED or not deltas:
+        return
+    try:
+        await get_async_client().rpc("apply_rollup_deltas", {"p_user_id": str(user_id), "p_deltas": deltas})
+    except Exception as e:
+        # The raw rows are already written; scan them until a rebuild repairs the rollup.
+        logger.warning(f"Failed to apply rollup deltas for user {user_id}: {e}")
+        mark_rollups_stale(user_id)
+
+
+async def apply_transaction_rows(user_id: str, rows: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+    """Fold inserted (sign=1) or deleted (sign=-1) transactions into the rollups."""
+    if not ROLLUPS_ENABLED:
+        return
+    await _apply(user_id, transaction_deltas(rows, sign))
+
+
+async def apply_manual_expense_rows(user_id: str, rows: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+    """Fold inserted (sign=1) or deleted (sign=-1) manual expenses into the rollups."""
+    if not ROLLUPS_ENABLED:
+        return
+    await _apply(user_id, manual_expense_deltas(rows, sign))
+
+
+async def rebuild_user_rollups(user_id: str) -> int:
+    """Recompute a user's rollups from raw rows; returns the number of rollup rows."""
+    result = await get_async_client().rpc("rebuild_monthly_rollups", {"p_user_id": str(user_id)})
+    return int(result.data or 0)
+
+
+async def fetch_rollups(user_id: str, month: Optional[str] = None,
+                        columns: str = "month, category, expense_total, income_total") -> List[Dict[str, Any]]:
+    """Read a user's rollup rows, optionally restricted to one 'YYYY-MM' month."""
+    query = get_async_client().table(ROLLUPS_TABLE).select(columns).eq("user_id", user_id)
+    if month:
+        query = query.eq("month", month)
+    return await fetch_all(query.order("month").order("category"))
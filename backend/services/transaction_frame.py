@@ -0,0 +1,142 @@
+"""Typed, columnar view of a user's transactions.
+
+Reading transactions as JSON means building a dict per row and converting
+`amount` per row again in Python. `load_transaction_frame` instead asks
+PostgREST for `text/csv` pages (see `supabase_async.iter_csv_pages`) and
+parses them in one `pandas.read_csv` call into typed columns:
+
+    date      datetime64[ns]
+    amount    float64
+    category  category
+
+Insights, the advisor and recommendations consume the `TransactionFrame`
+rather than lists of row dicts.
+"""
+import io
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from supabase_async import get_async_client, iter_csv_pages
+
+TRANSACTION_FRAME_COLUMNS = ("id", "date", "amount", "category")
+
+
+def _typed(frame: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    frame = frame.reindex(columns=list(columns))
+    if "date" in frame:
+        # a Postgres DATE column; format="ISO8601" needs pandas 2.0 and requirements allow 1.5
+        frame["date"] = pd.to_datetime(frame["date"], format="%Y-%m-%d", errors="coerce")
+    if "amount" in frame:
+        frame["amount"] = pd.to_numeric(frame["amount"], errors="coerce").fillna(0.0).astype(np.float64)
+    if "category" in frame:
+        frame["category"] = frame["category"].astype("category")
+    if "id" in frame:
+        frame["id"] = frame["id"].astype(object)
+    return frame.reset_index(drop=True)
+
+
+class TransactionFrame:
+    """Transactions as typed columns (date, amount, category) over a pandas frame."""
+
+    __slots__ = ("frame",)
+
+    def __init__(self, frame: pd.DataFrame, columns: Sequence[str] = TRANSACTION_FRAME_COLUMNS):
+        self.frame = _typed(frame, columns)
+
+    @classmethod
+    def empty(cls, columns: Sequence[str] = TRANSACTION_FRAME_COLUMNS) -> "TransactionFrame":
+        return cls(pd.DataFrame(columns=list(columns)), columns)
+
+    @classmethod
+    def from_records(cls, rows: Iterable[Dict[str, Any]],
+                     columns: Sequence[str] = TRANSACTION_FRAME_COLUMNS) -> "TransactionFrame":
+        return cls(pd.DataFrame.from_records(list(rows), columns=list(columns)), columns)
+
+    @classmethod
+    def from_csv(cls, source: Any, columns: Sequence[str] = TRANSACTION_FRAME_COLUMNS) -> "TransactionFrame":
+        """Parse CSV text, a file path or a file object with a header row."""
+        if isinstance(source, str) and "\n" in source:
+            source = io.StringIO(source)
+        dtype = {"category": "category", "id": str}
+        try:
+            frame = pd.read_csv(source, dtype={k: v for k, v in dtype.items() if k in columns})
+        except pd.errors.EmptyDataError:
+            return cls.empty(columns)
+        return cls(frame, columns)
+
+    @classmethod
+    def from_csv_pages(cls, pages: List[str],
+                       columns: Sequence[str] = TRANSACTION_FRAME_COLUMNS) -> "TransactionFrame":
+        """Join PostgREST CSV pages (each with its own header line) and parse them once."""
+        bodies = [page for page in pages if page.strip()]
+        if not bodies:
+            return cls.empty(columns)
+        parts = [bodies[0].rstrip("\n")]
+        for body in bodies[1:]:
+            _, _, rows = body.partition("\n")
+            if rows.strip():
+                parts.append(rows.rstrip("\n"))
+        return cls.from_csv("\n".join(parts) + "\n", columns)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.frame.empty
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.frame["date"].to_numpy(dtype="datetime64[ns]")
+
+    @property
+    def amounts(self) -> np.ndarray:
+        return self.frame["amount"].to_numpy(dtype=np.float64)
+
+    @property
+    def categories(self) -> pd.Categorical:
+        return self.frame["category"].array
+
+    @property
+    def months(self) -> np.ndarray:
+        """Month of each row as datetime64[M]."""
+        return self.dates.astype("datetime64[M]")
+
+    def month_keys(self) -> np.ndarray:
+        """Month of each row as a 'YYYY-MM' string."""
+        return np.datetime_as_string(self.months, unit="M").astype(object)
+
+    def between(self, start: Optional[Any] = None, end: Optional[Any] = None) -> "TransactionFrame":
+        """Rows with start <= date <= end (either bound may be omitted)."""
+        mask = np.ones(len(self.frame), dtype=bool)
+        dates = self.dates
+        if start is not None:
+            mask &= dates >= np.datetime64(pd.Timestamp(start))
+        if end is not None:
+            mask &= dates <= np.datetime64(pd.Timestamp(end))
+        return self._subset(mask)
+
+    def expenses(self) -> "TransactionFrame":
+        return self._subset(self.amounts < 0)
+
+    def income(self) -> "TransactionFrame":
+        return self._subset(self.amounts > 0)
+
+    def _subset(self, mask: np.ndarray) -> "TransactionFrame":
+        clone = object.__new__(TransactionFrame)
+        clone.frame = self.frame.loc[mask].reset_index(drop=True)
+        return clone
+
+
+async def load_transaction_frame(user_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                 columns: Sequence[str] = TRANSACTION_FRAME_COLUMNS) -> TransactionFrame:
+    """Read a user's transactions with start_date <= date < end_date as a `TransactionFrame`."""
+    query = get_async_client().table("transactions").select(", ".join(columns)).eq("user_id", user_id)
+    if start_date:
+        query = query.gte("date", start_date)
+    if end_date:
+        query = query.lt("date", end_date)
+    pages = [page async for page in iter_csv_pages(query)]
+    return TransactionFrame.from_csv_pages(pages, columns)
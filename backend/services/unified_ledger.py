@@ -0,0 +1,234 @@
+"""One date-ordered ledger over `transactions` and `manual_expenses`.
+
+The two tables use opposite sign conventions: CSV transactions are signed
+(negative is money out) while a manual expense stores a positive amount.
+Ledger entries share one shape with the sign made consistent, so manual
+expenses count as spending alongside imported rows:
+
+    {"id", "source": "transaction" | "manual_expense", "date", "amount",
+     "category", "description"}
+
+Manual expense categories are free text, so they go through the user's
+category engine (the one that categorised their CSV imports); stored
+transaction categories already came out of it.
+
+Each source is read in keyset pages and the sources are merged k-way on
+(date, source, id), so neither table is loaded whole:
+
+- `ledger_page` reads at most `limit + 1` rows per source for one page,
+  and hands out a cursor encoding the last entry's (date, source, id)
+  from which each source's own keyset position is derived.
+- `iter_ledger` streams the whole merged sequence page by page, for
+  aggregates such as `summarize_ledger`.
+"""
+import asyncio
+import base64
+import binascii
+import heapq
+import json
+import uuid
+from datetime import date
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from supabase_async import get_async_client
+from services.pagination import CursorError, encode_cursor, iter_keyset_pages, keyset_query
+from utils.category_engine import FALLBACK, CategoryEngine, default_engine
+
+SOURCE_TRANSACTION = "transaction"
+SOURCE_MANUAL_EXPENSE = "manual_expense"
+# Entries sharing a date are ordered by source in this order, then by id
+LEDGER_SOURCES = (SOURCE_TRANSACTION, SOURCE_MANUAL_EXPENSE)
+
+_SOURCE_TABLES = {SOURCE_TRANSACTION: "transactions", SOURCE_MANUAL_EXPENSE: "manual_expenses"}
+_SOURCE_COLUMNS = {
+    SOURCE_TRANSACTION: "id, date, amount, category, metadata",
+    SOURCE_MANUAL_EXPENSE: "id, date, amount, category, description",
+}
+
+LedgerKey = Tuple[str, int, str]
+
+
+def _entry_key(entry: Dict[str, Any]) -> LedgerKey:
+    return entry["date"], LEDGER_SOURCES.index(entry["source"]), entry["id"]
+
+
+def _transaction_entries(rows: List[Dict[str, Any]], engine: CategoryEngine) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": str(row["id"]),
+            "source": SOURCE_TRANSACTION,
+            "date": str(row["date"])[:10],
+            "amount": float(row["amount"]),
+            "category": (row.get("category") or "").strip() or FALLBACK,
+            "description": (row.get("metadata") or {}).get("description"),
+        }
+        for row in rows
+    ]
+
+
+def _manual_expense_entries(rows: List[Dict[str, Any]], engine: CategoryEngine) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": str(row["id"]),
+            "source": SOURCE_MANUAL_EXPENSE,
+            "date": str(row["date"])[:10],
+            "amount": -abs(float(row["amount"])),
+            "category": engine.map(row.get("category")),
+            "description": row.get("description"),
+        }
+        for row in rows
+    ]
+
+
+_NORMALIZERS: Dict[str, Callable[[List[Dict[str, Any]], CategoryEngine], List[Dict[str, Any]]]] = {
+    SOURCE_TRANSACTION: _transaction_entries,
+    SOURCE_MANUAL_EXPENSE: _manual_expense_entries,
+}
+
+
+def encode_ledger_cursor(entry: Dict[str, Any]) -> str:
+    payload = json.dumps([entry["date"], entry["source"], entry["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_ledger_cursor(cursor: str) -> LedgerKey:
+    """(date, source rank, id) from a ledger cursor; date and id are validated as for list cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        day, source, row_id = json.loads(raw)
+        return date.fromisoformat(day).isoformat(), LEDGER_SOURCES.index(source), str(uuid.UUID(row_id))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise CursorError("Invalid cursor") from exc
+
+
+def _source_query(user_id: str, source: str, start: Optional[str], end: Optional[str],
+                  after: Optional[LedgerKey], desc: bool) -> Tuple[Any, Optional[str]]:
+    """(query, keyset cursor) selecting `source` rows that come after ledger position `after`.
+
+    Rows of the cursor's own source resume from its (date, id); a source
+    ordered before it on equal dates has already been passed on that date,
+    one ordered after it has not.
+    """
+    query = get_async_client().table(_SOURCE_TABLES[source]).select(_SOURCE_COLUMNS[source]).eq("user_id", user_id)
+    if start:
+        query = query.gte("date", start)
+    if end:
+        query = query.lte("date", end)
+    if after is None:
+        return query, None
+    day, rank, row_id = after
+    source_rank = LEDGER_SOURCES.index(source)
+    if source_rank == rank:
+        return query, encode_cursor({"date": day, "id": row_id})
+    # entries with the cursor's date are still ahead for sources that sort after it in the direction of travel
+    date_still_ahead = source_rank < rank if desc else source_rank > rank
+    if desc:
+        query = query.lte("date", day) if date_still_ahead else query.lt("date", day)
+    else:
+        query = query.gte("date", day) if date_still_ahead else query.gt("date", day)
+    return query, None
+
+
+def _merge(runs: Sequence[List[Dict[str, Any]]], desc: bool) -> List[Dict[str, Any]]:
+    return list(heapq.merge(*runs, key=_entry_key, reverse=desc))
+
+
+async def ledger_page(user_id: str, limit: int, cursor: Optional[str] = None, start: Optional[str] = None,
+                      end: Optional[str] = None, desc: bool = True,
+                      engine: CategoryEngine = default_engine) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """(entries, next cursor or None) for one page of the merged ledger, newest first unless `desc=False`.
+
+    Each source is asked for the `limit + 1` rows after the cursor, the
+    most a page could take from it; the extra merged entry only tells
+    whether another page exists.
+    """
+    after = decode_ledger_cursor(cursor) if cursor else None
+
+    async def read(source: str) -> List[Dict[str, Any]]:
+        query, source_cursor = _source_query(user_id, source, start, end, after, desc)
+        result = await keyset_query(query, limit, source_cursor, desc=desc).execute()
+        return _NORMALIZERS[source](result.data or [], engine)
+
+    runs = await asyncio.gather(*(read(source) for source in LEDGER_SOURCES))
+    entries = _merge(runs, desc)
+    if len(entries) <= limit:
+        return entries, None
+    page = entries[:limit]
+    return page, encode_ledger_cursor(page[-1])
+
+
+async def iter_ledger(user_id: str, start: Optional[str] = None, end: Optional[str] = None, desc: bool = True,
+                      page_size: Optional[int] = None,
+                      engine: CategoryEngine = default_engine) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the whole merged ledger in order, in batches, holding about a page per source.
+
+    Every source keeps a buffer of its current keyset page. Entries up to
+    the earliest buffer end among sources that still have pages to read
+    are final, so they are merged and yielded before the source whose
+    buffer ran out reads its next page.
+    """
+    streams: Dict[str, AsyncIterator[List[Dict[str, Any]]]] = {}
+    for source in LEDGER_SOURCES:
+        query, _ = _source_query(user_id, source, start, end, None, desc)
+        streams[source] = iter_keyset_pages(query, page_size, desc=desc)
+    buffers: Dict[str, List[Dict[str, Any]]] = {source: [] for source in LEDGER_SOURCES}
+    try:
+        while True:
+            for source in list(streams):
+                if buffers[source]:
+                    continue
+                try:
+                    page = await streams[source].__anext__()
+                except StopAsyncIteration:
+                    del streams[source]
+                    continue
+                buffers[source] = _NORMALIZERS[source](page, engine)
+            if not any(buffers.values()):
+                return
+            if streams:
+                ends = [_entry_key(buffers[source][-1]) for source in streams]
+                bound = max(ends) if desc else min(ends)
+            runs = []
+            for source, buffered in buffers.items():
+                if not streams:
+                    cut = len(buffered)
+                elif desc:
+                    cut = sum(1 for entry in buffered if _entry_key(entry) >= bound)
+                else:
+                    cut = sum(1 for entry in buffered if _entry_key(entry) <= bound)
+                runs.append(buffered[:cut])
+                buffers[source] = buffered[cut:]
+            yield _merge(runs, desc)
+    finally:
+        for stream in streams.values():
+            await stream.aclose()
+
+
+async def summarize_ledger(pages: AsyncIterator[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Totals, expense by category and expense/income by month over streamed ledger entries."""
+    total_expenses = total_income = 0.0
+    categories: Dict[str, float] = {}
+    months: Dict[str, Dict[str, float]] = {}
+    count = 0
+    async for page in pages:
+        count += len(page)
+        for entry in page:
+            amount = entry["amount"]
+            month = months.setdefault(entry["date"][:7], {"expense": 0.0, "income": 0.0})
+            if amount < 0:
+                total_expenses -= amount
+                month["expense"] -= amount
+                categories[entry["category"]] = categories.get(entry["category"], 0.0) - amount
+            elif amount > 0:
+                total_income += amount
+                month["income"] += amount
+    return {
+        "total_expenses": total_expenses,
+        "total_income": total_income,
+        "entries": count,
+        "categories": [
+            {"category": category, "total": total}
+            for category, total in sorted(categories.items(), key=lambda item: -item[1])
+        ],
+        "months": [{"month": month, **totals} for month, totals in sorted(months.items())],
+    }
@@ -0,0 +1,422 @@
+"""Async PostgREST data layer.
+
+`supabase_client.get_server_client()` is synchronous, so every `.execute()`
+inside an `async def` handler blocks the event loop for the length of the
+query. This module talks to the same PostgREST endpoint over a shared
+`httpx.AsyncClient` (keep-alive pool, optional HTTP/2) and mirrors the
+fluent surface of the sync client so call sites can migrate one at a time:
+
+    sb = get_async_client()
+    res = await sb.table("transactions").select("amount").eq("user_id", uid).execute()
+    res.data
+
+The client is opened on application startup and closed on shutdown (see
+`main.py`); `get_async_client()` also creates it lazily for scripts.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DB_MAX_CONNECTIONS = int(os.getenv("ASYNC_DB_MAX_CONNECTIONS", "50"))
+ASYNC_DB_MAX_KEEPALIVE = int(os.getenv("ASYNC_DB_MAX_KEEPALIVE", "20"))
+ASYNC_DB_KEEPALIVE_EXPIRY = float(os.getenv("ASYNC_DB_KEEPALIVE_EXPIRY", "30"))
+ASYNC_DB_TIMEOUT = float(os.getenv("ASYNC_DB_TIMEOUT", "30"))
+ASYNC_DB_HTTP2 = os.getenv("ASYNC_DB_HTTP2", "false").lower() == "true"
+# Page size for auto-paginated reads; keep at or below PostgREST's max-rows (1000 on Supabase)
+ASYNC_DB_PAGE_SIZE = int(os.getenv("ASYNC_DB_PAGE_SIZE", "1000"))
+ASYNC_DB_FETCH_FANOUT = int(os.getenv("ASYNC_DB_FETCH_FANOUT", "4"))
+
+# Characters that force a filter value to be double-quoted in PostgREST syntax
+_RESERVED_CHARS = set(',.:()" ')
+
+
+class AsyncAPIError(RuntimeError):
+    """Raised when PostgREST returns an error status."""
+
+    def __init__(self, message: str, status_code: int, code: Optional[str] = None, details: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.details = details
+
+
+class AsyncAPIResponse:
+    """Result of `AsyncQuery.execute()`: rows in `data`, exact row count in `count` when requested."""
+
+    __slots__ = ("data", "count")
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _scalar(value: Any) -> str:
+    """Operand of a column filter (`eq.<value>`), sent as-is: PostgREST does not unquote these."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _quote(value: Any) -> str:
+    """Item of an `in.(...)` list, double-quoted when it holds a list delimiter."""
+    text = _scalar(value)
+    if any(ch in _RESERVED_CHARS for ch in text):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+
+def _parse_content_range(header: Optional[str]) -> Optional[int]:
+    """Return the total from a `Content-Range: 0-24/312` header, if present."""
+    if not header or "/" not in header:
+        return None
+    total = header.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+def _parse_content_range_span(header: Optional[str]) -> Tuple[int, Optional[int]]:
+    """Return (rows in this response, total) from a `Content-Range` header."""
+    if not header:
+        return 0, None
+    span, _, _ = header.partition("/")
+    total = _parse_content_range(header)
+    if "-" not in span:
+        return 0, total
+    first, _, last = span.partition("-")
+    return int(last) - int(first) + 1, total
+
+
+class AsyncQuery:
+    """Fluent builder for a single PostgREST request against one table."""
+
+    def __init__(self, client: "AsyncSupabaseClient", table: str):
+        self._client = client
+        self._table = table
+        self._method = "GET"
+        self._params: List[Tuple[str, str]] = []
+        self._headers: Dict[str, str] = {}
+        self._json: Any = None
+        self._prefer: List[str] = []
+
+    # -- verbs -------------------------------------------------------------
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "AsyncQuery":
+        self._method = "GET"
+        self._params.append(("select", ",".join(part.strip() for part in columns.split(","))))
+        if count:
+            self._prefer.append(f"count={count}")
+        return self
+
+    def insert(self, rows: Any, returning: str = "representation") -> "AsyncQuery":
+        self._method = "POST"
+        self._json = rows
+        self._prefer.append(f"return={returning}")
+        return self
+
+    def upsert(self, rows: Any, on_conflict: Optional[str] = None, returning: str = "representation",
+               ignore_duplicates: bool = False) -> "AsyncQuery":
+        self._method = "POST"
+        self._json = rows
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        self._prefer.extend([f"resolution={resolution}", f"return={returning}"])
+        if on_conflict:
+            self._params.append(("on_conflict", on_conflict))
+        return self
+
+    def update(self, values: Dict[str, Any], returning: str = "representation") -> "AsyncQuery":
+        self._method = "PATCH"
+        self._json = values
+        self._prefer.append(f"return={returning}")
+        return self
+
+    def delete(self, returning: str = "representation") -> "AsyncQuery":
+        self._method = "DELETE"
+        self._prefer.append(f"return={returning}")
+        return self
+
+    # -- filters -----------------------------------------------------------
+
+    def _filter(self, column: str, operator: str, value: Any) -> "AsyncQuery":
+        self._params.append((column, f"{operator}.{_scalar(value)}"))
+        return self
+
+    def eq(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "lte", value)
+
+    def is_(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "is", "null" if value is None else value)
+
+    def not_(self, column: str, operator: str, value: Any) -> "AsyncQuery":
+        """Negated filter, e.g. `not_("fingerprint", "is", "null")`."""
+        return self._filter(column, f"not.{operator}", value)
+
+    def returning(self, columns: str) -> "AsyncQuery":
+        """Limit the columns returned by a write with return=representation."""
+        self._params.append(("select", ",".join(part.strip() for part in columns.split(","))))
+        return self
+
+    def in_(self, column: str, values: Iterable[Any]) -> "AsyncQuery":
+        self._params.append((column, "in.(" + ",".join(_quote(v) for v in values) + ")"))
+        return self
+
+    def or_(self, filters: str) -> "AsyncQuery":
+        """Raw PostgREST `or` expression, e.g. `date.lt.2024-01-01,and(date.eq.2024-01-01,id.lt.X)`."""
+        self._params.append(("or", f"({filters})"))
+        return self
+
+    # -- modifiers ---------------------------------------------------------
+
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None) -> "AsyncQuery":
+        clause = f"{column}.{'desc' if desc else 'asc'}"
+        if nullsfirst is not None:
+            clause += ".nullsfirst" if nullsfirst else ".nullslast"
+        existing = [i for i, (key, _) in enumerate(self._params) if key == "order"]
+        if existing:
+            key, value = self._params[existing[0]]
+            self._params[existing[0]] = (key, f"{value},{clause}")
+        else:
+            self._params.append(("order", clause))
+        return self
+
+    def limit(self, size: int) -> "AsyncQuery":
+        self._params.append(("limit", str(int(size))))
+        return self
+
+    def range(self, start: int, end: int) -> "AsyncQuery":
+        """Inclusive row range, same semantics as the sync client."""
+        self._params.append(("offset", str(int(start))))
+        self._params.append(("limit", str(max(0, int(end) - int(start) + 1))))
+        return self
+
+    def header(self, name: str, value: str) -> "AsyncQuery":
+        self._headers[name] = value
+        return self
+
+    def copy(self) -> "AsyncQuery":
+        clone = AsyncQuery(self._client, self._table)
+        clone._method = self._method
+        clone._params = list(self._params)
+        clone._headers = dict(self._headers)
+        clone._json = self._json
+        clone._prefer = list(self._prefer)
+        return clone
+
+    def count(self, mode: str = "exact") -> "AsyncQuery":
+        """Ask PostgREST to report the total row count in `Content-Range`."""
+        self._prefer.append(f"count={mode}")
+        return self
+
+    def has_param(self, key: str) -> bool:
+        return any(name == key for name, _ in self._params)
+
+    # -- execution ---------------------------------------------------------
+
+    def _request_headers(self) -> Dict[str, str]:
+        headers = dict(self._headers)
+        if self._prefer:
+            headers["Prefer"] = ",".join(self._prefer)
+        return headers
+
+    async def send(self) -> httpx.Response:
+        """Send the request and return the raw response (for non-JSON bodies)."""
+        return await self._client.request(
+            self._method, self._table, params=self._params, json=self._json, headers=self._request_headers()
+        )
+
+    async def execute(self) -> AsyncAPIResponse:
+        response = await self.send()
+        count = _parse_content_range(response.headers.get("content-range"))
+        data = response.json() if response.content else []
+        return AsyncAPIResponse(data=data, count=count)
+
+
+async def _read_json_page(query: AsyncQuery) -> Tuple[List[Dict[str, Any]], int, Optional[int]]:
+    result = await query.execute()
+    rows = result.data or []
+    return rows, len(rows), result.count
+
+
+async def _read_csv_page(query: AsyncQuery) -> Tuple[str, int, Optional[int]]:
+    response = await query.header("Accept", "text/csv").send()
+    span = _parse_content_range_span(response.headers.get("content-range"))
+    return response.text, span[0], span[1]
+
+
+async def _paginate(query: AsyncQuery, read_page, page_size: Optional[int],
+                    fan_out: Optional[int]) -> AsyncIterator[Any]:
+    page_size = page_size or ASYNC_DB_PAGE_SIZE
+    fan_out = max(1, fan_out or ASYNC_DB_FETCH_FANOUT)
+    if not query.has_param("order"):
+        query = query.copy().order("id")
+
+    body, length, total = await read_page(query.copy().count("exact").range(0, page_size - 1))
+    yield body
+    total = total if total is not None else length
+    if length >= total or not length:
+        return
+
+    step = min(page_size, length)
+
+    async def fetch(offset: int) -> Any:
+        page, _, _ = await read_page(query.copy().range(offset, offset + step - 1))
+        return page
+
+    pending: "deque[asyncio.Task]" = deque()
+    try:
+        for offset in range(length, total, step):
+            pending.append(asyncio.ensure_future(fetch(offset)))
+            if len(pending) >= fan_out:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def iter_pages(query: AsyncQuery, page_size: Optional[int] = None,
+                     fan_out: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield every page of a select, bypassing PostgREST's max-rows cap.
+
+    The first page is requested with an exact count; the remaining offsets
+    are fetched as range pages with up to `fan_out` requests in flight and
+    yielded in order. If the server caps pages below `page_size`, the
+    observed page length is used instead. Queries without an `order` are
+    ordered by `id` so pages do not overlap.
+    """
+    async for page in _paginate(query, _read_json_page, page_size, fan_out):
+        yield page
+
+
+async def iter_csv_pages(query: AsyncQuery, page_size: Optional[int] = None,
+                         fan_out: Optional[int] = None) -> AsyncIterator[str]:
+    """Like `iter_pages`, but each page is PostgREST's `text/csv` body (header line included).
+
+    CSV skips building a dict per row on both ends, so bulk readers can hand
+    the text straight to a columnar parser.
+    """
+    async for page in _paginate(query, _read_csv_page, page_size, fan_out):
+        yield page
+
+
+async def iter_rows(query: AsyncQuery, page_size: Optional[int] = None,
+                    fan_out: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Stream every row of a select (see `iter_pages`)."""
+    async for page in iter_pages(query, page_size, fan_out):
+        for row in page:
+            yield row
+
+
+async def fetch_all(query: AsyncQuery, page_size: Optional[int] = None,
+                    fan_out: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Return every row of a select as one list (see `iter_pages`)."""
+    rows: List[Dict[str, Any]] = []
+    async for page in iter_pages(query, page_size, fan_out):
+        rows.extend(page)
+    return rows
+
+
+class AsyncSupabaseClient:
+    """PostgREST client sharing one pooled `httpx.AsyncClient`."""
+
+    def __init__(self, url: str, key: str, http2: bool = ASYNC_DB_HTTP2,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.rest_url = url.rstrip("/") + "/rest/v1"
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("ASYNC_DB_HTTP2 requested but 'h2' is not installed; using HTTP/1.1")
+                http2 = False
+        self._http = httpx.AsyncClient(
+            base_url=self.rest_url,
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            limits=httpx.Limits(
+                max_connections=ASYNC_DB_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_DB_MAX_KEEPALIVE,
+                keepalive_expiry=ASYNC_DB_KEEPALIVE_EXPIRY,
+            ),
+            timeout=ASYNC_DB_TIMEOUT,
+            http2=http2,
+            transport=transport,
+        )
+
+    def table(self, name: str) -> AsyncQuery:
+        return AsyncQuery(self, name)
+
+    async def rpc(self, function: str, params: Optional[Dict[str, Any]] = None) -> AsyncAPIResponse:
+        response = await self.request("POST", f"rpc/{function}", json=params or {})
+        return AsyncAPIResponse(data=response.json() if response.content else None)
+
+    async def request(self, method: str, path: str, params: Optional[List[Tuple[str, str]]] = None,
+                      json: Any = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        response = await self._http.request(method, "/" + path, params=params, json=json, headers=headers)
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {"message": response.text}
+            raise AsyncAPIError(
+                body.get("message") or f"PostgREST error {response.status_code}",
+                status_code=response.status_code,
+                code=body.get("code"),
+                details=body.get("details"),
+            )
+        return response
+
+    @property
+    def is_closed(self) -> bool:
+        return self._http.is_closed
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+_client: Optional[AsyncSupabaseClient] = None
+
+
+def get_async_client() -> AsyncSupabaseClient:
+    """Return the shared async client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        url = os.getenv("SUPABASE_URL", "").strip()
+        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "").strip()
+        if not url:
+            raise RuntimeError("Missing required environment variable: SUPABASE_URL")
+        if not key:
+            raise RuntimeError("Missing required environment variable: SUPABASE_SERVICE_ROLE_KEY")
+        _client = AsyncSupabaseClient(url, key)
+    return _client
+
+
+async def init_async_client() -> AsyncSupabaseClient:
+    """Open the shared client (application startup)."""
+    return get_async_client()
+
+
+async def close_async_client() -> None:
+    """Close the shared client and its connection pool (application shutdown)."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import httpx
+import pytest
+
+# Route modules import siblings as top-level packages (`from supabase_client import ...`),
+# so make the backend directory importable alongside the `backend.` package path.
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import supabase_async  # noqa: E402  (needs BACKEND_DIR on sys.path)
+
+
+@pytest.fixture
+def postgrest(monkeypatch):
+    """Route the shared async client to a PostgREST stand-in: `postgrest(handler)` returns the client."""
+    def install(handler):
+        client = supabase_async.AsyncSupabaseClient(
+            "https://example.supabase.co", "srv_test_key", transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(supabase_async, "_client", client)
+        return client
+    return install
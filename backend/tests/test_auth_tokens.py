@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+
+from auth_utils import (
+    create_refresh_token, create_user_access_token, revoked_tokens, verify_token,
+)
+from routes.auth import _bump_token_version, _select_user, get_current_user
+from services.refresh_tokens import RefreshTokenStoreMissing, claim_refresh_token, revoke_refresh_token
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, execute):
+        self.execute = execute
+
+
+class _RevocationTable:
+    """Stand-in for `revoked_refresh_tokens`: upsert with ignore-duplicates returns only new rows."""
+
+    def __init__(self, missing=False):
+        self.rows = {}
+        self.missing = missing
+
+    def table(self, name):
+        assert name == "revoked_refresh_tokens"
+        return self
+
+    def upsert(self, row, on_conflict, ignore_duplicates):
+        assert (on_conflict, ignore_duplicates) == ("jti", True)
+        return _Query(lambda: self._insert(row))
+
+    def _insert(self, row):
+        if self.missing:
+            raise APIError({"code": "PGRST205", "message": "Could not find the table"})
+        if row["jti"] in self.rows:
+            return _Result([])
+        self.rows[row["jti"]] = row
+        return _Result([row])
+
+
+def _resolve(token):
+    return asyncio.run(get_current_user(authorization=f"Bearer {token}"))
+
+
+def test_access_token_resolves_without_database():
+    token = create_user_access_token("u-claims", "a@example.com", "Asha", True, token_version=2,
+                                     created_at="2024-05-01T10:00:00+00:00")
+    user = _resolve(token)
+    assert user.id == "u-claims"
+    assert user.email == "a@example.com"
+    assert user.onboarding_complete is True
+    assert user.token_version == 2
+
+
+def test_refresh_token_is_not_an_access_token():
+    with pytest.raises(HTTPException) as exc_info:
+        _resolve(create_refresh_token("u-claims"))
+    assert exc_info.value.status_code == 401
+
+
+def test_revoked_token_is_rejected():
+    token = create_user_access_token("u-revoked", "b@example.com", "Bo", False)
+    revoked_tokens.revoke_token(verify_token(token))
+    with pytest.raises(HTTPException):
+        _resolve(token)
+
+
+def test_version_bump_revokes_older_tokens():
+    old = create_user_access_token("u-bump", "c@example.com", "Cy", False, token_version=0)
+    new = create_user_access_token("u-bump", "c@example.com", "Cy", False, token_version=1)
+    revoked_tokens.revoke_user("u-bump", 1)
+    with pytest.raises(HTTPException):
+        _resolve(old)
+    assert _resolve(new).token_version == 1
+
+
+def test_refresh_token_claim_is_single_use_across_workers():
+    store = _RevocationTable()
+    payload = verify_token(create_refresh_token("u-rotate"))
+    assert claim_refresh_token(store, payload) is True
+    # a second worker (or a restarted one) sees the persisted claim, not an in-memory set
+    assert claim_refresh_token(store, dict(payload)) is False
+    assert store.rows[payload["jti"]]["user_id"] == "u-rotate"
+
+
+def test_logged_out_refresh_token_cannot_be_claimed():
+    store = _RevocationTable()
+    payload = verify_token(create_refresh_token("u-logout"))
+    revoke_refresh_token(store, payload)
+    assert claim_refresh_token(store, payload) is False
+
+
+def test_missing_revocation_table_fails_loudly():
+    with pytest.raises(RefreshTokenStoreMissing, match="010_refresh_token_revocations"):
+        claim_refresh_token(_RevocationTable(missing=True), verify_token(create_refresh_token("u-old")))
+
+
+class _Users:
+    """Stand-in for `users` before db/004: selecting token_version is an undefined column."""
+
+    def __init__(self):
+        self.selects = []
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        self.selects.append(columns)
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        if "token_version" in self.selects[-1]:
+            raise APIError({"code": "42703", "message": "column users.token_version does not exist"})
+        return _Result([{"id": "u1", "email": "a@example.com"}])
+
+
+def test_user_lookup_works_before_token_version_column_exists():
+    users = _Users()
+    result = _select_user(users, "email", "a@example.com", "id, email")
+    assert result.data == [{"id": "u1", "email": "a@example.com"}]
+    assert users.selects == ["id, email, token_version", "id, email"]
+
+
+class _VersionedUsers:
+    """Stand-in for `bump_token_version`: increments the stored version."""
+
+    def __init__(self, version):
+        self.version = version
+
+    def rpc(self, name, params):
+        assert (name, params) == ("bump_token_version", {"p_user_id": "u1"})
+        return _Query(self._bump)
+
+    def _bump(self):
+        self.version += 1
+        return _Result(self.version)
+
+
+def test_all_devices_logout_bumps_the_stored_version():
+    # a second logout with an access token still carrying ver 0 must not reuse version 1
+    users = _VersionedUsers(version=1)
+    assert _bump_token_version(users, "u1") == 2
+    assert _bump_token_version(users, "u1") == 3
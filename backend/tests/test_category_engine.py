@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import pandas as pd
+import pytest
+
+import supabase_async
+from services.category_rules import CategoryRuleCache, engine_for_user, replace_user_rules
+from utils.category_engine import DEFAULT_RULES, CategoryEngine, default_engine, engine_with_overrides
+from utils.data_cleaner import map_category
+from utils.statement_profiles import profiles
+
+
+def _first_rule(text):
+    # the original map_category: rules checked in order, first keyword hit wins
+    text = text.lower().strip()
+    for category, keywords in DEFAULT_RULES:
+        if any(keyword in text for keyword in keywords):
+            return category
+    return text.capitalize()
+
+
+def test_engine_matches_ordered_rule_semantics():
+    engine = CategoryEngine(DEFAULT_RULES)
+    samples = ["Shell GAS STATION", "cafe bar", "Amazon grocery order", "NEFT SALARY", "pet store",
+               "Water bill", "uber to supermarket", "  Rent  ", "target pharmacy", "parking metro"]
+    assert [engine.map(text) for text in samples] == [_first_rule(text) for text in samples]
+    assert engine.map("gas station") == "Utilities"
+    assert engine.map("") == engine.map(None) == engine.map(np.nan) == "Other"
+    assert map_category("Starbucks #12") == "Dining"
+
+
+def test_map_series_classifies_unique_values_and_counts_hits():
+    engine = CategoryEngine(DEFAULT_RULES)
+    values = pd.Series(["UBER TRIP", "uber trip", "UBER TRIP", None, "pet store", "Netflix"], index=range(10, 16))
+    result = engine.map_series(values)
+    assert result.tolist() == ["Transportation", "Transportation", "Transportation", "Other", "Pet store",
+                               "Entertainment"]
+    assert result.index.tolist() == list(range(10, 16))
+    stats = engine.stats()
+    # the two spellings of "uber trip" share one memo entry
+    assert (stats["memo_misses"], stats["memo_hits"]) == (3, 1)
+    assert stats["rule_hits"] == {"Transportation": 3, "Entertainment": 1}
+    assert stats["fallbacks"] == 2
+
+    engine.map_series(values)
+    assert engine.stats()["memo_hits"] == 5
+    assert engine.stats()["rule_hits"]["Transportation"] == 6
+
+
+def test_overrides_take_precedence_and_engines_are_shared():
+    engine = engine_with_overrides([("Travel", ("uber",)), ("Pets", ("pet store",))])
+    assert engine.map("Uber trip") == "Travel"
+    assert engine.map("PET STORE 42") == "Pets"
+    assert engine.map("Netflix") == "Entertainment"
+    assert engine_with_overrides([("Travel", ("uber",)), ("Pets", ("pet store",))]) is engine
+    assert engine_with_overrides([]) is default_engine
+
+    frame = pd.DataFrame({"Txn Date": ["01 Apr 2024"], "Description": ["UBER TRIP"], "Debit": ["100"],
+                          "Credit": [None]})
+    assert profiles.normalize(frame, engine)["category"].tolist() == ["Travel"]
+    assert profiles.normalize(frame)["category"].tolist() == ["Transportation"]
+
+
+def test_user_rules_are_loaded_cached_and_fall_back(monkeypatch, postgrest):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params.get("user_id"))
+        if request.url.params.get("user_id") == "eq.broken":
+            return httpx.Response(500, json={"message": "relation does not exist"})
+        return httpx.Response(200, json=[{"keyword": "swiggy", "category": "Food delivery", "priority": 0}],
+                              headers={"content-range": "0-0/1"})
+
+    postgrest(handler)
+    monkeypatch.setattr("services.category_rules.category_rule_cache", CategoryRuleCache())
+
+    async def run():
+        first = await engine_for_user("u1")
+        second = await engine_for_user("u1")
+        fallback = await engine_for_user("broken")
+        return first, second, fallback
+
+    first, second, fallback = asyncio.run(run())
+    assert first is second and first.map("UPI-SWIGGY-123") == "Food delivery"
+    assert fallback is default_engine
+    assert calls == ["eq.u1", "eq.broken"]
+
+
+def test_replacing_rules_is_one_transactional_call(monkeypatch, postgrest):
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path, json.loads(request.content or b"null")))
+        if json.loads(request.content)["p_user_id"] == "broken":
+            return httpx.Response(409, json={"message": "duplicate key", "code": "23505"})
+        return httpx.Response(200, json=2)
+
+    postgrest(handler)
+    cache = CategoryRuleCache()
+    monkeypatch.setattr("services.category_rules.category_rule_cache", cache)
+    cache.put("u1", default_engine)
+
+    rules = [{"keyword": "swiggy", "category": "Food delivery"}, {"keyword": "ola", "category": "Cabs"}]
+    assert asyncio.run(replace_user_rules("u1", rules)) == rules
+    # no separate delete request that could succeed on its own
+    assert calls == [("POST", "/rest/v1/rpc/replace_category_rules", {"p_user_id": "u1", "p_rules": rules})]
+    assert cache.get("u1") is None
+
+    cache.put("broken", default_engine)
+    with pytest.raises(supabase_async.AsyncAPIError):
+        asyncio.run(replace_user_rules("broken", rules))
+    assert cache.get("broken") is default_engine
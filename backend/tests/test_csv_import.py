@@ -0,0 +1,215 @@
+import asyncio
+import datetime
+import decimal
+import gzip
+import io
+import json
+
+import httpx
+import pandas as pd
+import pytest
+
+from services import csv_import, rollups
+from services.csv_import import (
+    CsvImportError, ingest_csv, open_upload, read_upload, upload_compression, upload_format, validate_transactions,
+)
+
+CSV = (
+    "date,amount,category,note,ref\n"
+    "2025-01-03,-12.50,food,lunch,\n"
+    "03/01/2025,-5,food,,\n"
+    "2025-01-04,abc,rent,,\n"
+    "2025-01-05,0,rent,,\n"
+    "2025-01-06,-40, ,,\n"
+    "2025-1-7,2500,salary,,17\n"
+)
+
+
+def test_validate_transactions_rejects_rows_with_one_message_each():
+    rows, errors = validate_transactions(pd.read_csv(io.StringIO(CSV)), "u1")
+    assert errors == [
+        "Row 2: Invalid date (expected YYYY-MM-DD): '03/01/2025'",
+        "Row 3: Invalid amount 'abc'",
+        "Row 4: Amount cannot be zero",
+        "Row 5: Category cannot be empty",
+    ]
+    assert [(r["date"], r["amount"], r["category"]) for r in rows] == [
+        ("2025-01-03", -12.5, "food"),
+        ("2025-01-07", 2500.0, "salary"),
+    ]
+    assert rows[0]["metadata"] == {"note": "lunch"}
+    assert rows[1]["metadata"] == {"ref": "17.0"}
+    assert all(r["user_id"] == "u1" for r in rows)
+    assert len({r["id"] for r in rows}) == 2
+
+
+def test_validate_transactions_offsets_row_numbers():
+    frame = pd.DataFrame({"date": ["2025-01-01", None], "amount": [1, 2], "category": ["a", "b"]})
+    rows, errors = validate_transactions(frame, "u1", row_offset=100)
+    assert len(rows) == 1
+    assert errors == ["Row 102: Date is required"]
+
+
+def test_ingest_csv_streams_chunks_into_bounded_batches(monkeypatch, postgrest):
+    inserted = []
+
+    def handler(request):
+        if request.url.path.endswith("/transactions"):
+            if request.method == "GET":
+                return httpx.Response(200, json=[], headers={"content-range": "*/0"})
+            batch = json.loads(request.content)
+            if any(row["amount"] == -13 for row in batch):
+                return httpx.Response(409, json={"message": "duplicate key"})
+            inserted.append(batch)
+            return httpx.Response(201, json=[{"fingerprint": row["fingerprint"]} for row in batch])
+        return httpx.Response(200, json=None)
+
+    postgrest(handler)
+    monkeypatch.setattr(csv_import, "UPLOAD_INSERT_BATCH_ROWS", 4)
+    monkeypatch.setattr(csv_import, "UPLOAD_INSERT_CONCURRENCY", 2)
+
+    lines = ["date,amount,category"] + [f"2025-02-{i % 28 + 1:02d},-{i + 1},food" for i in range(25)]
+    lines[8] = "bad-date,-8,food"
+    source = io.BytesIO(("\n".join(lines) + "\n").encode())
+    progress = asyncio.run(csv_import.ingest_csv(source, "u1", chunk_rows=10))
+
+    assert progress.rows_parsed == 25
+    assert progress.rows_rejected == 1
+    assert progress.errors[0] == "Row 8: Invalid date (expected YYYY-MM-DD): 'bad-date'"
+    assert progress.rows_failed == 4
+    assert progress.rows_inserted == 20
+    assert all(len(batch) <= 4 for batch in inserted)
+    assert sorted(row["amount"] for batch in inserted for row in batch) == sorted(
+        -float(i) for i in range(1, 26) if i not in (8, 11, 12, 13, 14)
+    )
+
+
+def test_ingest_csv_finishes_committed_chunks_before_a_parse_error(monkeypatch, postgrest):
+    inserted, deltas = [], []
+
+    def handler(request):
+        if request.url.path.endswith("/rpc/apply_rollup_deltas"):
+            deltas.extend(json.loads(request.content)["p_deltas"])
+            return httpx.Response(200, json=None)
+        if request.url.path.endswith("/transactions") and request.method == "POST":
+            batch = json.loads(request.content)
+            inserted.extend(batch)
+            return httpx.Response(201, json=[{"fingerprint": row["fingerprint"]} for row in batch])
+        return httpx.Response(200, json=[], headers={"content-range": "*/0"})
+
+    postgrest(handler)
+    monkeypatch.setattr(csv_import, "UPLOAD_INSERT_BATCH_ROWS", 4)
+    monkeypatch.setattr(rollups, "ROLLUPS_ENABLED", True)
+
+    lines = ["date,amount,category"] + [f"2025-02-{i % 28 + 1:02d},-{i + 1},food" for i in range(25)]
+    lines[22] = "2025-02-22,-22,food,extra,fields"
+    source = io.BytesIO(("\n".join(lines) + "\n").encode())
+    with pytest.raises(CsvImportError, match="Invalid CSV format") as excinfo:
+        asyncio.run(ingest_csv(source, "u1", chunk_rows=10))
+
+    assert excinfo.value.row == 21
+    assert excinfo.value.progress.rows_inserted == len(inserted) == 20
+    assert sum(delta["expense_count"] for delta in deltas) == 20
+
+
+def test_ingest_csv_reports_missing_columns():
+    with pytest.raises(CsvImportError, match="Missing required columns"):
+        asyncio.run(ingest_csv(io.BytesIO(b"date,amount\n2025-01-01,-1\n"), "u1"))
+
+
+def test_read_upload_parses_csv_bytes_with_arrow():
+    pytest.importorskip("pyarrow")
+
+    rows, errors = validate_transactions(read_upload(("﻿" + CSV).encode()), "u1")
+    assert errors == validate_transactions(pd.read_csv(io.StringIO(CSV)), "u1")[1]
+    assert [(r["date"], r["amount"], r["category"]) for r in rows] == [
+        ("2025-01-03", -12.5, "food"),
+        ("2025-01-07", 2500.0, "salary"),
+    ]
+    # extra columns are kept as written
+    assert [r["metadata"] for r in rows] == [{"note": "lunch"}, {"ref": "17"}]
+
+
+def test_read_upload_reports_unreadable_files():
+    pytest.importorskip("pyarrow")
+
+    with pytest.raises(CsvImportError, match="CSV file is empty"):
+        read_upload(b"")
+    with pytest.raises(CsvImportError, match="UTF-8"):
+        read_upload(b"date,amount,category\n2025-01-01,-1,caf\xe9\n")
+    with pytest.raises(CsvImportError, match="Invalid CSV format"):
+        read_upload(b"date,amount,category\n2025-01-01,-1,a,b\n")
+    with pytest.raises(CsvImportError, match="Invalid Parquet format"):
+        read_upload(b"not parquet", "parquet")
+
+
+def test_parquet_and_arrow_uploads_accept_typed_columns(monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    assert [upload_format(name) for name in ("a.CSV", "b.parquet", "c.feather", "d.txt")] == \
+        ["csv", "parquet", "arrow", None]
+    table = pa.table({
+        "date": pa.array([datetime.date(2025, 1, 3), datetime.date(2025, 1, 4), None]),
+        "amount": pa.array([decimal.Decimal("-12.50"), decimal.Decimal("0"), decimal.Decimal("3")],
+                           pa.decimal128(10, 2)),
+        "category": pa.array(["food", "rent", "misc"]).dictionary_encode(),
+    })
+    parquet = io.BytesIO()
+    pq.write_table(table, parquet)
+    stream = io.BytesIO()
+    with pa.ipc.new_stream(stream, table.schema) as writer:
+        writer.write_table(table)
+
+    for content, fmt in ((parquet.getvalue(), "parquet"), (stream.getvalue(), "arrow")):
+        rows, errors = validate_transactions(read_upload(content, fmt), "u1")
+        assert [(r["date"], r["amount"], r["category"]) for r in rows] == [("2025-01-03", -12.5, "food")]
+        assert errors == ["Row 2: Amount cannot be zero", "Row 3: Date is required"]
+
+    inserted = []
+
+    async def fake_insert(user_id, batch):
+        inserted.extend(batch)
+        return batch
+
+    async def no_duplicates(user_id, rows):
+        return rows, 0
+
+    async def no_rollups(user_id, rows):
+        return None
+
+    monkeypatch.setattr(csv_import, "insert_fingerprinted", fake_insert)
+    monkeypatch.setattr(csv_import, "drop_known", no_duplicates)
+    monkeypatch.setattr(csv_import, "apply_transaction_rows", no_rollups)
+    progress = asyncio.run(csv_import.ingest_csv(io.BytesIO(parquet.getvalue()), "u1", chunk_rows=1, fmt="parquet"))
+    assert (progress.rows_parsed, progress.rows_inserted, progress.rows_rejected) == (3, 1, 2)
+    assert progress.errors == ["Row 2: Amount cannot be zero", "Row 3: Date is required"]
+
+
+def test_compressed_uploads_are_decompressed_while_parsing():
+    assert [upload_format(name) for name in ("a.csv.gz", "b.CSV.ZST", "c.parquet.gz", "d.gz")] == \
+        ["csv", "csv", None, None]
+    assert [upload_compression(name) for name in ("a.csv.gz", "b.csv.zst", "c.csv")] == ["gzip", "zstd", None]
+
+    body = CSV.encode()
+    # concatenated gzip members (as appended by batch jobs) read as one file
+    compressed = gzip.compress(body[:60]) + gzip.compress(body[60:])
+    frame = read_upload(open_upload(io.BytesIO(compressed), "s.csv.gz", len(body)), "csv")
+    assert validate_transactions(frame, "u1")[1] == validate_transactions(pd.read_csv(io.StringIO(CSV)), "u1")[1]
+
+    with pytest.raises(CsvImportError, match=f"Decompressed file must be at most {len(body) - 1:,} bytes"):
+        read_upload(open_upload(io.BytesIO(compressed), "s.csv.gz", len(body) - 1), "csv")
+    with pytest.raises(CsvImportError, match="Invalid gzip file"):
+        read_upload(open_upload(io.BytesIO(body), "s.csv.gz", len(body)), "csv")
+
+    zstandard = pytest.importorskip("zstandard")
+    compressed = zstandard.ZstdCompressor().compress(body[:60]) + zstandard.ZstdCompressor().compress(body[60:])
+    frame = read_upload(open_upload(io.BytesIO(compressed), "s.csv.zst", len(body)), "csv")
+    assert len(frame) == 6
+
+
+def test_ingest_csv_streams_gzip_uploads_under_a_decompressed_limit():
+    body = b"date,amount,category\n" + b"2025-01-01,-1,food\n" * 50
+    source = open_upload(io.BytesIO(gzip.compress(body)), "s.csv.gz", len(body) - 1)
+    with pytest.raises(CsvImportError, match="Decompressed file must be at most"):
+        asyncio.run(ingest_csv(source, "u1", chunk_rows=10))
@@ -0,0 +1,37 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from utils.data_cleaner import infer_date_format, normalize_amount, normalize_amounts, parse_date, parse_dates
+
+
+def test_normalize_amounts_matches_normalize_amount():
+    values = ["$1,234.56", "(123.45)", "-99.10", "₹ 2,50,000", "Rs. 1,00,000.50", "1,250 INR", "(Rs.500)",
+              "-₹75", "12"]
+    assert normalize_amounts(pd.Series(values)).tolist() == [normalize_amount(v) for v in values]
+    assert normalize_amount("Rs. 1,00,000") == 100000.0
+    assert normalize_amounts(pd.Series(["1--2", "", None, "abc"])).isna().all()
+    assert normalize_amounts(pd.Series([5, -2])).tolist() == [5.0, -2.0]
+
+
+def test_parse_dates_infers_the_column_format():
+    # 01/02/2025 alone would be read day-first; the column is month-first
+    values = pd.Series(["01/02/2025", "12/25/2025", "03/30/2025", "01/02/2025", None])
+    assert infer_date_format(values) == "%m/%d/%Y"
+    parsed = parse_dates(values)
+    assert parsed[:4].dt.strftime("%Y-%m-%d").tolist() == ["2025-01-02", "2025-12-25", "2025-03-30", "2025-01-02"]
+    assert parsed.isna().tolist() == [False] * 4 + [True]
+
+
+def test_parse_dates_falls_back_per_row_for_stragglers():
+    values = pd.Series(["2025-01-05", "2025-01-06", "2025-03", "2025-01-07T10:30:00", "not a date", "2025-02-30"],
+                       index=range(5, 11))
+    parsed = parse_dates(values)
+    assert parsed.index.tolist() == list(range(5, 11))
+    expected = [parse_date(v) for v in values[:4]]
+    assert [ts.date() for ts in parsed[:4]] == expected == [date(2025, 1, 5), date(2025, 1, 6), date(2025, 3, 1),
+                                                            date(2025, 1, 7)]
+    assert parsed[-2:].isna().all()
+    with pytest.raises(ValueError):
+        parse_date("not a date")
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import httpx
+import numpy as np
+
+from services import dedupe
+from services.dedupe import BloomFilter, FingerprintIndex, OccurrenceCounter, assign_fingerprints
+
+
+def _row(date="2025-01-01", amount=-4.5, category="Food", description=None):
+    row = {"user_id": "u1", "date": date, "amount": amount, "category": category}
+    if description is not None:
+        row["metadata"] = {"description": description}
+    return row
+
+
+def test_fingerprints_ignore_formatting_and_number_repeats():
+    a, b = assign_fingerprints("u1", [_row(amount=-4.5, category=" Food "), _row(amount=-4.50, category="food")])
+    assert len(a["fingerprint"]) == 32
+    # the second identical row is numbered, so genuine repeats are kept apart
+    assert a["fingerprint"] != b["fingerprint"]
+    again = assign_fingerprints("u1", [_row(category="FOOD"), _row()])
+    assert [r["fingerprint"] for r in again] == [a["fingerprint"], b["fingerprint"]]
+    assert assign_fingerprints("u2", [_row()])[0]["fingerprint"] != a["fingerprint"]
+    assert assign_fingerprints("u1", [_row(description="Cafe")])[0]["fingerprint"] != a["fingerprint"]
+
+
+def test_occurrence_counter_continues_across_chunks():
+    counter = OccurrenceCounter()
+    keys = np.array([5, 3, 5, 5], dtype=np.uint64)
+    assert counter.number(keys).tolist() == [1, 1, 2, 3]
+    assert counter.number(np.array([3, 7, 5], dtype=np.uint64)).tolist() == [2, 1, 4]
+
+    chunked = OccurrenceCounter()
+    first = assign_fingerprints("u1", [_row()], chunked)
+    second = assign_fingerprints("u1", [_row()], chunked)
+    whole = assign_fingerprints("u1", [_row(), _row()])
+    assert [first[0]["fingerprint"], second[0]["fingerprint"]] == [r["fingerprint"] for r in whole]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    rows = assign_fingerprints("u1", [_row(amount=-(i + 1)) for i in range(5000)])
+    fingerprints = [r["fingerprint"] for r in rows]
+    bloom = BloomFilter(len(fingerprints))
+    bloom.add(fingerprints[:2500])
+    assert bloom.might_contain(fingerprints[:2500]).all()
+    assert bloom.might_contain(fingerprints[2500:]).mean() < 0.05
+
+
+def test_insert_new_transactions_skips_stored_rows(monkeypatch, postgrest):
+    stored = assign_fingerprints("u1", [_row(amount=-1), _row(amount=-2)])
+    known = {r["fingerprint"] for r in stored}
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path))
+        if request.url.path.endswith("/rpc/existing_fingerprints"):
+            asked = json.loads(request.content)["p_fingerprints"]
+            return httpx.Response(200, json=[{"fingerprint": fp} for fp in asked if fp in known])
+        if request.method == "GET":
+            return httpx.Response(200, json=[{"fingerprint": fp} for fp in known],
+                                  headers={"content-range": "0-1/2"})
+        assert request.url.params["on_conflict"] == "user_id,fingerprint"
+        batch = json.loads(request.content)
+        known.update(r["fingerprint"] for r in batch)
+        return httpx.Response(201, json=[{"fingerprint": r["fingerprint"]} for r in batch])
+
+    postgrest(handler)
+    monkeypatch.setattr(dedupe, "DEDUPE_ENABLED", True)
+    index = FingerprintIndex()
+    monkeypatch.setattr(dedupe, "fingerprint_index", index)
+
+    async def run():
+        # cold: the chunk goes straight to the exact lookup while the filter builds in the background
+        rows = assign_fingerprints("u1", [_row(amount=-1), _row(amount=-2), _row(amount=-3)])
+        first = await dedupe.insert_new_transactions("u1", rows)
+        assert calls[0] == ("POST", "/rest/v1/rpc/existing_fingerprints")
+        await index.wait_warm()
+        # warm: the filter knows the inserted row, so re-importing it needs no reload
+        second = await dedupe.insert_new_transactions("u1", assign_fingerprints("u1", [_row(amount=-3)]))
+        return first, second
+
+    (inserted, duplicates), again = asyncio.run(run())
+    assert [r["amount"] for r in inserted] == [-3]
+    assert duplicates == 2
+    assert again == ([], 1)
+    assert sum(1 for method, _ in calls if method == "GET") == 1
+    assert index.stats()["cold_lookups"] == 1
+
+
+def test_rows_inserted_while_the_filter_builds_are_not_missed(monkeypatch, postgrest):
+    index = FingerprintIndex()
+    release = asyncio.Event()
+    history = assign_fingerprints("u1", [_row(amount=-1)])
+    fresh = assign_fingerprints("u1", [_row(amount=-2)])
+
+    async def slow_fetch_all(query):
+        await release.wait()
+        return [{"fingerprint": r["fingerprint"]} for r in history]
+
+    monkeypatch.setattr(dedupe, "fetch_all", slow_fetch_all)
+    postgrest(lambda request: None)
+
+    async def run():
+        index._warm("u1", 1)
+        index.record("u1", [fresh[0]["fingerprint"]])
+        release.set()
+        await index.wait_warm()
+        return index._cached("u1")
+
+    bloom = asyncio.run(run())
+    assert bloom.might_contain([history[0]["fingerprint"], fresh[0]["fingerprint"]]).all()
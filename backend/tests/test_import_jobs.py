@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+
+import httpx
+
+from services import import_jobs
+from services.import_jobs import (
+    INTERRUPTED_BY_RESTART, INTERRUPTED_BY_SHUTDOWN, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED,
+    ImportJobRunner, LocalJobStore,
+)
+
+
+def _stub(postgrest, inserted):
+    def handler(request):
+        if request.url.path.endswith("/transactions"):
+            if request.method == "GET":
+                return httpx.Response(200, json=[], headers={"content-range": "*/0"})
+            batch = json.loads(request.content)
+            inserted.extend(batch)
+            return httpx.Response(201, json=[{"fingerprint": row["fingerprint"]} for row in batch])
+        return httpx.Response(200, json=None)
+
+    postgrest(handler)
+
+
+def _run_jobs(runner, *contents):
+    async def run():
+        jobs = []
+        for content in contents:
+            job = runner.create("u1", "statement.csv")
+            with open(job.spool_path, "wb") as spool:
+                spool.write(content)
+            runner.submit(job)
+            jobs.append(job)
+        await runner._queue.join()
+        await runner.stop()
+        return jobs
+
+    return asyncio.run(run())
+
+
+def test_import_job_reports_counters_and_removes_spool(postgrest, tmp_path):
+    inserted = []
+    _stub(postgrest, inserted)
+    runner = ImportJobRunner(LocalJobStore(str(tmp_path)), workers=2)
+    good = b"date,amount,category\n2025-01-01,-5,food\n2025-01-02,0,food\n2025-01-03,900,salary\n"
+    bad = b"date,amount\n2025-01-01,-5\n"
+    done, failed = _run_jobs(runner, good, bad)
+
+    record = runner.get(done.id)
+    assert record["status"] == JOB_SUCCEEDED
+    assert (record["rows_parsed"], record["rows_inserted"], record["rows_rejected"]) == (3, 2, 1)
+    assert record["errors"] == ["Row 2: Amount cannot be zero"]
+    assert record["finished_at"] >= record["started_at"]
+    assert len(inserted) == 2
+
+    record = runner.get(failed.id)
+    assert record["status"] == JOB_FAILED
+    assert record["error"] == "Missing required columns: ['category']"
+    assert not any(path.suffix == ".csv" for path in tmp_path.iterdir())
+
+
+def test_job_store_rejects_foreign_ids_and_prunes_finished_jobs(tmp_path):
+    store = LocalJobStore(str(tmp_path))
+    assert store.get("../etc/passwd") is None
+    runner = ImportJobRunner(store)
+    job = runner.create("u1", "a.csv")
+    job.status, job.finished_at = JOB_SUCCEEDED, 1.0
+    store.save(job)
+    assert store.get(job.id)["status"] == JOB_SUCCEEDED
+    assert store.prune(max_age=60) == 1
+    assert store.get(job.id) is None
+
+
+def test_unfinished_jobs_of_dead_processes_fail_on_start(monkeypatch, tmp_path):
+    store = LocalJobStore(str(tmp_path))
+    runner = ImportJobRunner(store)
+    orphaned, live = runner.create("u1", "a.csv"), runner.create("u1", "b.csv")
+    orphaned.status, orphaned.worker_pid = JOB_RUNNING, 2 ** 22 + 1  # above any Linux pid_max
+    live.worker_pid = os.getppid()
+    for job in (orphaned, live):
+        store.save(job)
+        open(job.spool_path, "wb").close()
+
+    async def run():
+        runner.start()
+        await runner.stop()
+
+    asyncio.run(run())
+    record = store.get(orphaned.id)
+    assert (record["status"], record["error"]) == (JOB_FAILED, INTERRUPTED_BY_RESTART)
+    assert record["finished_at"] is not None
+    assert not os.path.exists(orphaned.spool_path)
+    # a job owned by another live process is left to it
+    assert store.get(live.id)["status"] == JOB_QUEUED
+    assert os.path.exists(live.spool_path)
+
+
+def test_stop_fails_running_and_queued_jobs(monkeypatch, tmp_path):
+    store = LocalJobStore(str(tmp_path))
+    runner = ImportJobRunner(store, workers=1)
+    started = asyncio.Event()
+
+    async def slow_ingest(source, user_id, progress, fmt):
+        started.set()
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(import_jobs, "ingest_csv", slow_ingest)
+
+    async def run():
+        jobs = []
+        for name in ("a.csv", "b.csv"):
+            job = runner.create("u1", name)
+            with open(job.spool_path, "wb") as spool:
+                spool.write(b"date,amount,category\n")
+            runner.submit(job)
+            jobs.append(job)
+        await started.wait()
+        await runner.stop()
+        return jobs
+
+    running, queued = asyncio.run(run())
+    for job in (running, queued):
+        record = store.get(job.id)
+        assert (record["status"], record["error"]) == (JOB_FAILED, INTERRUPTED_BY_SHUTDOWN)
+        assert not os.path.exists(job.spool_path)
+    assert store.prune(max_age=-1) == 2
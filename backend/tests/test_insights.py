@@ -0,0 +1,94 @@
+import asyncio
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import numpy as np
+
+from services import rollups
+from services.insights import _shift_month, fill_monthly_series, get_month_summary, get_monthly_trend, summarize_amounts
+
+
+def test_summarize_amounts_splits_income_and_expenses():
+    amounts = np.array([-100.0, 5000.0, -40.0, -60.0, 0.0])
+    categories = np.array(["rent", "salary", "food", "rent", "misc"], dtype=object)
+    summary = summarize_amounts(amounts, categories)
+    assert summary["total_expenses"] == 200.0
+    assert summary["total_income"] == 5000.0
+    assert summary["categories"] == [
+        {"category": "rent", "total": 160.0},
+        {"category": "food", "total": 40.0},
+    ]
+
+
+def test_shift_month_crosses_year_boundaries():
+    assert _shift_month("2025-01", -1) == "2024-12"
+    assert _shift_month("2024-11", 3) == "2025-02"
+
+
+def test_fill_monthly_series_zero_fills_gaps():
+    totals = fill_monthly_series(
+        np.array(["2025-01", "2025-03", "2025-03"], dtype=object),
+        np.array([10.0, 5.0, 7.0]),
+        np.array([100.0, 0.0, 0.0]),
+        "2024-12", "2025-03",
+    )
+    assert list(totals.index) == ["2024-12", "2025-01", "2025-02", "2025-03"]
+    assert list(totals["expense"]) == [0.0, 10.0, 0.0, 12.0]
+    assert list(totals["income"]) == [0.0, 100.0, 0.0, 0.0]
+
+
+def test_monthly_trend_pushes_window_into_rollup_query(postgrest):
+    seen = []
+
+    def handler(request):
+        params = parse_qsl(urlsplit(str(request.url)).query)
+        seen.append(params)
+        if ("limit", "1") in params:
+            return httpx.Response(200, json=[{"month": "2025-10"}])
+        return httpx.Response(200, json=[
+            {"month": "2025-08", "expense_total": 30, "income_total": 0},
+            {"month": "2025-10", "expense_total": 10, "income_total": 500},
+        ])
+
+    postgrest(handler)
+    trend = asyncio.run(get_monthly_trend("u1", 3, series="income"))
+    assert [p["month"] for p in trend] == ["2025-08", "2025-09", "2025-10"]
+    assert [p["total"] for p in trend] == [0.0, 0.0, 500.0]
+    assert [p["expense"] for p in trend] == [30.0, 0.0, 10.0]
+    assert ("month", "gte.2025-08") in seen[-1] and ("month", "lte.2025-10") in seen[-1]
+
+
+def test_failed_rollup_delta_scans_transactions_until_rebuilt(monkeypatch, postgrest):
+    calls = []
+
+    def handler(request):
+        path = request.url.path
+        calls.append(path.rsplit("/", 1)[-1])
+        if path.endswith("/rpc/apply_rollup_deltas"):
+            return httpx.Response(500, json={"message": "connection reset"})
+        if path.endswith("/rpc/rebuild_monthly_rollups"):
+            return httpx.Response(200, json=2)
+        if path.endswith("/transactions"):
+            return httpx.Response(200, text="amount,category\n-40,food\n-60,rent\n",
+                                  headers={"content-range": "0-1/2"})
+        return httpx.Response(200, json=[{"category": "food", "expense_total": 40, "income_total": 0},
+                                         {"category": "rent", "expense_total": 60, "income_total": 0}])
+
+    postgrest(handler)
+    monkeypatch.setattr(rollups, "ROLLUPS_ENABLED", True)
+    monkeypatch.setattr(rollups, "_stale", {})
+    monkeypatch.setattr(rollups, "_rebuilds", {})
+
+    async def run():
+        await rollups.apply_transaction_rows("u-stale", [{"date": "2025-10-02", "amount": -60, "category": "rent"}])
+        scanned = await get_month_summary("u-stale", "2025-10")
+        await asyncio.gather(*rollups._rebuilds.values())
+        return scanned, await get_month_summary("u-stale", "2025-10")
+
+    scanned, rolled = asyncio.run(run())
+    assert scanned == rolled
+    assert scanned["total_expenses"] == 100.0
+    # the stale read scans while the rebuild runs; once rebuilt the rollup is read again
+    assert calls[0] == "apply_rollup_deltas" and calls[-1] == "monthly_category_rollups"
+    assert sorted(calls[1:-1]) == ["rebuild_monthly_rollups", "transactions"]
+    assert rollups.rollups_usable("u-stale")
@@ -0,0 +1,70 @@
+import numpy as np
+
+from services.insights import summarize_amounts
+from services.ledger_cache import LedgerCache, UserLedger
+from services.transaction_frame import TransactionFrame
+
+CSV = (
+    "date,amount,category\n"
+    "2025-03-09,3000,salary\n"
+    "2025-01-03,-12.5,food\n"
+    "2025-01-20,-40,rent\n"
+    "2025-01-01,-5,\n"
+    "2025-03-02,-7.5,food\n"
+)
+
+
+def _ledger():
+    return UserLedger.from_frame(TransactionFrame.from_csv(CSV, columns=("date", "amount", "category")))
+
+
+def test_ledger_is_sorted_and_matches_summarize_amounts():
+    ledger = _ledger()
+    assert list(np.diff(ledger.days) >= 0) == [True] * 4
+    frame = TransactionFrame.from_csv(CSV, columns=("date", "amount", "category")).between("2025-01-01", "2025-01-31")
+    expected = summarize_amounts(frame.amounts, np.asarray(frame.categories, dtype=object))
+    assert ledger.month_summary("2025-01") == expected
+    assert ledger.month_summary("2025-02") == {"total_expenses": 0.0, "total_income": 0.0, "categories": []}
+    assert ledger.month_summary()["total_income"] == 3000.0
+
+
+def test_with_rows_merges_in_date_order_and_adds_categories():
+    ledger = _ledger().with_rows([
+        {"date": "2025-02-01", "amount": -9, "category": "travel"},
+        {"date": "2024-12-31", "amount": -1, "category": "food"},
+    ])
+    assert len(ledger) == 7
+    assert list(np.diff(ledger.days) >= 0) == [True] * 6
+    assert ledger.latest_month() == "2025-03"
+    totals = ledger.monthly_totals("2024-12", "2025-03")
+    assert list(totals.index) == ["2024-12", "2025-01", "2025-02", "2025-03"]
+    assert list(totals["expense"]) == [1.0, 57.5, 9.0, 7.5]
+    assert list(totals["income"]) == [0.0, 0.0, 0.0, 3000.0]
+    assert list(ledger.to_frame("2025-02-01", "2025-03-01").frame["category"]) == ["travel"]
+
+
+def test_cache_evicts_by_bytes_and_refuses_stale_loads():
+    ledger = _ledger()
+    cache = LedgerCache(max_bytes=ledger.nbytes * 2, ttl=60)
+    version = cache.version("a")
+    cache.append("a", [{"date": "2025-04-01", "amount": -1, "category": "food"}])
+    assert cache.put("a", ledger, version) is False
+
+    assert cache.put("a", ledger, cache.version("a"))
+    assert cache.put("b", ledger)
+    cache.get("a")
+    assert cache.put("c", ledger)
+    assert cache.get("b") is None
+    assert cache.get("a") is ledger
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 2 * ledger.nbytes
+
+
+def test_cache_appends_to_resident_ledgers_and_expires():
+    now = [0.0]
+    cache = LedgerCache(max_bytes=1 << 20, ttl=10, clock=lambda: now[0])
+    cache.put("a", _ledger())
+    cache.append("a", [{"date": "2025-01-15", "amount": -100, "category": "rent"}])
+    assert cache.get("a").month_summary("2025-01")["total_expenses"] == 157.5
+    now[0] = 11.0
+    assert cache.get("a") is None
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from services import manual_expenses, rollups
+from services.manual_expenses import create_expenses, validate_expenses
+
+
+def _client(postgrest, monkeypatch, fail_category=None):
+    """PostgREST stand-in recording insert batches and rollup RPCs; batches holding `fail_category` fail."""
+    calls = {"inserts": [], "rollups": []}
+
+    def handler(request):
+        body = json.loads(request.content)
+        if request.url.path.endswith("/rpc/apply_rollup_deltas"):
+            calls["rollups"].append(body)
+            return httpx.Response(200, json=None)
+        assert request.url.path.endswith("/manual_expenses") and request.method == "POST"
+        assert request.headers["Prefer"] == "return=minimal"
+        if any(row["category"] == fail_category for row in body):
+            return httpx.Response(409, json={"message": "conflict", "code": "23505"})
+        calls["inserts"].append(body)
+        return httpx.Response(201)
+
+    postgrest(handler)
+    monkeypatch.setattr(rollups, "ROLLUPS_ENABLED", True)
+    return calls
+
+
+def _expense(i, **overrides):
+    item = {"date": f"2025-03-{1 + i % 28:02d}", "amount": 10 + i, "category": "Groceries", "description": f"item {i}"}
+    item.update(overrides)
+    return item
+
+
+def test_validation_reports_every_bad_item_by_index():
+    items = [
+        _expense(0),
+        _expense(1, date="03/02/2025"),
+        _expense(2, amount="abc"),
+        _expense(3, amount=-5),
+        _expense(4, amount=float("nan")),
+        _expense(5, category="  "),
+        _expense(6, expense_type="weekly"),
+        "not an object",
+        _expense(8, amount="12.50", category=" Rent ", expense_type="monthly"),
+        _expense(9, amount=True),
+    ]
+    rows, errors = validate_expenses(items, "u1")
+    assert [index for index, _ in rows] == [0, 8]
+    assert sorted(errors) == [1, 2, 3, 4, 5, 6, 7, 9]
+    assert "date" in errors[1] and "positive" in errors[3] and "expense_type" in errors[6]
+    row = rows[1][1]
+    assert (row["amount"], row["category"], row["expense_type"], row["user_id"]) == (12.5, "Rent", "monthly", "u1")
+    assert rows[0][1]["expense_type"] == "one-time"
+
+
+def test_valid_items_are_inserted_in_bounded_batches(monkeypatch, postgrest):
+    calls = _client(postgrest, monkeypatch)
+    monkeypatch.setattr(manual_expenses, "EXPENSE_INSERT_BATCH_ROWS", 40)
+    items = [_expense(i) for i in range(150)]
+    items[7]["amount"] = 0
+
+    outcome = asyncio.run(create_expenses("u1", items))
+
+    assert (outcome["inserted"], outcome["failed"]) == (149, 1)
+    assert [len(batch) for batch in calls["inserts"]] == [40, 40, 40, 29]
+    assert [result["index"] for result in outcome["results"]] == list(range(150))
+    assert outcome["results"][7]["success"] is False
+    inserted_ids = {row["id"] for batch in calls["inserts"] for row in batch}
+    assert {r["expense_id"] for r in outcome["results"] if r["success"]} == inserted_ids
+
+
+def test_failed_batch_only_fails_its_own_items(monkeypatch, postgrest):
+    calls = _client(postgrest, monkeypatch, fail_category="Broken")
+    monkeypatch.setattr(manual_expenses, "EXPENSE_INSERT_BATCH_ROWS", 3)
+    items = [_expense(i) for i in range(9)]
+    items[4]["category"] = "Broken"
+
+    outcome = asyncio.run(create_expenses("u1", items))
+
+    assert [r["success"] for r in outcome["results"]] == [True] * 3 + [False] * 3 + [True] * 3
+    assert outcome["results"][3]["error"].startswith("insert failed")
+    assert (outcome["inserted"], outcome["failed"]) == (6, 3)
+    # only the rows that were written reach the rollups, in one call
+    (rollup_call,) = calls["rollups"]
+    (delta,) = rollup_call["p_deltas"]
+    assert delta["manual_expense_count"] == 6
+    assert delta["manual_expense_total"] == pytest.approx(sum(10 + i for i in (0, 1, 2, 6, 7, 8)))
+
+
+def test_nothing_valid_means_no_writes(monkeypatch, postgrest):
+    calls = _client(postgrest, monkeypatch)
+    outcome = asyncio.run(create_expenses("u1", [_expense(0, amount=None)]))
+    assert (outcome["inserted"], outcome["failed"]) == (0, 1)
+    assert calls == {"inserts": [], "rollups": []}
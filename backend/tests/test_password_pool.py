@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+
+from auth_utils import PasswordHasherPool, PasswordPoolSaturated
+
+
+def test_pool_runs_work_and_records_metrics():
+    pool = PasswordHasherPool(max_workers=2, max_queue=8)
+
+    async def run():
+        return await asyncio.gather(*(pool.submit(lambda x: x * 2, i) for i in range(4)))
+
+    try:
+        assert asyncio.run(run()) == [0, 2, 4, 6]
+        stats = pool.stats()
+        assert stats["completed"] == 4
+        assert stats["queue_depth"] == 0
+        assert stats["active"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_pool_rejects_when_queue_is_full():
+    pool = PasswordHasherPool(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.ensure_future(pool.submit(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PasswordPoolSaturated):
+            await asyncio.gather(pool.submit(release.wait), pool.submit(release.wait))
+        release.set()
+        await first
+
+    try:
+        asyncio.run(run())
+        assert pool.stats()["rejected"] == 1
+    finally:
+        release.set()
+        pool.shutdown()
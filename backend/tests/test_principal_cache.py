@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from services.principal_cache import Principal, PrincipalCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _principal(user_id):
+    return Principal(id=user_id, email=f"{user_id}@example.com", name="Test", created_at=datetime(2024, 1, 1), onboarding_complete=True)
+
+
+def test_hit_and_miss_counters():
+    cache = PrincipalCache(maxsize=4, ttl=60)
+    assert cache.get("u1") is None
+    cache.put("u1", _principal("u1"))
+    assert cache.get("u1").id == "u1"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = PrincipalCache(maxsize=4, ttl=10, clock=clock)
+    cache.put("u1", _principal("u1"))
+    clock.now = 9.9
+    assert cache.get("u1") is not None
+    clock.now = 10.0
+    assert cache.get("u1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    cache.put("u1", _principal("u1"))
+    cache.put("u2", _principal("u2"))
+    cache.get("u1")
+    cache.put("u3", _principal("u3"))
+    assert cache.get("u2") is None
+    assert cache.get("u1") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_drops_entry():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    cache.put("u1", _principal("u1"))
+    cache.invalidate("u1")
+    assert cache.get("u1") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_principal_has_no_instance_dict():
+    principal = _principal("u1")
+    assert not hasattr(principal, "__dict__")
@@ -0,0 +1,24 @@
+from services.rollups import manual_expense_deltas, transaction_deltas
+
+
+def test_transaction_deltas_group_by_month_and_category():
+    rows = [
+        {"date": "2025-10-01", "amount": -100.0, "category": "rent"},
+        {"date": "2025-10-15", "amount": -50.5, "category": "rent"},
+        {"date": "2025-10-31", "amount": 9000, "category": "salary"},
+        {"date": "2025-11-02", "amount": "-20", "category": None},
+    ]
+    deltas = {(d["month"], d["category"]): d for d in transaction_deltas(rows)}
+    assert deltas[("2025-10", "rent")]["expense_total"] == 150.5
+    assert deltas[("2025-10", "rent")]["expense_count"] == 2
+    assert deltas[("2025-10", "salary")]["income_total"] == 9000.0
+    assert deltas[("2025-10", "salary")]["expense_count"] == 0
+    assert deltas[("2025-11", "")]["expense_total"] == 20.0
+
+
+def test_deletes_produce_negative_deltas():
+    rows = [{"date": "2025-10-03", "amount": 250, "category": "Food"}]
+    (delta,) = manual_expense_deltas(rows, sign=-1)
+    assert delta["manual_expense_total"] == -250.0
+    assert delta["manual_expense_count"] == -1
+    assert "expense_total" not in delta
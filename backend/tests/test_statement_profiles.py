@@ -0,0 +1,97 @@
+import asyncio
+import io
+
+import pandas as pd
+
+from services import csv_import
+from services.csv_import import validate_transactions
+from utils.statement_profiles import ProfileRegistry, StatementProfile, profiles
+
+HDFC = (
+    "Date,Narration,Chq./Ref.No.,Value Dt,Withdrawal Amt.,Deposit Amt.,Closing Balance\n"
+    '01/04/25,UPI-STARBUCKS COFFEE,0000123,01/04/25,"1,250.00",,"1,23,456.00"\n'
+    '02/04/25,SALARY APR,,02/04/25,,"85,000.00","2,08,456.00"\n'
+    "31/13/25,BAD DATE,,,10,,\n"
+    "03/04/25,NOTHING,,,,,\n"
+)
+
+
+def _frame(text):
+    return pd.read_csv(io.StringIO(text), dtype=str)
+
+
+def test_detects_builtin_layouts_from_the_header():
+    headers = {
+        "hdfc": "Date,Narration,Chq./Ref.No.,Value Dt,Withdrawal Amt.,Deposit Amt.,Closing Balance",
+        "sbi": "Txn Date,Value Date,Description,Ref No./Cheque No.,Debit,Credit,Balance",
+        "icici": "S No.,Value Date,Transaction Date,Cheque Number,Transaction Remarks,"
+                 "Withdrawal Amount (INR ),Deposit Amount (INR ),Balance (INR )",
+        "axis": "Tran Date,CHQNO,PARTICULARS,DR,CR,BAL,SOL",
+        "kotak": "Transaction Date,Description,Chq / Ref No.,Amount,Dr / Cr,Balance",
+        "debit_credit": "Date,Details,Debit,Credit",
+        "signed_amount": "Date,Amount,Narration",
+    }
+    for name, header in headers.items():
+        assert profiles.detect(header.split(",")).name == name
+    # native uploads and unknown layouts are left alone
+    assert profiles.detect(["date", "amount", "category", "note"]) is None
+    assert profiles.detect(["when", "how much"]) is None
+
+
+def test_debit_credit_profile_rewrites_rows_and_keeps_metadata():
+    rows, errors = validate_transactions(profiles.normalize(_frame(HDFC)), "u1")
+    assert [(r["date"], r["amount"], r["category"]) for r in rows] == [
+        ("2025-04-01", -1250.0, "Dining"),
+        ("2025-04-02", 85000.0, "Income"),
+    ]
+    assert rows[0]["metadata"] == {
+        "description": "UPI-STARBUCKS COFFEE", "reference": "0000123",
+        "value_date": "01/04/25", "balance": "1,23,456.00",
+    }
+    assert errors == ["Row 3: Invalid date (expected YYYY-MM-DD): '31/13/25'", "Row 4: Invalid amount ''"]
+
+
+def test_direction_column_sets_the_sign():
+    frame = _frame(
+        "Transaction Date,Description,Amount,Dr / Cr\n"
+        "05-04-2025,Amazon order,499.00,DR\n"
+        "06-04-2025,Refund,(20),CR\n"
+        '07-04-2025,Cash,"₹1,00,000.50",Dr\n'
+    )
+    normalized = profiles.normalize(frame)
+    assert normalized["amount"].tolist() == [-499.0, 20.0, -100000.5]
+    assert normalized["category"].tolist() == ["Shopping", "Refund", "Cash"]
+
+
+def test_registry_prefers_the_most_specific_profile_and_memoizes():
+    registry = ProfileRegistry()
+    registry.register(StatementProfile("loose", date=("date",), amount=("amount",), description=("memo",)))
+    registry.register(StatementProfile("strict", date=("date",), amount=("amount",), description=("memo",),
+                                       keep={"balance": ("balance",)}))
+    first = registry.detect(["Date", "Amount", "Memo", "Balance"])
+    assert first.name == "strict"
+    assert registry.detect(["Date", "Amount", "Memo", "Balance"]) is first
+    assert registry.detect(["Date", "Amount", "Memo"]).name == "loose"
+    # a category must be derivable: no category or narration column, no profile
+    assert registry.detect(["Date", "Amount"]) is None
+
+
+def test_ingest_csv_applies_profiles_per_chunk(monkeypatch):
+    inserted = []
+
+    async def fake_insert(user_id, batch):
+        inserted.extend(batch)
+        return batch
+
+    async def no_duplicates(user_id, rows):
+        return rows, 0
+
+    async def no_rollups(user_id, rows):
+        return None
+
+    monkeypatch.setattr(csv_import, "insert_fingerprinted", fake_insert)
+    monkeypatch.setattr(csv_import, "drop_known", no_duplicates)
+    monkeypatch.setattr(csv_import, "apply_transaction_rows", no_rollups)
+    progress = asyncio.run(csv_import.ingest_csv(io.BytesIO(HDFC.encode()), "u1", chunk_rows=2))
+    assert (progress.rows_parsed, progress.rows_inserted, progress.rows_rejected) == (4, 2, 2)
+    assert sorted(r["amount"] for r in inserted) == [-1250.0, 85000.0]
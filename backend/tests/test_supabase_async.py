@@ -0,0 +1,132 @@
+import asyncio
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import pytest
+
+from supabase_async import AsyncAPIError, AsyncSupabaseClient, fetch_all
+
+
+def _client(handler):
+    return AsyncSupabaseClient("https://example.supabase.co", "srv_test_key", transport=httpx.MockTransport(handler))
+
+
+def test_select_builds_postgrest_query():
+    seen = {}
+
+    def handler(request):
+        seen["path"] = request.url.path
+        seen["params"] = parse_qsl(urlsplit(str(request.url)).query)
+        seen["apikey"] = request.headers["apikey"]
+        seen["prefer"] = request.headers.get("prefer")
+        return httpx.Response(200, json=[{"amount": -10}], headers={"content-range": "0-0/42"})
+
+    async def run():
+        sb = _client(handler)
+        try:
+            return await (
+                sb.table("transactions").select("date, amount", count="exact")
+                .eq("user_id", "u1").gte("date", "2024-01-01").lt("date", "2024-02-01")
+                .order("date", desc=True).order("id", desc=True).range(10, 19).execute()
+            )
+        finally:
+            await sb.aclose()
+
+    res = asyncio.run(run())
+    assert res.data == [{"amount": -10}]
+    assert res.count == 42
+    assert seen["path"] == "/rest/v1/transactions"
+    assert ("select", "date,amount") in seen["params"]
+    assert ("date", "gte.2024-01-01") in seen["params"]
+    assert ("date", "lt.2024-02-01") in seen["params"]
+    assert ("order", "date.desc,id.desc") in seen["params"]
+    assert ("offset", "10") in seen["params"] and ("limit", "10") in seen["params"]
+    assert seen["apikey"] == "srv_test_key"
+    assert seen["prefer"] == "count=exact"
+
+
+def test_in_filter_quotes_reserved_characters():
+    seen = {}
+
+    def handler(request):
+        seen["params"] = parse_qsl(urlsplit(str(request.url)).query)
+        return httpx.Response(200, json=[])
+
+    async def run():
+        sb = _client(handler)
+        try:
+            await sb.table("transactions").select("id").in_("category", ["food", "bills, misc"]).execute()
+        finally:
+            await sb.aclose()
+
+    asyncio.run(run())
+    assert ("category", 'in.(food,"bills, misc")') in seen["params"]
+
+
+def test_scalar_filters_send_values_unquoted():
+    seen = {}
+
+    def handler(request):
+        seen["params"] = parse_qsl(urlsplit(str(request.url)).query)
+        return httpx.Response(200, json=[])
+
+    async def run():
+        sb = _client(handler)
+        try:
+            await (
+                sb.table("manual_expenses").select("id").eq("category", "Food delivery")
+                .eq("email", "a.b@example.com").gte("created_at", "2024-05-01T10:00:00+00:00")
+                .in_("category", ["Food delivery", "Rent"]).execute()
+            )
+        finally:
+            await sb.aclose()
+
+    asyncio.run(run())
+    assert ("category", "eq.Food delivery") in seen["params"]
+    assert ("email", "eq.a.b@example.com") in seen["params"]
+    assert ("created_at", "gte.2024-05-01T10:00:00+00:00") in seen["params"]
+    # only `in.(...)` list items are quoted
+    assert ("category", 'in.("Food delivery",Rent)') in seen["params"]
+
+
+def test_error_status_raises():
+    def handler(request):
+        return httpx.Response(400, json={"message": "bad filter", "code": "PGRST100"})
+
+    async def run():
+        sb = _client(handler)
+        try:
+            await sb.table("transactions").insert([{"amount": 1}]).execute()
+        finally:
+            await sb.aclose()
+
+    with pytest.raises(AsyncAPIError) as exc_info:
+        asyncio.run(run())
+    assert exc_info.value.code == "PGRST100"
+
+
+def test_fetch_all_pages_past_the_row_cap():
+    table = [{"id": i} for i in range(23)]
+    cap = 5
+    requests = []
+
+    def handler(request):
+        params = dict(parse_qsl(urlsplit(str(request.url)).query))
+        requests.append(params)
+        offset = int(params.get("offset", 0))
+        limit = min(int(params.get("limit", cap)), cap)
+        page = table[offset:offset + limit]
+        headers = {"content-range": f"{offset}-{offset + len(page) - 1}/{len(table)}"}
+        return httpx.Response(200, json=page, headers=headers)
+
+    async def run():
+        sb = _client(handler)
+        try:
+            return await fetch_all(sb.table("transactions").select("id").eq("user_id", "u1"), page_size=10, fan_out=3)
+        finally:
+            await sb.aclose()
+
+    rows = asyncio.run(run())
+    assert [row["id"] for row in rows] == list(range(23))
+    assert all(params["order"] == "id.asc" for params in requests)
+    assert len(requests) == 5
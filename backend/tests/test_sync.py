@@ -0,0 +1,67 @@
+import asyncio
+
+import httpx
+
+from services import sync
+from services.sync import changes_since
+
+LOG = [
+    {"seq": 3, "table_name": "transactions", "row_id": "t1", "op": "upsert"},
+    {"seq": 5, "table_name": "goals", "row_id": "g1", "op": "upsert"},
+    {"seq": 6, "table_name": "manual_expenses", "row_id": "m1", "op": "delete"},
+    {"seq": 8, "table_name": "transactions", "row_id": "t2", "op": "upsert"},  # deleted before the pull
+    {"seq": 9, "table_name": "transactions", "row_id": "t3", "op": "upsert"},
+]
+TABLES = {
+    "transactions": [{"id": "t1", "amount": -5}, {"id": "t3", "amount": 12}],
+    "goals": [{"id": "g1", "title": "Bike"}],
+}
+
+
+def _stub(postgrest, pruned_seq=0):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        table = request.url.path.rsplit("/", 1)[-1]
+        params = request.url.params
+        if table == "user_sync_state":
+            return httpx.Response(200, json=[{"last_seq": 9, "pruned_seq": pruned_seq}])
+        if table == "change_log":
+            since = int(params["seq"].split(".")[1])
+            return httpx.Response(200, json=[e for e in LOG if e["seq"] > since][:int(params["limit"])])
+        ids = params["id"][len("in.("):-1].split(",")
+        return httpx.Response(200, json=[row for row in TABLES.get(table, []) if row["id"] in ids])
+
+    postgrest(handler)
+    return requests
+
+
+def test_changes_group_rows_and_tombstones_by_table(postgrest):
+    _stub(postgrest)
+    result = asyncio.run(changes_since("u1", 0))
+    assert result["cursor"] == 9 and not result["has_more"] and not result["reset"]
+    assert result["changes"] == {"transactions": TABLES["transactions"], "goals": TABLES["goals"]}
+    assert result["deleted"] == {"manual_expenses": ["m1"]}
+
+    later = asyncio.run(changes_since("u1", 9))
+    assert later == {"cursor": 9, "has_more": False, "reset": False, "changes": {}, "deleted": {}}
+
+
+def test_changes_page_by_sequence_and_chunk_row_fetches(monkeypatch, postgrest):
+    requests = _stub(postgrest)
+    monkeypatch.setattr(sync, "SYNC_FETCH_IDS", 1)
+    first = asyncio.run(changes_since("u1", 0, limit=2))
+    assert (first["cursor"], first["has_more"]) == (5, True)
+    assert set(first["changes"]) == {"transactions", "goals"}
+    second = asyncio.run(changes_since("u1", first["cursor"], limit=2))
+    assert (second["cursor"], second["has_more"]) == (8, True)
+    assert second["changes"] == {} and second["deleted"] == {"manual_expenses": ["m1"]}
+    assert all(r.url.params["user_id"] == "eq.u1" for r in requests)
+
+
+def test_cursor_behind_pruned_tombstones_requires_reset(postgrest):
+    _stub(postgrest, pruned_seq=6)
+    assert asyncio.run(changes_since("u1", 4))["reset"] is True
+    assert asyncio.run(changes_since("u1", 0))["reset"] is False
+    assert asyncio.run(changes_since("u1", 6))["reset"] is False
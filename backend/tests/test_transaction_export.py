@@ -0,0 +1,95 @@
+import asyncio
+import csv
+import io
+import json
+import re
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+import supabase_async
+from services import transaction_export
+from services.pagination import iter_keyset_pages
+from services.transaction_export import export_chunks
+from utils.responses import ExportGZipMiddleware
+
+ROWS = [
+    {"id": str(uuid.UUID(int=i)), "date": f"2024-{1 + i % 12:02d}-01", "amount": -1.5 * i,
+     "category": "Dining" if i % 2 else "Rent, shared", "metadata": {"ref": i} if i % 3 else None,
+     "created_at": "2024-12-31T10:00:00+00:00"}
+    for i in range(1, 30)
+]
+ORDERED = sorted(ROWS, key=lambda r: (r["date"], r["id"]))
+
+
+def _serve(requests):
+    def handler(request):
+        requests.append(request)
+        params = request.url.params
+        assert params["order"] == "date.asc,id.asc"
+        rows = ORDERED
+        if "or" in params:
+            day, row_id = re.fullmatch(r"\(date\.gt\.(\S+),and\(date\.eq\.\1,id\.gt\.(\S+)\)\)", params["or"]).groups()
+            rows = [r for r in rows if r["date"] > day or (r["date"] == day and r["id"] > row_id)]
+        return httpx.Response(200, json=rows[:int(params["limit"])])
+    return handler
+
+
+def _export(postgrest, fmt, page_size=4):
+    requests = []
+    postgrest(_serve(requests))
+
+    async def run():
+        query = supabase_async.get_async_client().table("transactions").select("*").eq("user_id", "u1")
+        return [chunk async for chunk in export_chunks(iter_keyset_pages(query, page_size, desc=False), fmt)]
+
+    return asyncio.run(run()), requests
+
+
+def test_csv_export_streams_one_chunk_per_page(postgrest):
+    chunks, requests = _export(postgrest, "csv")
+    assert len(requests) == 8 and len(chunks) == 9  # header + one chunk per page of 4
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["id"] for row in rows] == [row["id"] for row in ORDERED]
+    assert rows[0]["category"] == ORDERED[0]["category"]
+    assert [json.loads(row["metadata"]) if row["metadata"] else None for row in rows] == [
+        row["metadata"] for row in ORDERED]
+
+
+def test_ndjson_export_round_trips_rows(postgrest):
+    chunks, _ = _export(postgrest, "ndjson", page_size=10)
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line) for line in lines] == ORDERED
+
+
+def test_parquet_export_sends_row_groups_as_they_fill(monkeypatch, postgrest):
+    pa_parquet = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(transaction_export, "EXPORT_PARQUET_ROW_GROUP_ROWS", 10)
+    chunks, _ = _export(postgrest, "parquet")
+    assert len(chunks) == 3  # two row groups of 12 as they fill, then the last 5 with the footer
+    parquet = pa_parquet.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet.num_row_groups == 3
+    table = parquet.read(use_threads=False)
+    assert table.column("id").to_pylist() == [row["id"] for row in ORDERED]
+    assert str(table.column("date").type) == "date32[day]"
+    assert table.column("amount").to_pylist() == [row["amount"] for row in ORDERED]
+
+
+def test_gzip_skips_parquet_exports_only():
+    app = FastAPI()
+    app.add_middleware(ExportGZipMiddleware, minimum_size=10)
+
+    @app.get("/transactions/export")
+    async def export(format: str = "csv"):
+        return PlainTextResponse("x" * 2000)
+
+    client = TestClient(app)
+    headers = {"Accept-Encoding": "gzip"}
+    for format, encoding in (("csv", "gzip"), ("ndjson", "gzip"), ("parquet", None)):
+        response = client.get("/transactions/export", params={"format": format}, headers=headers)
+        assert response.headers.get("content-encoding") == encoding
+        assert response.text == "x" * 2000
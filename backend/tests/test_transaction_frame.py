@@ -0,0 +1,51 @@
+import asyncio
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import numpy as np
+
+import supabase_async
+from services.transaction_frame import TransactionFrame, load_transaction_frame
+
+
+def test_from_csv_pages_joins_headers_and_types_columns():
+    pages = [
+        "id,date,amount,category\n1,2025-01-03,-12.50,food\n2,2025-01-09,3000,salary\n",
+        "id,date,amount,category\n3,2025-02-01,-7.25,\"rent, shared\"\n4,2025-02-14,-1,\n",
+    ]
+    transactions = TransactionFrame.from_csv_pages(pages)
+    assert len(transactions) == 4
+    assert transactions.amounts.dtype == np.float64
+    assert transactions.dates.dtype == np.dtype("datetime64[ns]")
+    assert str(transactions.frame["category"].dtype) == "category"
+    assert list(transactions.month_keys()) == ["2025-01", "2025-01", "2025-02", "2025-02"]
+    assert transactions.categories[2] == "rent, shared"
+    assert list(transactions.expenses().amounts) == [-12.5, -7.25, -1.0]
+    assert len(transactions.between("2025-01-05", "2025-02-01")) == 2
+
+
+def test_from_csv_pages_handles_empty_results():
+    assert TransactionFrame.from_csv_pages([""]).is_empty
+    assert TransactionFrame.from_csv_pages(["date,amount\n"], columns=("date", "amount")).is_empty
+
+
+def test_load_transaction_frame_requests_csv_pages(monkeypatch, postgrest):
+    rows = [f"{i},2025-03-{i % 28 + 1:02d},-{i}.5,cat{i % 3}" for i in range(7)]
+    accepts = []
+
+    def handler(request):
+        params = dict(parse_qsl(urlsplit(str(request.url)).query))
+        accepts.append(request.headers["accept"])
+        offset, limit = int(params.get("offset", 0)), int(params["limit"])
+        page = rows[offset:offset + limit]
+        body = "id,date,amount,category\n" + "".join(line + "\n" for line in page)
+        headers = {"content-range": f"{offset}-{offset + len(page) - 1}/{len(rows)}"}
+        return httpx.Response(200, text=body, headers=headers)
+
+    postgrest(handler)
+    monkeypatch.setattr(supabase_async, "ASYNC_DB_PAGE_SIZE", 3)
+    transactions = asyncio.run(load_transaction_frame("u1", "2025-03-01", "2025-04-01"))
+    assert len(transactions) == 7
+    assert list(transactions.frame["id"]) == [str(i) for i in range(7)]
+    assert transactions.amounts.sum() == -sum(i + 0.5 for i in range(7))
+    assert accepts == ["text/csv"] * 3
@@ -0,0 +1,151 @@
+import asyncio
+import operator
+import re
+import uuid
+
+import httpx
+import pytest
+
+from services.pagination import CursorError
+from services.unified_ledger import (
+    SOURCE_MANUAL_EXPENSE, SOURCE_TRANSACTION, decode_ledger_cursor, iter_ledger, ledger_page, summarize_ledger,
+)
+from utils.category_engine import CategoryEngine
+
+TABLES = {
+    "transactions": [
+        {"id": str(uuid.UUID(int=i)), "date": f"2025-01-{1 + i // 3:02d}", "amount": 100.0 if i % 5 == 0 else -2.0 * i,
+         "category": "Dining" if i % 2 else " ", "metadata": {"description": f"card {i}"}}
+        for i in range(1, 20)
+    ],
+    "manual_expenses": [
+        {"id": str(uuid.UUID(int=1000 + i)), "date": f"2025-01-{1 + i // 2:02d}", "amount": 3.0 * i,
+         "category": "uber ride" if i % 2 else None, "description": f"cash {i}"}
+        for i in range(1, 12)
+    ],
+}
+OPS = {"lt": operator.lt, "lte": operator.le, "gt": operator.gt, "gte": operator.ge, "eq": operator.eq}
+
+
+def _serve(requests):
+    """PostgREST stand-in: repeated `date` filters, the keyset `or` filter, ordering and limit/offset."""
+    def handler(request):
+        requests.append(request)
+        table = request.url.path.rsplit("/", 1)[-1]
+        rows = TABLES[table]
+        for key, value in request.url.params.multi_items():
+            if key == "date":
+                op, day = value.split(".", 1)
+                rows = [r for r in rows if OPS[op](r["date"], day)]
+            elif key == "or":
+                op, day, row_id = re.fullmatch(
+                    r"\(date\.(lt|gt)\.(\S+),and\(date\.eq\.\2,id\.\1\.(\S+)\)\)", value).groups()
+                rows = [r for r in rows if OPS[op]((r["date"], r["id"]), (day, row_id))]
+        desc = request.url.params["order"] == "date.desc,id.desc"
+        rows = sorted(rows, key=lambda r: (r["date"], r["id"]), reverse=desc)
+        offset = int(request.url.params.get("offset", 0))
+        return httpx.Response(200, json=rows[offset:offset + int(request.url.params["limit"])])
+    return handler
+
+
+def _client(postgrest):
+    requests = []
+    postgrest(_serve(requests))
+    return requests
+
+
+def _expected(desc=True, start=None, end=None):
+    entries = [(r["date"], 0, r["id"]) for r in TABLES["transactions"]]
+    entries += [(r["date"], 1, r["id"]) for r in TABLES["manual_expenses"]]
+    entries = [e for e in entries if (start is None or e[0] >= start) and (end is None or e[0] <= end)]
+    return [e[2] for e in sorted(entries, reverse=desc)]
+
+
+def _walk(limit, desc=True, start=None, end=None):
+    async def run():
+        seen, cursor = [], None
+        while True:
+            page, cursor = await ledger_page("u1", limit, cursor, start, end, desc=desc)
+            assert len(page) <= limit
+            seen.extend(page)
+            if cursor is None:
+                return seen
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("desc", [True, False])
+@pytest.mark.parametrize("limit", [1, 4, 7, 50])
+def test_pages_walk_both_sources_once_in_date_order(postgrest, desc, limit):
+    _client(postgrest)
+    assert [entry["id"] for entry in _walk(limit, desc)] == _expected(desc)
+
+
+def test_date_range_applies_to_both_sources(postgrest):
+    _client(postgrest)
+    assert [e["id"] for e in _walk(3, start="2025-01-02", end="2025-01-04")] == _expected(True, "2025-01-02", "2025-01-04")
+
+
+def test_entries_normalize_sign_and_category(postgrest):
+    _client(postgrest)
+    entries = {entry["id"]: entry for entry in _walk(50)}
+    manual = entries[str(uuid.UUID(int=1001))]
+    assert manual == {"id": str(uuid.UUID(int=1001)), "source": SOURCE_MANUAL_EXPENSE, "date": "2025-01-01",
+                      "amount": -3.0, "category": "Transportation", "description": "cash 1"}
+    assert entries[str(uuid.UUID(int=1002))]["category"] == "Other"
+    transaction = entries[str(uuid.UUID(int=5))]
+    assert (transaction["source"], transaction["amount"], transaction["description"]) == (SOURCE_TRANSACTION, 100.0, "card 5")
+    assert entries[str(uuid.UUID(int=2))]["category"] == "Other"
+
+
+def test_manual_expense_categories_use_the_given_engine(postgrest):
+    _client(postgrest)
+    engine = CategoryEngine([("Cabs", ("uber",))])
+    page, _ = asyncio.run(ledger_page("u1", 50, engine=engine))
+    assert {e["category"] for e in page if e["source"] == SOURCE_MANUAL_EXPENSE} == {"Cabs", "Other"}
+
+
+def test_each_page_reads_at_most_limit_plus_one_rows_per_source(postgrest):
+    requests = _client(postgrest)
+    asyncio.run(ledger_page("u1", 5))
+    assert len(requests) == 2
+    assert all(int(r.url.params["limit"]) == 6 for r in requests)
+
+
+def test_invalid_cursor_is_rejected(postgrest):
+    _client(postgrest)
+    with pytest.raises(CursorError):
+        decode_ledger_cursor("not-a-cursor")
+    with pytest.raises(CursorError):
+        asyncio.run(ledger_page("u1", 5, cursor="WyIyMDI1LTAxLTAxIiwiYm9ndXMiLCIxIl0"))
+
+
+@pytest.mark.parametrize("desc", [True, False])
+@pytest.mark.parametrize("page_size", [2, 5, 100])
+def test_iter_ledger_streams_the_merged_sequence(postgrest, desc, page_size):
+    requests = _client(postgrest)
+
+    async def run():
+        return [page async for page in iter_ledger("u1", desc=desc, page_size=page_size)]
+
+    pages = asyncio.run(run())
+    assert [e["id"] for page in pages for e in page] == _expected(desc)
+    assert all(pages)
+    if page_size == 2:
+        # batches follow the source pages instead of collecting the whole ledger first
+        assert len(pages) > 5
+        assert max(len(page) for page in pages) <= 2 * page_size
+
+
+def test_summarize_ledger_counts_manual_expenses_as_spending(postgrest):
+    _client(postgrest)
+    summary = asyncio.run(summarize_ledger(iter_ledger("u1", desc=False, page_size=3)))
+    transactions, manual = TABLES["transactions"], TABLES["manual_expenses"]
+    income = sum(r["amount"] for r in transactions if r["amount"] > 0)
+    expenses = -sum(r["amount"] for r in transactions if r["amount"] < 0) + sum(r["amount"] for r in manual)
+    assert summary["total_income"] == pytest.approx(income)
+    assert summary["total_expenses"] == pytest.approx(expenses)
+    assert summary["entries"] == len(transactions) + len(manual)
+    assert sum(c["total"] for c in summary["categories"]) == pytest.approx(expenses)
+    assert [m["month"] for m in summary["months"]] == ["2025-01"]
+    totals = [c["total"] for c in summary["categories"]]
+    assert totals == sorted(totals, reverse=True)
@@ -0,0 +1,173 @@
+"""Compiled keyword rules for categorising transactions.
+
+`map_category` used to rebuild its keyword dict and run `keyword in text`
+for every keyword on every call. A `CategoryEngine` compiles its rules
+once into a single regular expression: a lookahead at every position
+whose alternatives are one capture group per rule, in priority order, so
+one scan reports every rule with a keyword in the text and the lowest
+group number is the winner - the same answer as checking the rules in
+order. Results are memoized per distinct input value, `map_series`
+categorises a whole column by its unique values, and hits are counted
+per rule.
+
+Rules are case-insensitive substrings. User overrides come first (see
+`engine_with_overrides`), then the built-in `DEFAULT_RULES`.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "100000"))
+# Compiled engines kept for distinct user override sets
+CATEGORY_ENGINE_CACHE_SIZE = int(os.getenv("CATEGORY_ENGINE_CACHE_SIZE", "256"))
+
+FALLBACK = "Other"
+
+DEFAULT_RULES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("Groceries", ("grocery", "supermarket", "market", "whole foods", "aldi", "kroger", "food lion")),
+    ("Rent", ("rent", "landlord")),
+    ("Utilities", ("utility", "electric", "water", "gas", "internet", "wifi", "phone")),
+    ("Transportation", ("uber", "lyft", "gas station", "fuel", "parking", "metro", "bus", "train")),
+    ("Dining", ("restaurant", "dining", "cafe", "coffee", "bar", "starbucks", "mcdonald", "pizza")),
+    ("Entertainment", ("movie", "netflix", "spotify", "hulu", "disney")),
+    ("Health", ("pharmacy", "doctor", "dentist", "hospital", "insurance")),
+    ("Shopping", ("amazon", "target", "walmart", "mall", "retail")),
+    ("Income", ("payroll", "salary", "paycheck", "deposit", "income")),
+]
+
+
+def _normalize(value: Any) -> str:
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)) or not value:
+        return ""
+    return str(value).strip().lower()
+
+
+class CategoryEngine:
+    """Ordered keyword rules compiled into one regex, with a memo and per-rule hit counters."""
+
+    def __init__(self, rules: Sequence[Tuple[str, Sequence[str]]], cache_size: int = CATEGORY_CACHE_SIZE):
+        self.rules = [(category, tuple(k.lower() for k in keywords if k)) for category, keywords in rules]
+        self.rules = [(category, keywords) for category, keywords in self.rules if keywords]
+        groups = ["(" + "|".join(re.escape(k) for k in keywords) + ")" for _, keywords in self.rules]
+        self._pattern = re.compile("(?=" + "|".join(groups) + ")") if groups else None
+        self.cache_size = cache_size
+        self._memo: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._rule_hits = np.zeros(len(self.rules), dtype=np.int64)
+        self.fallbacks = 0
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def _classify(self, text: str) -> Tuple[int, str]:
+        """(rule index or -1, category) for normalized text."""
+        if not text:
+            return -1, FALLBACK
+        best = len(self.rules)
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text):
+                best = min(best, match.lastindex - 1)
+                if best == 0:
+                    break
+        if best < len(self.rules):
+            return best, self.rules[best][0]
+        # unmatched values keep their own text, capitalized
+        return -1, text.capitalize()
+
+    def _lookup(self, text: str) -> Tuple[int, str]:
+        with self._lock:
+            entry = self._memo.get(text)
+            if entry is not None:
+                self._memo.move_to_end(text)
+                self.memo_hits += 1
+                return entry
+            self.memo_misses += 1
+        entry = self._classify(text)
+        with self._lock:
+            self._memo[text] = entry
+            if len(self._memo) > self.cache_size:
+                self._memo.popitem(last=False)
+        return entry
+
+    def _count(self, rule_indexes: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        matched = rule_indexes >= 0
+        hits = np.bincount(rule_indexes[matched], weights=None if weights is None else weights[matched],
+                           minlength=len(self.rules)).astype(np.int64)
+        unmatched = int(weights[~matched].sum()) if weights is not None else int((~matched).sum())
+        with self._lock:
+            self._rule_hits += hits[:len(self.rules)]
+            self.fallbacks += unmatched
+
+    def map(self, value: Any) -> str:
+        """Category for one raw value (description or category text)."""
+        rule, category = self._lookup(_normalize(value))
+        with self._lock:
+            if rule >= 0:
+                self._rule_hits[rule] += 1
+            else:
+                self.fallbacks += 1
+        return category
+
+    def map_series(self, values: pd.Series) -> pd.Series:
+        """Categories for a whole column, classifying each distinct value once."""
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        results = [self._lookup(_normalize(value)) for value in uniques]
+        rules = np.array([rule for rule, _ in results] + [-1], dtype=np.int64)
+        categories = np.array([category for _, category in results] + [FALLBACK], dtype=object)
+        # missing values (code -1) land on the trailing fallback entry
+        counts = np.bincount(codes + 1, minlength=len(uniques) + 1)
+        self._count(rules, np.r_[counts[1:], counts[0]])
+        return pd.Series(categories[codes], index=values.index)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rule_hits: Dict[str, int] = {}
+            for (category, _), hits in zip(self.rules, self._rule_hits.tolist()):
+                if hits:
+                    rule_hits[category] = rule_hits.get(category, 0) + hits
+            return {
+                "rules": len(self.rules),
+                "memo_entries": len(self._memo),
+                "memo_hits": self.memo_hits,
+                "memo_misses": self.memo_misses,
+                "fallbacks": self.fallbacks,
+                "rule_hits": rule_hits,
+            }
+
+
+default_engine = CategoryEngine(DEFAULT_RULES)
+
+_override_engines: "OrderedDict[Tuple[Tuple[str, Tuple[str, ...]], ...], CategoryEngine]" = OrderedDict()
+_override_lock = threading.Lock()
+
+
+def engine_with_overrides(overrides: Sequence[Tuple[str, Sequence[str]]]) -> CategoryEngine:
+    """Engine whose rules are `overrides` (category, keywords) followed by the built-ins.
+
+    Engines are shared between users with identical override sets, so the
+    compiled pattern and memo survive across imports.
+    """
+    if not overrides:
+        return default_engine
+    key = tuple((category, tuple(keywords)) for category, keywords in overrides)
+    with _override_lock:
+        engine = _override_engines.get(key)
+        if engine is not None:
+            _override_engines.move_to_end(key)
+            return engine
+    engine = CategoryEngine(list(key) + DEFAULT_RULES)
+    with _override_lock:
+        engine = _override_engines.setdefault(key, engine)
+        while len(_override_engines) > CATEGORY_ENGINE_CACHE_SIZE:
+            _override_engines.popitem(last=False)
+    return engine
+
+
+def engine_stats() -> Dict[str, Any]:
+    with _override_lock:
+        override_engines = len(_override_engines)
+    return {"default": default_engine.stats(), "override_engines": override_engines}
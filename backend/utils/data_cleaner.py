@@ -1,6 +1,33 @@
 import re
 from datetime import datetime, date
-from typing import Optional
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.category_engine import default_engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    ARROW_AVAILABLE = True
+except ImportError:
+    pa = pc = None
+    ARROW_AVAILABLE = False
+
+# Arrow-backed strings run the column-wide .str operations in Arrow compute kernels
+TEXT_DTYPE = pd.StringDtype("pyarrow") if ARROW_AVAILABLE else pd.StringDtype()
+
+# Formats `parse_date` tries, in order
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y")
+# Distinct values `parse_dates` parses with every candidate format to pick one
+DATE_SAMPLE_SIZE = 500
+
+# Currency codes written next to amounts ("Rs. 1,00,000", "1,250.00 INR"); symbols
+# fall to the generic non-numeric strip
+_CURRENCY_CODES = r"(?i)\b(?:rs|inr|usd|eur|gbp)\b\.?"
+# What `float()` accepts once everything but digits, dots and minus signs is stripped
+_PLAIN_NUMBER = r"-?(?:\d+\.?\d*|\.\d+)"
 
 
 def parse_date(value: object) -> date:
@@ -15,7 +42,7 @@ def parse_date(value: object) -> date:
 
     text = str(value).strip()
     # Try ISO full date
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"):
+    for fmt in DATE_FORMATS:
         try:
             return datetime.strptime(text, fmt).date()
         except ValueError:
@@ -35,8 +62,9 @@ def parse_date(value: object) -> date:
 def normalize_amount(value: object) -> float:
     """Normalize amount values to float.
 
-    Accepts strings with commas, currency symbols, and parentheses for negatives.
-    Examples: "$1,234.56", "(123.45)", "-99.10", 100
+    Accepts strings with commas (including lakh grouping), currency symbols
+    or codes, and parentheses for negatives.
+    Examples: "$1,234.56", "(123.45)", "-99.10", "Rs. 1,00,000", 100
     """
     if value is None:
         raise ValueError("Amount is required")
@@ -53,8 +81,8 @@ def normalize_amount(value: object) -> float:
         negative = True
         text = text[1:-1]
 
-    # Remove currency symbols and thousands separators
-    cleaned = re.sub(r"[^0-9.\-]", "", text)
+    # Remove currency codes/symbols and thousands separators
+    cleaned = re.sub(r"[^0-9.\-]", "", re.sub(_CURRENCY_CODES, "", text))
     if cleaned.count("-") > 1:
         raise ValueError("Invalid amount format")
 
@@ -66,33 +94,87 @@ def normalize_amount(value: object) -> float:
     return -amount if negative else amount
 
 
-def map_category(raw_category: Optional[str]) -> str:
-    """Map noisy categories to a normalized set with simple rules.
+def infer_date_format(values: pd.Series, formats: Sequence[str] = DATE_FORMATS,
+                      sample_size: int = DATE_SAMPLE_SIZE) -> Optional[str]:
+    """The format in `formats` that parses the most of an evenly spaced sample of `values`.
 
-    This uses basic keyword matching. Extend as needed.
+    Ties go to the earlier format; None if no format parses any sampled value.
     """
-    if not raw_category:
-        return "Other"
+    text = values.dropna()
+    if text.empty:
+        return None
+    sample = text.iloc[::max(1, len(text) // sample_size)].astype(object)
+    best, best_count = None, 0
+    for fmt in formats:
+        count = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+def _parse_or_nat(value: str) -> pd.Timestamp:
+    try:
+        return pd.Timestamp(parse_date(value))
+    except ValueError:
+        return pd.NaT
 
-    text = str(raw_category).strip().lower()
 
-    rules = {
-        "groceries": ["grocery", "supermarket", "market", "whole foods", "aldi", "kroger", "food lion"],
-        "rent": ["rent", "landlord"],
-        "utilities": ["utility", "electric", "water", "gas", "internet", "wifi", "phone"],
-        "transportation": ["uber", "lyft", "gas station", "fuel", "parking", "metro", "bus", "train"],
-        "dining": ["restaurant", "dining", "cafe", "coffee", "bar", "starbucks", "mcdonald", "pizza"],
-        "entertainment": ["movie", "netflix", "spotify", "hulu", "disney"],
-        "health": ["pharmacy", "doctor", "dentist", "hospital", "insurance"],
-        "shopping": ["amazon", "target", "walmart", "mall", "retail"],
-        "income": ["payroll", "salary", "paycheck", "deposit", "income"],
-    }
+def parse_dates(values: pd.Series, formats: Sequence[str] = DATE_FORMATS,
+                sample_size: int = DATE_SAMPLE_SIZE) -> pd.Series:
+    """Column-wide `parse_date`: datetime64 with NaT where a value cannot be read.
 
-    for normalized, keywords in rules.items():
-        if any(k in text for k in keywords):
-            return normalized.capitalize() if normalized != "income" else "Income"
+    The format is inferred once from a sample of the distinct values and
+    applied to the whole column; the other formats are then tried in order
+    on whatever is still unparsed, and only the remaining stragglers go
+    through `parse_date` one by one. Unlike `parse_date`, a value that fits
+    several formats (01/02/2024) is read the way most of its column is.
+    Columns repeat dates heavily, so only distinct values are parsed.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.normalize()
+    codes, uniques = pd.factorize(values.astype(TEXT_DTYPE).str.strip())
+    text = pd.Series(np.asarray(uniques, dtype=object))
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    best = infer_date_format(text, formats, sample_size)
+    for fmt in ([best] if best else []) + [fmt for fmt in formats if fmt != best]:
+        pending = parsed.isna()
+        if not pending.any():
+            break
+        parsed[pending] = pd.to_datetime(text[pending], format=fmt, errors="coerce")
+    pending = parsed.isna()
+    if pending.any():
+        parsed[pending] = [_parse_or_nat(value) for value in text[pending]]
+    result = parsed.to_numpy()[codes]
+    result[codes < 0] = np.datetime64("NaT", "ns")
+    return pd.Series(result, index=values.index)
+
+
+def normalize_amounts(values: pd.Series) -> pd.Series:
+    """Column-wide `normalize_amount`: float64 with NaN where a value cannot be read.
+
+    Same rules as `normalize_amount` (currency symbols and codes, any
+    thousands/lakh grouping, parenthesized negatives), using string kernels
+    over the whole column instead of a regex per value.
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype("float64")
+    text = values.astype(TEXT_DTYPE).str.strip()
+    negative = (text.str.startswith("(") & text.str.endswith(")")).fillna(False).to_numpy(dtype=bool)
+    cleaned = text.str.replace(_CURRENCY_CODES, "", regex=True).str.replace(r"[^0-9.\-]+", "", regex=True)
+    cleaned = cleaned.where(cleaned.str.fullmatch(_PLAIN_NUMBER).fillna(False).to_numpy(dtype=bool))
+    if ARROW_AVAILABLE:
+        # every remaining value is a plain decimal, so Arrow's cast cannot fail
+        numbers = pc.cast(pa.array(cleaned), pa.float64()).to_numpy(zero_copy_only=False)
+        amounts = pd.Series(numbers, index=values.index)
+    else:
+        amounts = pd.to_numeric(cleaned.astype(object), errors="coerce").astype("float64")
+    return amounts.where(~negative, -amounts)
 
-    # Capitalize first letter for readability
-    return text.capitalize() if text else "Other"
 
+def map_category(raw_category: Optional[str]) -> str:
+    """Map noisy categories to a normalized set with simple rules.
 
+    Keyword rules live in `utils.category_engine` (compiled once, memoized);
+    use `default_engine.map_series` for whole columns.
+    """
+    return default_engine.map(raw_category)
@@ -0,0 +1,65 @@
+"""Response class and compression settings for list endpoints.
+
+Handlers return `ListJSONResponse(payload)` directly rather than a dict, so
+FastAPI skips `jsonable_encoder` and rows from PostgREST go straight to
+the serializer: orjson when it is installed, the stdlib `json` otherwise.
+
+Bodies of at least GZIP_MINIMUM_SIZE bytes are gzipped by the
+`ExportGZipMiddleware` in `main.py` for clients that accept it. The level
+defaults to 5 rather than Starlette's 9: on transaction pages level 9 costs
+about three times the CPU for a body only ~5% smaller (see
+benchmarks/bench_list_responses.py).
+
+Parquet exports are left alone: their pages are already zstd-compressed,
+so gzipping them again costs CPU and saves nothing. `ExportGZipMiddleware`
+skips those requests by path and `format`, rather than checking the
+response's Content-Encoding or type, which older Starlette releases do not
+look at.
+"""
+import os
+from typing import Any
+from urllib.parse import parse_qs
+
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "5"))
+# Export requests served as-is; the response is already compressed
+PRECOMPRESSED_EXPORTS = {"/transactions/export": ("parquet",)}
+
+
+class ListJSONResponse(JSONResponse):
+    """`JSONResponse` rendered with orjson when available."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def is_precompressed_export(scope: Scope) -> bool:
+    """True for an export request whose format is already compressed."""
+    formats = PRECOMPRESSED_EXPORTS.get(scope.get("path", ""))
+    if not formats:
+        return False
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("format", [""])[-1] in formats
+
+
+class ExportGZipMiddleware(GZipMiddleware):
+    """`GZipMiddleware` that passes precompressed exports through untouched."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and is_precompressed_export(scope):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -0,0 +1,254 @@
+"""Bank statement format profiles.
+
+A `StatementProfile` describes one export layout: which header names hold
+the date, the amount (signed, debit/credit pair, or amount plus a Dr/Cr
+indicator), the narration and any columns worth keeping. The registry
+detects the profile from the header row and compiles it once per header
+into a `CompiledProfile`, whose `apply` rewrites a parsed frame into the
+`date, amount, category` layout `validate_transactions` expects, using
+column-wide pandas operations only.
+
+Amounts go through `data_cleaner.normalize_amounts` (currency symbols and
+separators dropped, parenthesized values negative), dates through
+`data_cleaner.parse_dates` with the profile's formats, and categories
+come from a `CategoryEngine` (the built-in keyword rules unless the
+caller passes a user's engine) over the unique narrations. Rows that
+cannot be converted keep their raw text, so validation reports them with
+the value the user sent.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.category_engine import CategoryEngine, default_engine
+from utils.data_cleaner import TEXT_DTYPE as _TEXT, normalize_amounts, parse_dates
+
+TRANSACTION_COLUMNS = ("date", "amount", "category")
+ISO_DATE = "%Y-%m-%d"
+DAY_FIRST_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%d %b %Y", "%d-%b-%Y", "%d-%b-%y", ISO_DATE)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_header(name: object) -> str:
+    """'Withdrawal Amt.' -> 'withdrawal amt', 'Chq./Ref.No.' -> 'chq ref no'."""
+    return _NON_ALNUM.sub(" ", str(name).lower()).strip()
+
+
+def _iso_dates(dates: pd.Series) -> pd.Series:
+    codes, uniques = pd.factorize(dates)
+    text = np.asarray(uniques.strftime(ISO_DATE), dtype=object)
+    return pd.Series(np.where(codes >= 0, text[codes] if len(text) else None, None), index=dates.index)
+
+
+class CompiledProfile:
+    """A profile bound to the actual column names of one header."""
+
+    def __init__(self, profile: "StatementProfile", columns: Sequence[str], roles: Dict[str, str],
+                 keep: Dict[str, str]):
+        self.profile = profile
+        self.name = profile.name
+        self.roles = roles
+        self.keep = keep
+        used = set(roles.values()) | set(keep.values())
+        # unrecognised columns are carried over as metadata, as for native uploads
+        self._passthrough = [column for column in columns if column not in used]
+
+    def _amounts(self, frame: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+        """(amounts, raw text to show for rows whose amount cannot be read)"""
+        roles = self.roles
+        if "amount" in roles:
+            raw = frame[roles["amount"]]
+            amounts = normalize_amounts(raw)
+            if "direction" in roles:
+                debit = frame[roles["direction"]].astype(_TEXT).str.strip().str.lower().str.startswith("d")
+                amounts = amounts.abs().where(~debit.fillna(False).to_numpy(dtype=bool), -amounts.abs())
+            return amounts, raw
+        debit_raw, credit_raw = frame[roles["debit"]], frame[roles["credit"]]
+        debit, credit = normalize_amounts(debit_raw), normalize_amounts(credit_raw)
+        amounts = credit.fillna(0.0) - debit.abs().fillna(0.0)
+        amounts = amounts.where(debit.notna() | credit.notna())
+        raw = debit_raw.astype(_TEXT).fillna(credit_raw.astype(_TEXT)).fillna("")
+        return amounts, raw
+
+    def apply(self, frame: pd.DataFrame, engine: Optional[CategoryEngine] = None) -> pd.DataFrame:
+        """Rewrite a frame with this header into date, amount, category (+ metadata columns)."""
+        roles = self.roles
+        raw_dates = frame[roles["date"]]
+        dates = parse_dates(raw_dates, self.profile.date_formats)
+        date_text = _iso_dates(dates).where(dates.notna(), raw_dates.astype(object))
+
+        amounts, raw_amounts = self._amounts(frame)
+        amount_values = amounts
+        if amounts.isna().any():
+            amount_values = amounts.astype(object).where(amounts.notna(), raw_amounts.astype(object))
+
+        if "category" in roles:
+            categories = frame[roles["category"]]
+        else:
+            categories = (engine or default_engine).map_series(frame[roles["description"]])
+
+        columns = {"date": date_text, "amount": amount_values, "category": categories}
+        if "description" in roles:
+            columns["description"] = frame[roles["description"]]
+        for key, column in self.keep.items():
+            columns[key] = frame[column]
+        for column in self._passthrough:
+            columns.setdefault(column, frame[column])
+        return pd.DataFrame(columns, index=frame.index)
+
+
+class StatementProfile:
+    """Header aliases for one export layout.
+
+    Role aliases are normalized header names (see `normalize_header`):
+    `date`, either `amount` (optionally with a Dr/Cr `direction`) or a
+    `debit`/`credit` pair, and `category` or `description` (categories are
+    then derived from the narration) are required. `keep` maps metadata
+    keys to aliases of columns to carry over.
+    """
+
+    ROLES = ("date", "amount", "direction", "debit", "credit", "description", "category")
+
+    def __init__(self, name: str, date: Iterable[str], date_formats: Sequence[str] = DAY_FIRST_FORMATS,
+                 amount: Iterable[str] = (), direction: Iterable[str] = (), debit: Iterable[str] = (),
+                 credit: Iterable[str] = (), description: Iterable[str] = (), category: Iterable[str] = (),
+                 keep: Optional[Dict[str, Iterable[str]]] = None):
+        self.name = name
+        self.date_formats = tuple(date_formats)
+        self.aliases = {
+            "date": tuple(date), "amount": tuple(amount), "direction": tuple(direction), "debit": tuple(debit),
+            "credit": tuple(credit), "description": tuple(description), "category": tuple(category),
+        }
+        self.keep_aliases = {key: tuple(aliases) for key, aliases in (keep or {}).items()}
+
+    @staticmethod
+    def _resolve(aliases: Sequence[str], by_name: Dict[str, str]) -> Optional[str]:
+        for alias in aliases:
+            if alias in by_name:
+                return by_name[alias]
+        return None
+
+    def match(self, columns: Sequence[str]) -> Optional[Tuple[int, CompiledProfile]]:
+        """(number of columns recognised, compiled profile) if `columns` fit this layout."""
+        by_name: Dict[str, str] = {}
+        for column in columns:
+            by_name.setdefault(normalize_header(column), column)
+        roles = {}
+        for role in self.ROLES:
+            column = self._resolve(self.aliases[role], by_name)
+            if column is not None and column not in roles.values():
+                roles[role] = column
+        has_amount = "amount" in roles or ("debit" in roles and "credit" in roles)
+        # without a category or narration column there is nothing to categorise by
+        has_category = "category" in roles or "description" in roles
+        if "date" not in roles or not has_amount or not has_category:
+            return None
+        if self.aliases["direction"] and "direction" not in roles:
+            return None
+        if "amount" in roles:
+            roles.pop("debit", None)
+            roles.pop("credit", None)
+        keep = {}
+        for key, aliases in self.keep_aliases.items():
+            column = self._resolve(aliases, by_name)
+            if column is not None and column not in roles.values():
+                keep[key] = column
+        return len(roles) + len(keep), CompiledProfile(self, columns, roles, keep)
+
+
+class ProfileRegistry:
+    """Registered statement profiles; detection is memoized per header."""
+
+    def __init__(self, cache_size: int = 256) -> None:
+        self._profiles: List[StatementProfile] = []
+        self._compiled: Dict[Tuple[str, ...], Optional[CompiledProfile]] = {}
+        self._cache_size = cache_size
+
+    def register(self, profile: StatementProfile) -> None:
+        self._profiles.append(profile)
+        self._compiled.clear()
+
+    @property
+    def names(self) -> List[str]:
+        return [profile.name for profile in self._profiles]
+
+    def detect(self, columns: Sequence[object]) -> Optional[CompiledProfile]:
+        """Best-matching compiled profile for a header, or None.
+
+        Headers that already have date, amount and category are left alone
+        (None). Among matching profiles the one recognising most columns
+        wins; ties go to the earliest registered.
+        """
+        key = tuple(str(column) for column in columns)
+        if key in self._compiled:
+            return self._compiled[key]
+        compiled = None
+        if not all(column in key for column in TRANSACTION_COLUMNS):
+            best = 0
+            for profile in self._profiles:
+                matched = profile.match(key)
+                if matched and matched[0] > best:
+                    best, compiled = matched
+        if len(self._compiled) >= self._cache_size:
+            self._compiled.clear()
+        self._compiled[key] = compiled
+        return compiled
+
+    def normalize(self, frame: pd.DataFrame, engine: Optional[CategoryEngine] = None) -> pd.DataFrame:
+        """`frame` in transaction layout if a profile matches its header, else unchanged.
+
+        Narrations are categorised with `engine` (default: the built-in rules).
+        """
+        compiled = self.detect(frame.columns)
+        return compiled.apply(frame, engine) if compiled else frame
+
+
+profiles = ProfileRegistry()
+
+_DESCRIPTION = ("description", "narration", "particulars", "transaction remarks", "remarks", "details",
+                "transaction details")
+_REFERENCE = ("chq ref no", "ref no cheque no", "cheque number", "chqno", "cheque no", "reference",
+              "ref no", "reference no")
+_BALANCE = ("closing balance", "balance", "balance inr", "bal")
+
+profiles.register(StatementProfile(
+    "hdfc", date=("date",), date_formats=("%d/%m/%y", "%d/%m/%Y"),
+    debit=("withdrawal amt",), credit=("deposit amt",), description=("narration",),
+    keep={"reference": ("chq ref no",), "value_date": ("value dt",), "balance": ("closing balance",)},
+))
+profiles.register(StatementProfile(
+    "sbi", date=("txn date",), date_formats=("%d %b %Y", "%d/%m/%Y", "%d-%m-%Y"),
+    debit=("debit",), credit=("credit",), description=("description",),
+    keep={"reference": ("ref no cheque no",), "value_date": ("value date",), "balance": ("balance",)},
+))
+profiles.register(StatementProfile(
+    "icici", date=("transaction date",), date_formats=("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y"),
+    debit=("withdrawal amount inr", "withdrawal amount"), credit=("deposit amount inr", "deposit amount"),
+    description=("transaction remarks",),
+    keep={"reference": ("cheque number",), "value_date": ("value date",), "balance": ("balance inr",)},
+))
+profiles.register(StatementProfile(
+    "axis", date=("tran date",), date_formats=("%d-%m-%Y", "%d/%m/%Y"),
+    debit=("dr",), credit=("cr",), description=("particulars",),
+    keep={"reference": ("chqno",), "balance": ("bal",)},
+))
+profiles.register(StatementProfile(
+    "kotak", date=("transaction date",), date_formats=("%d-%m-%Y", "%d/%m/%Y"),
+    amount=("amount",), direction=("dr cr",), description=("description",),
+    keep={"reference": ("chq ref no",), "balance": ("balance",)},
+))
+profiles.register(StatementProfile(
+    "debit_credit", date=("date", "txn date", "transaction date", "value date", "posting date"),
+    debit=("debit", "withdrawal", "withdrawals", "debit amount", "withdrawal amount"),
+    credit=("credit", "deposit", "deposits", "credit amount", "deposit amount"),
+    description=_DESCRIPTION, category=("category",),
+    keep={"reference": _REFERENCE, "balance": _BALANCE},
+))
+profiles.register(StatementProfile(
+    "signed_amount", date=("date", "txn date", "transaction date", "value date", "posting date"),
+    amount=("amount", "transaction amount", "amount inr"), description=_DESCRIPTION, category=("category",),
+    keep={"reference": _REFERENCE, "balance": _BALANCE},
+))
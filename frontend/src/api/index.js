@@ -74,6 +74,10 @@ export const questionsAPI = {
     const response = await api.post('/questions/submit', {
       answers: answers
     });
+    // Tokens carry onboarding status, so keep the refreshed one
+    if (response.data?.access_token) {
+      localStorage.setItem('access_token', response.data.access_token);
+    }
     return response.data;
   },
 